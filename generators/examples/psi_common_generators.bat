@@ -0,0 +1 @@
+py -3 ..\psi_common_generators.py psi_common_generators.json
\ No newline at end of file
@@ -0,0 +1,172 @@
+##############################################################################
+# Generator API and batch mode for the psi_common_*_X.py generators
+#
+# The snippets are parsed once per process into literal parts and
+# placeholders (<NAME>), so rendering a variant is a single join. A manifest
+# (JSON, or YAML if PyYAML is installed) lists any number of variants that
+# are rendered in one go, optionally in parallel processes (-jobs). Outputs
+# whose content did not change are not written, so the build system does
+# not see new time stamps.
+#
+# Manifest example:
+#   {
+#     "dir": "../hdl_generated",
+#     "variants": [
+#       {"generator": "simple_cc", "postfix": "test", "ports": {"SomePort": 3, "OtherPort": 1}},
+#       {"generator": "status_cc", "postfix": "test", "ports": ["SomePort=3", "OtherPort=1"]},
+#       {"generator": "par_tdm", "width": 12},
+#       {"generator": "tdm_par", "width": 15, "dir": "other_folder"}
+#     ]
+#   }
+#
+# Usage: python psi_common_generators.py <manifest> [-dir <folder>] [-jobs <n>]
+##############################################################################
+import argparse
+import functools
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ======================================================================
+# Templates
+# ======================================================================
+class Template:
+    """Snippet split into literal parts and placeholders"""
+    def __init__(self, content):
+        self.parts = re.split("<([A-Z_]+)>", content)
+
+    def render(self, **values):
+        parts = list(self.parts)
+        for i in range(1, len(parts), 2):
+            parts[i] = str(values[parts[i]]) if parts[i] in values else "<{}>".format(parts[i])
+        return "".join(parts)
+
+@functools.lru_cache(maxsize=None)
+def template(name):
+    """Compiled snippet generators/snippets/<name>.vhd (read only once per process)"""
+    with open("{}/snippets/{}.vhd".format(FILE_DIR, name)) as f:
+        return Template(f.read())
+
+# ======================================================================
+# Generators
+# ======================================================================
+def parse_ports(ports):
+    """Ports as dictionary name -> width from a dictionary or from strings <name>=<width>"""
+    if isinstance(ports, dict):
+        return {name.strip(): int(width) for name, width in ports.items()}
+    result = {}
+    for port in ports:
+        info = port.split("=")
+        result[info[0].strip()] = int(info[1].strip())
+    return result
+
+def merged_cc(snippet, postfix, ports):
+    ports = parse_ports(ports)
+    data_in = []
+    data_out = []
+    data_merge = []
+    data_unmerge = []
+    nextIdx = 0
+    for name, width in sorted(ports.items()):
+        data_in.append("\t\t{:16s}: in \tstd_logic_vector({} downto 0);".format(name+"A", width-1))
+        data_out.append("\t\t{:16s}: out\tstd_logic_vector({} downto 0);".format(name+"B", width - 1))
+        data_merge.append("\tMergedA({} downto {}) <= {};".format(nextIdx+width-1, nextIdx, name+"A"))
+        data_unmerge.append("\t{} <= MergedB({} downto {});".format(name+"B", nextIdx+width-1, nextIdx))
+        nextIdx += width
+    content = template(snippet).render(WIDTH=sum(ports.values()), POSTFIX=postfix,
+                                       DATA_IN="\n".join(data_in), DATA_OUT="\n".join(data_out),
+                                       DATA_MERGE="\n".join(data_merge), DATA_UNMERGE="\n".join(data_unmerge))
+    return snippet.replace("X", postfix) + ".vhd", content
+
+def simple_cc(postfix, ports):
+    """psi_common_simple_cc_<postfix>, returns tuple (file name, content)"""
+    return merged_cc("psi_common_simple_cc_X", postfix, ports)
+
+def status_cc(postfix, ports):
+    """psi_common_status_cc_<postfix>, returns tuple (file name, content)"""
+    return merged_cc("psi_common_status_cc_X", postfix, ports)
+
+def par_tdm(width):
+    """psi_common_par_tdm_w<width>, returns tuple (file name, content)"""
+    return "psi_common_par_tdm_w{}.vhd".format(width), template("psi_common_par_tdm_wX").render(WIDTH=int(width))
+
+def tdm_par(width):
+    """psi_common_tdm_par_w<width>, returns tuple (file name, content)"""
+    return "psi_common_tdm_par_w{}.vhd".format(width), template("psi_common_tdm_par_wX").render(WIDTH=int(width))
+
+GENERATORS = {
+    "simple_cc": simple_cc,
+    "status_cc": status_cc,
+    "par_tdm": par_tdm,
+    "tdm_par": tdm_par,
+}
+
+# ======================================================================
+# Output
+# ======================================================================
+def write_if_changed(path, content):
+    """Write content to path if the file does not exist or differs, returns True if written"""
+    if os.path.isfile(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    with open(path, "w+") as f:
+        f.write(content)
+    return True
+
+def generate(variant, dir = "."):
+    """Generate one variant
+    Keyword arguments:
+    variant -- dictionary with the generator name ("generator"), its arguments and optionally the output folder ("dir")
+    dir -- default output folder
+    Returns tuple (path, written)"""
+    args = dict(variant)
+    name = args.pop("generator")
+    if name not in GENERATORS:
+        raise ValueError("unknown generator '{}', valid are {}".format(name, ", ".join(sorted(GENERATORS))))
+    folder = args.pop("dir", dir)
+    filename, content = GENERATORS[name](**args)
+    path = os.path.join(folder, filename)
+    return path, write_if_changed(path, content)
+
+def load_manifest(path):
+    """Manifest as dictionary (JSON, or YAML for the extensions .yml/.yaml)"""
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in (".yml", ".yaml"):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def run_manifest(manifest, dir = None, jobs = 1):
+    """Generate all variants of a manifest (dictionary or file name)
+    Keyword arguments:
+    manifest -- manifest dictionary or path, output folders in the manifest are relative to the manifest file
+    dir -- output folder overriding the default one of the manifest
+    jobs -- number of processes rendering the variants (None: number of CPUs)
+    Returns list of tuples (path, written)"""
+    base = "."
+    if not isinstance(manifest, dict):
+        base = os.path.dirname(os.path.abspath(manifest))
+        manifest = load_manifest(manifest)
+    folder = dir or os.path.join(base, manifest.get("dir", "."))
+    variants = [dict(v, dir=os.path.join(base, v["dir"])) if "dir" in v else v for v in manifest["variants"]]
+    for d in {v.get("dir", folder) for v in variants}:
+        os.makedirs(d, exist_ok=True)
+    if jobs != 1 and len(variants) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            return list(pool.map(functools.partial(generate, dir=folder), variants, chunksize=16))
+    return [generate(v, folder) for v in variants]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", help="JSON or YAML file listing the variants to generate")
+    parser.add_argument("-dir", help="Output folder (overrides the manifest)", required=False, default=None)
+    parser.add_argument("-jobs", help="Number of processes (0: number of CPUs)", required=False, default=1, type=int)
+    args = parser.parse_args()
+
+    results = run_manifest(args.manifest, args.dir, args.jobs or None)
+    for path, written in results:
+        print("{:10s}{}".format("written" if written else "unchanged", path))
@@ -1,8 +1,6 @@
-import re
 import argparse
-import os
 
-FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+from psi_common_generators import generate, parse_ports
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-postfix", help="name postfix for the generated entity", required=True)
@@ -12,12 +10,7 @@ args = parser.parse_args()
 
 
 ### Startup ###
-ports = {}
-for port in args.ports:
-    info = port.split("=")
-    a = str()
-    ports[info[0].strip()] = int(info[1].strip())
-sumWidth = sum(ports.values())
+ports = parse_ports(args.ports)
 
 ### Print Ports ###
 print("Ports:")
@@ -25,26 +18,4 @@ for name, width in sorted(ports.items()):
     print("{:12s}{}".format(name, width))
 
 ### Generate File ###
-with open("{}/snippets/psi_common_simple_cc_X.vhd".format(FILE_DIR)) as f:
-    content = f.read()
-
-content = re.sub("<WIDTH>", str(sumWidth), content)
-content = re.sub("<POSTFIX>", args.postfix, content)
-data_in = []
-data_out = []
-data_merge = []
-data_unmerge = []
-nextIdx = 0
-for name, width in sorted(ports.items()):
-    data_in.append("\t\t{:16s}: in \tstd_logic_vector({} downto 0);".format(name+"A", width-1))
-    data_out.append("\t\t{:16s}: out\tstd_logic_vector({} downto 0);".format(name+"B", width - 1))
-    data_merge.append("\tMergedA({} downto {}) <= {};".format(nextIdx+width-1, nextIdx, name+"A"))
-    data_unmerge.append("\t{} <= MergedB({} downto {});".format(name+"B", nextIdx+width-1, nextIdx))
-    nextIdx += width
-content = re.sub("<DATA_IN>", "\n".join(data_in), content)
-content = re.sub("<DATA_OUT>", "\n".join(data_out), content)
-content = re.sub("<DATA_MERGE>", "\n".join(data_merge), content)
-content = re.sub("<DATA_UNMERGE>", "\n".join(data_unmerge), content)
-
-with open("{}/psi_common_simple_cc_{}.vhd".format(args.dir, args.postfix), "w+") as f:
-    f.write(content)
\ No newline at end of file
+generate({"generator": "simple_cc", "postfix": args.postfix, "ports": ports}, args.dir)
@@ -0,0 +1,7 @@
+##############################################################################
+# Bit-true Python models of psi_common entities
+#
+# The models mirror the behavior of the corresponding hdl/<entity>.vhd and
+# are used to generate stimuli and expected responses for testbenches and
+# link tests. They require NumPy.
+##############################################################################
@@ -0,0 +1,58 @@
+##############################################################################
+# Throughput benchmark of the TDM / width conversion models
+# Decodes a generated DMA buffer of parallel words (channels() and the
+# models) and reports the throughput in GB/s of input data.
+#
+# Usage (from the repository root): python -m model.bench_tdm [-size <MB>] [-ch_nb <n>] [-ch_width <bits>]
+##############################################################################
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from .psi_common_tdm import channels, pack, par_tdm, TdmPar, TdmMux, WconvN2xn, wconv_xn2n
+
+def bench(name, size, func, repeat = 3):
+    """Best time of repeat runs, prints the throughput for size bytes"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = func()
+        if isinstance(res, tuple):
+            res = res[0]
+        np.asarray(res).sum()   # touch the data, views are created without reading the buffer
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    print("{:28s}: {:8.2f} GB/s".format(name, size / best / 1e9))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark the TDM / width conversion models")
+    parser.add_argument("-size", help="buffer size in MB", type=float, default=256)
+    parser.add_argument("-ch_nb", help="number of channels", type=int, default=8)
+    parser.add_argument("-ch_width", help="channel width in bits", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    word_bytes = args.ch_nb * args.ch_width // 8
+    words = int(args.size * 2**20) // word_bytes
+    rng = np.random.default_rng(1)
+    buf = rng.integers(0, 256, words * word_bytes, dtype=np.uint8).tobytes()
+    size = len(buf)
+    par = channels(buf, args.ch_width, args.ch_nb)
+    tdm = par.reshape(-1) if par.flags.c_contiguous else np.ascontiguousarray(par).reshape(-1)
+    last = np.zeros(len(tdm), dtype=bool)
+    last[args.ch_nb - 1::args.ch_nb * 64] = True   # packets of 64 words, one channel missing
+
+    print("buffer: {:.1f} MB, {} channels of {} bits".format(size / 2**20, args.ch_nb, args.ch_width))
+    bench("channels", size, lambda: channels(buf, args.ch_width, args.ch_nb))
+    bench("par_tdm", size, lambda: par_tdm(par))
+    bench("tdm_par", size, lambda: TdmPar(args.ch_nb).process(tdm))
+    bench("tdm_par (with last)", size, lambda: TdmPar(args.ch_nb).process(tdm, last))
+    bench("tdm_mux", size, lambda: TdmMux(args.ch_nb).process(tdm, 1))
+    bench("wconv_n2xn", size, lambda: WconvN2xn(args.ch_nb).process(tdm))
+    bench("wconv_xn2n", size, lambda: wconv_xn2n(par))
+    bench("pack", size, lambda: np.frombuffer(pack(par, args.ch_width), dtype=np.uint8))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+##############################################################################
+# Transaction level models of psi_common_axi_master_simple and
+# psi_common_axi_master_full
+#
+# The translation of user commands into AXI bursts (alignment to the AXI
+# data width, splitting at 4k boundaries and at axi_max_beats_g) is exact and
+# gives the same AW/AR sequence as the RTL.
+#
+# The timing is modelled per burst (not per clock cycle) with the latencies
+# of the RTL state machines: transfer generation, AW/AR handshaking, limit of
+# outstanding transactions, high latency mode (commands only sent when the
+# data resp. the FIFO space for the whole burst is available), data FIFO
+# depth and user data rate. Data beats of a burst are assumed to be
+# transferred at the rate given by the slave profile. Times are in clock
+# cycles of m_axi_aclk. For DMA throughput exploration the results are
+# accurate to a few clock cycles per burst.
+##############################################################################
+import bisect
+import itertools
+
+import numpy as np
+
+from .psi_common_math_pkg import log2
+
+# Pipeline latencies of the RTL state machines (clock cycles)
+CMD_TO_TF = 3       # command handshake to transfer valid (MaxCalc_s, GenTf_s)
+TF_TO_ADDR = 2      # transfer valid to AxVALID (AwFsmRdy/ArFsmRdy register)
+TF_INTERVAL = 3     # transfer handshake to next transfer valid
+ADDR_TO_W = 2       # AWVALID to first W beat (transaction FIFO)
+FULL_CMD = 2        # additional command latency of psi_common_axi_master_full (Apply_s)
+
+# ======================================================================
+# Burst splitting
+# ======================================================================
+def split_bursts(addr, beats, axi_bytes, max_beats, addr_width = 32):
+    """AXI bursts of psi_common_axi_master_simple for a command
+    Keyword arguments:
+    addr -- command address (the bits below the AXI data width are ignored)
+    beats -- command size in beats
+    axi_bytes -- AXI data width in bytes
+    max_beats -- axi_max_beats_g
+    Returns list of tuples (address, beats)"""
+    if beats < 1:
+        raise ValueError("command size must be at least one beat")
+    mask = (1 << addr_width) - 1
+    addr &= mask & ~(axi_bytes - 1)
+    bursts = []
+    while beats:
+        max_4k = ((~addr & 0xFFF) >> log2(axi_bytes)) + 1
+        tf = min(max_4k, max_beats, beats)
+        bursts.append((addr, tf))
+        addr = (addr + tf * axi_bytes) & mask
+        beats -= tf
+    return bursts
+
+def full_command(addr, size, axi_bytes):
+    """Command (address, beats) passed to psi_common_axi_master_simple by psi_common_axi_master_full
+    for a user command of size bytes at the byte address addr"""
+    if size < 1:
+        raise ValueError("command size must be at least one byte")
+    first = addr & ~(axi_bytes - 1)
+    last = (addr + size - 1) & ~(axi_bytes - 1)
+    return first, (last - first) // axi_bytes + 1
+
+# ======================================================================
+# Slave profile
+# ======================================================================
+class AxiSlave:
+    """Latency and backpressure of the AXI slave (clock cycles)
+    Keyword arguments:
+    addr_latency -- AxVALID to AxREADY
+    wr_resp_latency -- last W beat (and AW handshake) to BVALID
+    rd_latency -- AR handshake to the first RVALID
+    beat_cycles -- clock cycles per data beat (inverse of the WREADY / RVALID duty cycle, >= 1)
+    Every parameter is a number or a sequence with one value per burst, used cyclically
+    (e.g. random latencies)."""
+    def __init__(self, addr_latency = 0, wr_resp_latency = 1, rd_latency = 4, beat_cycles = 1.0):
+        self.addr_latency = addr_latency
+        self.wr_resp_latency = wr_resp_latency
+        self.rd_latency = rd_latency
+        self.beat_cycles = beat_cycles
+
+    def get(self, name, i):
+        value = getattr(self, name)
+        return float(value[i % len(value)]) if np.ndim(value) else float(value)
+
+# ======================================================================
+# Simulation result
+# ======================================================================
+class AxiTrace:
+    """Result of a transaction level simulation
+    Attributes:
+    bursts -- structured array with one entry per AXI burst: cmd (command index), addr, beats,
+              addr_valid, addr_accept (AW/AR handshake), data_first, data_last (first/last beat),
+              resp (B handshake for writes, last R beat for reads)
+    cmd_start, cmd_done -- per command: command handshake and done (wr_done_o / rd_done_o, for the
+              full master reads when the last data is delivered to the user)
+    cmd_request -- per command: earliest cycle cmd_vld_i is set"""
+    def __init__(self, bursts, cmd_request, cmd_start, cmd_done, axi_bytes):
+        self.bursts = bursts
+        self.cmd_request = cmd_request
+        self.cmd_start = cmd_start
+        self.cmd_done = cmd_done
+        self.axi_bytes = axi_bytes
+
+    def latency(self):
+        """Latency of every command from the request to done"""
+        return self.cmd_done - self.cmd_request
+
+    def latency_histogram(self, bins = 20):
+        """Histogram of the command latencies, tuple (counts, bin edges) as returned by np.histogram"""
+        return np.histogram(self.latency(), bins=bins)
+
+    def report(self):
+        """Statistics of the simulation as dictionary (times in clock cycles)"""
+        b = self.bursts
+        beats = int(b["beats"].sum())
+        span = float(b["data_last"].max() - b["data_first"].min() + 1) if len(b) else 0.0
+        lat = self.latency()
+        return {
+            "commands": len(self.cmd_done),
+            "bursts": len(b),
+            "beats": beats,
+            "cycles": float(self.cmd_done.max()) if len(self.cmd_done) else 0.0,
+            "bus_utilization": beats / span if span else 0.0,
+            "bytes_per_cycle": beats * self.axi_bytes / float(self.cmd_done.max()) if beats else 0.0,
+            "max_outstanding": int(self.outstanding().max()) if len(b) else 0,
+            "latency_min": float(lat.min()) if len(lat) else None,
+            "latency_mean": float(lat.mean()) if len(lat) else None,
+            "latency_max": float(lat.max()) if len(lat) else None,
+        }
+
+    def outstanding(self):
+        """Number of outstanding transactions after every address handshake"""
+        b = self.bursts
+        return np.arange(1, len(b) + 1) - np.searchsorted(np.sort(b["resp"]), b["addr_accept"], side="right")
+
+# ======================================================================
+# Masters
+# ======================================================================
+BURST_DTYPE = [("cmd", np.int64), ("addr", np.int64), ("beats", np.int64), ("addr_valid", np.float64),
+               ("addr_accept", np.float64), ("data_first", np.float64), ("data_last", np.float64),
+               ("resp", np.float64)]
+
+class AxiMasterSimple:
+    """Model of psi_common_axi_master_simple
+    Commands are tuples (address, beats) or (address, beats, request cycle), the user data
+    interface transfers one AXI beat per clock cycle (see user_rate)."""
+    full = False
+
+    def __init__(self, axi_data_width = 32, axi_max_beats = 256, axi_max_open_transactions = 8,
+                 data_fifo_depth = 1024, axi_addr_width = 32):
+        self.axi_bytes = axi_data_width // 8
+        self.max_beats = axi_max_beats
+        self.max_open = axi_max_open_transactions
+        self.fifo_depth = data_fifo_depth
+        self.addr_width = axi_addr_width
+        self.user_rate = 1.0
+
+    def command(self, addr, size):
+        """Command (address, beats) of the simple master for a user command"""
+        return addr, size
+
+    def bursts(self, cmds):
+        """AXI bursts for a command sequence, list of tuples (command index, address, beats)"""
+        out = []
+        for i, cmd in enumerate(cmds):
+            addr, beats = self.command(cmd[0], cmd[1])
+            out += [(i, a, n) for a, n in split_bursts(addr, beats, self.axi_bytes, self.max_beats, self.addr_width)]
+        return out
+
+    def simulate(self, cmds, write, slave, low_latency, user_rate):
+        """Per burst timing of a command sequence, see write() and read()"""
+        cmds = list(cmds)
+        bursts = self.bursts(cmds)
+        rate = self.user_rate if user_rate is None else user_rate
+        nc, nb = len(cmds), len(bursts)
+        out = []
+        request = np.array([float(c[2]) if len(c) > 2 else 0.0 for c in cmds])
+        start = np.zeros(nc)
+        done = np.zeros(nc)
+        cum = list(itertools.accumulate(n for _, _, n in bursts))
+        drain = [0.0] * nb      # user side: burst data completely written into (write) or read from (read) the FIFO
+        cmd_rdy = 0.0           # earliest command handshake
+        tf_vld = 0.0
+        addr_idle = 0.0
+        data_free = 0.0
+        data_start = 0.0
+        cmd = -1
+        for i, (c, addr, beats) in enumerate(bursts):
+            if c != cmd:
+                cmd = c
+                start[c] = max(request[c], cmd_rdy) + (FULL_CMD if self.full else 0)
+                tf_vld = start[c] + CMD_TO_TF
+                if self.full or i == 0:
+                    data_start = start[c] if self.full else request[c]
+            # user data, limited by the FIFO depth (space is freed by W beats resp. by the user reading)
+            j = bisect.bisect_left(cum, cum[i] - self.fifo_depth)
+            fifo = 0.0
+            if cum[i] > self.fifo_depth and j < i:
+                fifo = (out[j][6] if write else drain[j]) + 1
+            prev = drain[i-1] if i and (bursts[i-1][0] == c or not self.full) else data_start
+            # address channel: outstanding transactions are released by the response
+            x = max(tf_vld, addr_idle, out[i-self.max_open][7] + 1 if i >= self.max_open else 0.0)
+            if write:
+                drain[i] = max(prev + beats / rate, fifo)
+                if not low_latency:
+                    x = max(x, drain[i] + 2)
+            elif not low_latency:
+                x = max(x, fifo + 1)
+            a_vld = x + TF_TO_ADDR
+            a_acc = a_vld + slave.get("addr_latency", i)
+            tf_vld = x + 1 + TF_INTERVAL
+            addr_idle = a_acc + 1
+            cmd_rdy = x + 3 if i == nb - 1 or bursts[i+1][0] != c else cmd_rdy
+            # data channel
+            dur = (beats - 1) * slave.get("beat_cycles", i)
+            if write:
+                first = max(a_vld + ADDR_TO_W, data_free, prev + 1 / rate if low_latency else 0.0)
+                last = max(first + dur, drain[i])
+                resp = max(last, a_acc) + 1 + slave.get("wr_resp_latency", i)
+            else:
+                first = max(a_acc + 1 + slave.get("rd_latency", i), data_free)
+                last = max(first + dur, fifo if low_latency else 0.0)
+                resp = last
+                drain[i] = max(last + 2, prev + beats / rate)
+            data_free = last + 1 + (1 if write and beats == 1 else 0)
+            out.append((c, addr, beats, a_vld, a_acc, first, last, resp))
+            if i == nb - 1 or bursts[i+1][0] != c:
+                done[c] = (drain[i] if self.full and not write else resp) + 1
+                if self.full:
+                    # the next command is only applied when the data path is idle
+                    cmd_rdy = max(cmd_rdy, drain[i] + 1)
+        return AxiTrace(np.array(out, dtype=BURST_DTYPE), request, start, done, self.axi_bytes)
+
+    def write(self, cmds, slave = None, low_latency = False, user_rate = None):
+        """Simulate write commands
+        Keyword arguments:
+        cmds -- commands (address, size) or (address, size, request cycle)
+        slave -- AxiSlave profile (default: AxiSlave())
+        low_latency -- cmd_wr_low_lat_i
+        user_rate -- AXI beats per clock cycle provided on the user data interface (default: full rate)
+        Returns an AxiTrace"""
+        return self.simulate(cmds, True, slave or AxiSlave(), low_latency, user_rate)
+
+    def read(self, cmds, slave = None, low_latency = False, user_rate = None):
+        """Simulate read commands, see write()"""
+        return self.simulate(cmds, False, slave or AxiSlave(), low_latency, user_rate)
+
+class AxiMasterFull(AxiMasterSimple):
+    """Model of psi_common_axi_master_full
+    Commands are tuples (byte address, bytes) or (byte address, bytes, request cycle), the user data
+    interface transfers one data_width word per clock cycle (see user_rate). A command is only applied
+    when the data of the previous one passed the alignment logic."""
+    full = True
+
+    def __init__(self, axi_data_width = 32, axi_max_beats = 256, axi_max_open_transactions = 8,
+                 axi_fifo_depth = 512, data_width = 32, axi_addr_width = 32):
+        if data_width > axi_data_width:
+            raise ValueError("data_width must not be larger than axi_data_width")
+        super().__init__(axi_data_width, axi_max_beats, axi_max_open_transactions, axi_fifo_depth, axi_addr_width)
+        self.user_rate = data_width / axi_data_width
+
+    def command(self, addr, size):
+        return full_command(addr, size, self.axi_bytes)
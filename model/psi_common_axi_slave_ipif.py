@@ -0,0 +1,257 @@
+##############################################################################
+# Register map of psi_common_axi_slave_ipif, psi_common_axi_slave_ipif64
+# and psi_common_axilite_slave_ipif with batched host side access
+#
+# The bus address space of the entities is a word array (32 bits, 64 bits
+# for psi_common_axi_slave_ipif64): the num_reg_g registers at word 0 to
+# num_reg_g - 1 followed by the memory window (use_mem_g) up to
+# 2**axi_addr_width_g bytes (o_mem_addr is the byte address relative to the
+# window). Without memory, accesses above the registers get a DECERR
+# response.
+#
+# IpifModel is the register file of the IP side (o_reg_wdata with rst_val_g,
+# i_reg_rdata, o_reg_rd/o_reg_wr pulses, a RAM on the memory interface).
+# MmapBackend maps the address space from a file (/dev/mem, UIO device or a
+# regular file). Both implement the backend interface read(first, n) and
+# write(first, values) on words, used by RegisterMap to transfer whole blocks
+# of registers with one copy.
+##############################################################################
+import mmap
+
+import numpy as np
+
+from .psi_common_math_pkg import log2ceil
+
+# Data width of the entities in bits
+DATA_WIDTH = {"psi_common_axi_slave_ipif"       : 32,
+              "psi_common_axi_slave_ipif64"     : 64,
+              "psi_common_axilite_slave_ipif"   : 32}
+
+def word_dtype(data_width):
+    """Little endian dtype of the bus words"""
+    if data_width not in (32, 64):
+        raise ValueError("data_width must be 32 or 64")
+    return np.dtype("<u{}".format(data_width // 8))
+
+def mem_words(num_reg, use_mem, data_width = 32, addr_width = 8):
+    """Number of words in the memory window"""
+    if not use_mem:
+        return 0
+    return max((1 << addr_width) // (data_width // 8) - num_reg, 0)
+
+def check_generics(num_reg, use_mem):
+    if num_reg == 0 and not use_mem:
+        raise ValueError("num_reg must be > 0 if use_mem = False")
+    if num_reg != 0 and num_reg != 2**log2ceil(num_reg):
+        raise ValueError("num_reg must be a power of two")
+
+# ======================================================================
+# IP side model
+# ======================================================================
+class IpifModel:
+    """Register file and memory behind the IPIF (backend for RegisterMap)
+    Keyword arguments:
+    num_reg, rst_val, use_mem, addr_width -- generics of the entity (num_reg_g, rst_val_g, use_mem_g, axi_addr_width_g)
+    data_width -- 32 or 64 (see DATA_WIDTH)
+    By default i_reg_rdata is o_reg_wdata (read back of the written values). Registers driven by the IP
+    (status) are set with drive()."""
+    def __init__(self, num_reg = 32, rst_val = (0,), use_mem = True, data_width = 32, addr_width = 8):
+        check_generics(num_reg, use_mem)
+        if len(rst_val) > num_reg:
+            raise ValueError("rst_val has more entries than num_reg")
+        self.num_reg = num_reg
+        self.rst_val = list(rst_val)
+        self.use_mem = use_mem
+        self.dtype = word_dtype(data_width)
+        self.mem_words = mem_words(num_reg, use_mem, data_width, addr_width)
+        self.reset()
+
+    def reset(self):
+        self.reg_wdata = np.zeros(self.num_reg, dtype=self.dtype)          # o_reg_wdata
+        self.reg_wdata[:len(self.rst_val)] = self.rst_val
+        self.reg_rdata = np.zeros(self.num_reg, dtype=self.dtype)          # i_reg_rdata of driven registers
+        self.driven = np.zeros(self.num_reg, dtype=bool)
+        self.rd_count = np.zeros(self.num_reg, dtype=np.int64)             # o_reg_rd pulses
+        self.wr_count = np.zeros(self.num_reg, dtype=np.int64)             # o_reg_wr pulses
+        self.mem = np.zeros(self.mem_words, dtype=self.dtype)
+        self.accesses = 0                                                   # block transfers (read/write calls)
+
+    def drive(self, reg, value):
+        """Drive i_reg_rdata of registers (index or index array) from the IP"""
+        self.reg_rdata[reg] = value
+        self.driven[reg] = True
+
+    def span(self, first, n):
+        """Register and memory slices of the words first to first + n - 1"""
+        if first < 0 or first + n > self.num_reg + self.mem_words:
+            if not self.use_mem and first + n > self.num_reg:
+                raise ValueError("access to words {} to {}: DECERR (use_mem = False)".format(first, first + n - 1))
+            raise ValueError("access to words {} to {} outside the address space".format(first, first + n - 1))
+        reg = slice(min(first, self.num_reg), min(first + n, self.num_reg))
+        mem = slice(max(first - self.num_reg, 0), max(first + n - self.num_reg, 0))
+        return reg, mem
+
+    def read(self, first, n):
+        """Read n words starting at word first"""
+        self.accesses += 1
+        reg, mem = self.span(first, n)
+        self.rd_count[reg] += 1
+        regs = np.where(self.driven[reg], self.reg_rdata[reg], self.reg_wdata[reg])
+        return np.concatenate((regs, self.mem[mem]))
+
+    def write(self, first, values, strb = None):
+        """Write words starting at word first, strb: byte enables (words, bytes) of s_axi_wstrb (None: all)"""
+        self.accesses += 1
+        values = np.asarray(values).astype(self.dtype).reshape(-1)
+        reg, mem = self.span(first, len(values))
+        self.wr_count[reg] += 1
+        nreg = reg.stop - reg.start
+        nb = self.dtype.itemsize
+        en = None if strb is None else np.asarray(strb, dtype=bool).reshape(len(values), nb)
+        for dst, part in ((self.reg_wdata[reg], slice(0, nreg)), (self.mem[mem], slice(nreg, len(values)))):
+            if en is None:
+                dst[:] = values[part]
+            else:
+                dst_b = dst.view(np.uint8).reshape(len(dst), nb)
+                dst_b[en[part]] = values[part].view(np.uint8).reshape(len(dst), nb)[en[part]]
+
+# ======================================================================
+# Memory mapped backend
+# ======================================================================
+class MmapBackend:
+    """Address space of the IPIF mapped from a file
+    Keyword arguments:
+    path -- device file (e.g. UIO device or /dev/mem) or regular file
+    words -- number of words to map (num_reg + memory words, see mem_words())
+    data_width -- 32 or 64
+    offset -- offset of the IPIF in the file in bytes (multiple of the page size)
+    writable -- map for reading and writing (False: read only)"""
+    def __init__(self, path, words, data_width = 32, offset = 0, writable = True):
+        self.dtype = word_dtype(data_width)
+        size = words * self.dtype.itemsize
+        with open(path, "r+b" if writable else "rb") as fh:
+            self.map = mmap.mmap(fh.fileno(), size, offset=offset,
+                                 access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self.words = np.frombuffer(self.map, dtype=self.dtype)
+        self.accesses = 0
+
+    def close(self):
+        self.words = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass                            # views still in use, unmapped when they are released
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self, first, n):
+        """Copy of n words starting at word first"""
+        self.accesses += 1
+        return self.words[first:first + n].copy()
+
+    def write(self, first, values):
+        """Write words starting at word first"""
+        self.accesses += 1
+        values = np.asarray(values).astype(self.dtype).reshape(-1)
+        self.words[first:first + len(values)] = values
+
+# ======================================================================
+# Register access
+# ======================================================================
+class RegisterMap:
+    """Batched access to the registers and the memory window of an IPIF
+    Keyword arguments:
+    backend -- IpifModel, MmapBackend or any object with read(first, n) and write(first, values)
+    num_reg, use_mem -- generics of the entity (num_reg_g, use_mem_g)
+    data_width -- 32 or 64 (see DATA_WIDTH)
+    read_only -- registers with constant content (e.g. version), read once and then served from the cache
+    volatile -- registers with read side effects (o_reg_rd used by the IP, e.g. FIFO pop), only read when requested
+    max_gap -- maximum number of unrequested registers read to merge two blocks (None: no limit)
+    names -- optional dict of register names to indices"""
+    def __init__(self, backend, num_reg = 32, use_mem = True, data_width = 32, read_only = (), volatile = (),
+                 max_gap = None, names = None):
+        check_generics(num_reg, use_mem)
+        self.dtype = word_dtype(data_width)
+        self.backend = backend
+        self.num_reg = num_reg
+        self.use_mem = use_mem
+        self.read_only = np.zeros(num_reg, dtype=bool)
+        self.volatile = np.zeros(num_reg, dtype=bool)
+        self.names = dict(names or {})
+        self.read_only[self.index(list(read_only))] = True
+        self.volatile[self.index(list(volatile))] = True
+        self.max_gap = max_gap
+        self.invalidate()
+
+    def index(self, regs):
+        """Register indices (array) of register names or indices"""
+        idx = np.array([self.names[r] if isinstance(r, str) else r for r in np.atleast_1d(regs)], dtype=np.int64)
+        if ((idx < 0) | (idx >= self.num_reg)).any():
+            raise ValueError("register index out of range (num_reg = {})".format(self.num_reg))
+        return idx
+
+    def blocks(self, regs):
+        """Contiguous blocks (first, n) covering the sorted unique registers regs"""
+        if len(regs) == 0:
+            return []
+        # a gap can be bridged if it is short enough and contains no volatile register
+        vol = np.concatenate(([0], np.cumsum(self.volatile)))
+        gap = regs[1:] - regs[:-1] - 1
+        split = vol[regs[1:]] - vol[regs[:-1] + 1] > 0
+        if self.max_gap is not None:
+            split |= gap > self.max_gap
+        starts = np.concatenate(([0], np.flatnonzero(split) + 1))
+        ends = np.concatenate((starts[1:], [len(regs)])) - 1
+        return [(int(regs[s]), int(regs[e] - regs[s] + 1)) for s, e in zip(starts, ends)]
+
+    def read(self, regs):
+        """Values of the registers (names or indices) in the given order, one backend read per block"""
+        idx = self.index(regs)
+        todo = np.unique(idx[~self.cached[idx]])
+        for first, n in self.blocks(todo):
+            self.values[first:first + n] = self.backend.read(first, n)
+            self.cached[first:first + n] |= self.read_only[first:first + n]
+        res = self.values[idx]
+        return res if np.ndim(regs) else res[0]
+
+    def write(self, regs, values):
+        """Write registers (names or indices), one backend write per contiguous run (the last value of a
+        register given several times is written)"""
+        idx = self.index(regs)
+        values = np.broadcast_to(np.asarray(values), idx.shape)
+        if self.read_only[idx].any():
+            raise ValueError("write to read only register {}".format(int(idx[self.read_only[idx]][0])))
+        last = dict(zip(idx.tolist(), values.tolist()))
+        if not last:
+            return
+        regs = np.array(sorted(last), dtype=np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(regs) != 1) + 1))
+        for s, e in zip(starts, np.concatenate((starts[1:], [len(regs)]))):
+            self.backend.write(int(regs[s]), [last[r] for r in regs[s:e].tolist()])
+
+    def __getitem__(self, reg):
+        return self.read(reg)
+
+    def __setitem__(self, reg, value):
+        self.write(reg, value)
+
+    def invalidate(self):
+        """Clear the cache of the read only registers (e.g. after loading a new bitstream)"""
+        self.values = np.zeros(self.num_reg, dtype=self.dtype)     # last values read
+        self.cached = np.zeros(self.num_reg, dtype=bool)
+
+    def mem_read(self, addr, n):
+        """Read n words of the memory window starting at word addr (o_mem_addr / bytes per word)"""
+        if not self.use_mem:
+            raise ValueError("no memory window (use_mem = False)")
+        return self.backend.read(self.num_reg + addr, n)
+
+    def mem_write(self, addr, values):
+        """Write words to the memory window starting at word addr"""
+        if not self.use_mem:
+            raise ValueError("no memory window (use_mem = False)")
+        self.backend.write(self.num_reg + addr, values)
@@ -0,0 +1,158 @@
+##############################################################################
+# Bit-true model of psi_common_dyn_sft
+#
+# The stages of the barrel shifter apply the parts of the shift value one
+# after the other. Shifting left (zero fill) or right (zero or sign fill)
+# in several steps gives the same result as shifting once by the sum, so
+# the model shifts every sample once by its total shift value with array
+# operations. Shift values with a stage part larger than width_g are
+# rejected (they are out of range in the RTL, simulation fails).
+#
+# Vectors up to 64 bits are integers (the width LSBs are used), wider
+# vectors are arrays of 64 bit words with shape (samples, words), word 0
+# containing the LSBs (see to_words/from_words).
+##############################################################################
+import numpy as np
+
+from .psi_common_math_pkg import log2ceil, from_sslv, from_uslv
+
+WORD = 64
+
+# ======================================================================
+# Multi-word vectors
+# ======================================================================
+def words(width):
+    """Number of 64 bit words of a vector"""
+    return (width + WORD - 1) // WORD
+
+def to_words(values, width):
+    """Array (samples, words) of uint64 from python integers (the width LSBs are used)"""
+    n = words(width)
+    m = (1 << width) - 1
+    return np.array([[((int(v) & m) >> (WORD * k)) & ((1 << WORD) - 1) for k in range(n)] for v in values],
+                    dtype=np.uint64).reshape(-1, n)
+
+def from_words(w):
+    """Python integers (unsigned bit patterns) from an array (samples, words)"""
+    return [sum(int(x) << (WORD * k) for k, x in enumerate(row)) for row in np.asarray(w)]
+
+def top_bits(width):
+    """Number of valid bits in the most significant word"""
+    return width - WORD * (words(width) - 1)
+
+def top_mask(width):
+    """Mask of the valid bits in the most significant word"""
+    return np.uint64((1 << top_bits(width)) - 1)
+
+def shift_words(w, s, width, left):
+    """Logical shift of multi-word vectors by s (per sample, 0 <= s <= width)"""
+    n, nw = w.shape
+    q = (s // WORD)[:, None]
+    r = (s % WORD).astype(np.uint64)[:, None]
+    rc = np.where(r == 0, np.uint64(0), np.uint64(WORD) - r)
+    pad = np.zeros((n, 1), dtype=np.uint64)
+    wp = np.concatenate((pad, w, pad), axis=1)     # index k+1 is word k, 0 outside
+    k = np.arange(nw)[None, :]
+    rows = np.arange(n)[:, None]
+    def word(idx):
+        return wp[rows, np.clip(idx, -1, nw) + 1]
+    if left:
+        hi, lo = word(k - q), word(k - q - 1)
+        out = (hi << r) | np.where(r == 0, np.uint64(0), lo >> rc)
+    else:
+        lo, hi = word(k + q), word(k + q + 1)
+        out = (lo >> r) | np.where(r == 0, np.uint64(0), hi << rc)
+    out[:, -1] &= top_mask(width)
+    return out
+
+# ======================================================================
+# psi_common_dyn_sft
+# ======================================================================
+class DynSft:
+    """Model of psi_common_dyn_sft
+    Keyword arguments: the generics of the entity (direction_g, sel_bit_per_stage_g, max_shift_g,
+    width_g, sign_extend_g)"""
+    def __init__(self, direction = "LEFT", sel_bit_per_stage = 4, max_shift = 16, width = 32, sign_extend = True):
+        if direction not in ("LEFT", "RIGHT"):
+            raise ValueError("direction must be LEFT or RIGHT")
+        self.left = direction == "LEFT"
+        self.sign_extend = sign_extend and not self.left
+        self.sel_bits = sel_bit_per_stage
+        self.width = width
+        self.shift_bits = log2ceil(max_shift + 1)
+        self.stages = -(-self.shift_bits // sel_bit_per_stage)
+        self.latency = self.stages + 1      # input register and one register per stage
+        self.reset()
+
+    def reset(self):
+        self.pipe_dat = None                # content of the pipeline (latency samples)
+        self.pipe_vld = np.zeros(self.latency, dtype=bool)
+
+    def check_shift(self, shift):
+        """Shift values (shift_i'length LSBs), ValueError if a stage would shift by more than width_g"""
+        s = np.asarray(shift, dtype=np.int64) & ((1 << self.shift_bits) - 1)
+        sel = (1 << self.sel_bits) - 1
+        for stg in range(self.stages):
+            part = ((s >> (stg * self.sel_bits)) & sel) << (stg * self.sel_bits)
+            if (part > self.width).any():
+                raise ValueError("shift value {} exceeds width_g in stage {}".format(
+                                 int(s[np.argmax(part > self.width)] if np.ndim(s) else s), stg))
+        return s
+
+    def valid_shifts(self):
+        """All shift_i values supported by the RTL"""
+        s = np.arange(1 << self.shift_bits)
+        ok = np.ones(len(s), dtype=bool)
+        sel = (1 << self.sel_bits) - 1
+        for stg in range(self.stages):
+            ok &= (((s >> (stg * self.sel_bits)) & sel) << (stg * self.sel_bits)) <= self.width
+        return s[ok]
+
+    def shift(self, dat, shift):
+        """dat_o for every (dat_i, shift_i) pair
+        Vectors up to 64 bits: integers in, int64 out (signed for RIGHT with sign extension, else unsigned).
+        Wider vectors: uint64 arrays (samples, words) in and out."""
+        s = np.minimum(self.check_shift(shift), self.width)
+        if self.width > WORD:
+            w = np.array(dat, dtype=np.uint64).reshape(-1, words(self.width))
+            w[:, -1] &= top_mask(self.width)
+            s = np.broadcast_to(s, (len(w),))
+            if not self.sign_extend:
+                return shift_words(w, s, self.width, self.left)
+            # arithmetic shift: invert negative values, shift logically, invert again
+            neg = ((w[:, -1] >> np.uint64(top_bits(self.width) - 1)) & np.uint64(1)).astype(bool)
+            m = np.full(w.shape[1], np.uint64(2**WORD - 1))
+            m[-1] = top_mask(self.width)
+            w = np.where(neg[:, None], w ^ m, w)
+            out = shift_words(w, s, self.width, False)
+            return np.where(neg[:, None], out ^ m, out)
+        x = np.asarray(dat, dtype=np.int64)
+        if self.left:
+            r = np.where(s >= WORD, 0, x << np.minimum(s, WORD - 1))
+            return from_uslv(r, self.width)
+        if self.sign_extend:
+            return from_sslv(x, self.width) >> np.minimum(s, WORD - 1)
+        u = from_uslv(x, self.width).view(np.uint64) if np.ndim(x) else np.uint64(from_uslv(x, self.width))
+        return np.where(s >= WORD, 0, u >> np.minimum(s, WORD - 1).astype(np.uint64)).astype(np.int64)
+
+    def process(self, dat, shift, vld = None):
+        """Per cycle model, the inputs are given per clock cycle (after reset)
+        Returns tuple (vld_o, dat_o) per clock cycle, the outputs are delayed by latency cycles"""
+        res = self.shift(dat, shift)
+        n = len(res)
+        vld = np.ones(n, dtype=bool) if vld is None else np.broadcast_to(np.asarray(vld, dtype=bool), (n,))
+        if self.pipe_dat is None:
+            self.pipe_dat = np.zeros((self.latency,) + res.shape[1:], dtype=res.dtype)
+        dat_all = np.concatenate((self.pipe_dat, res))
+        vld_all = np.concatenate((self.pipe_vld, vld))
+        self.pipe_dat, self.pipe_vld = dat_all[n:], vld_all[n:]
+        return vld_all[:n], dat_all[:n]
+
+    def table(self, dat):
+        """Reference table for all valid shift values and the given input vectors
+        Returns tuple (dat_i, shift_i, dat_o) with one row per combination"""
+        dat = np.asarray(dat, dtype=np.uint64 if self.width > WORD else np.int64)
+        s = self.valid_shifts()
+        shifts = np.repeat(s, len(dat))
+        dats = np.tile(dat, (len(s),) + (1,) * (dat.ndim - 1))
+        return dats, shifts, self.shift(dats, shifts)
@@ -0,0 +1,259 @@
+##############################################################################
+# Throughput and latency models of psi_common_sync_fifo and psi_common_async_fifo
+#
+# The data is not modelled, but the handshaking and level outputs are cycle
+# accurate: the write and read pointers are updated like in the RTL, including
+# the latency of the level update (sync fifo) and of the gray code pointer
+# synchronization (async fifo: gray register, two synchronizer stages and the
+# gray to binary register).
+#
+# A word is written whenever it is offered and the write pointer W is below
+# the (delayed) read pointer plus depth_g. A word is read whenever out_rdy_i
+# is set and the read pointer R is below the (delayed) write pointer. Both
+# recursions have the form x[k+1] = min(x[k] + inc[k], bound[k]) with a non
+# decreasing bound, which is solved by a cumulative sum and a cumulative
+# minimum. As the pointer seen by the other side only depends on earlier
+# clock edges, the two recursions are solved alternately on a window of
+# cycles and the window is advanced up to where the pointers do not change
+# anymore. This gives the exact per cycle result with array operations only.
+#
+# Sizing: as long as in_lvl_o does not reach depth_g, a FIFO behaves exactly
+# like an infinitely deep one. Any depth above the max_in_lvl reported for a
+# very deep FIFO is therefore sufficient for the given traffic.
+##############################################################################
+import abc
+
+import numpy as np
+
+from .psi_common_math_pkg import log2, log2ceil
+
+WINDOW_MIN = 1 << 8
+WINDOW_MAX = 1 << 16
+
+# ======================================================================
+# Helpers
+# ======================================================================
+def limit(start, inc, bound):
+    """Solve x[k+1] = min(x[k] + inc[k], bound[k]) for a non decreasing bound and x[0] = start <= bound[0], returns x[1:]"""
+    c = np.cumsum(inc, dtype=np.int64)
+    return c + np.minimum(start, np.minimum.accumulate(bound - c))
+
+def bursts(n, burst, gap, phase = 0):
+    """Periodic traffic of n cycles: burst cycles '1' followed by gap cycles '0', starting phase cycles into the period"""
+    return np.arange(phase, phase + n) % (burst + gap) < burst
+
+def random_bursts(n, mean_burst, mean_gap, seed = None):
+    """Bursty traffic of n cycles: alternating '1' and '0' periods of geometrically distributed length
+    with the given mean lengths (in cycles), starting with a burst"""
+    if mean_gap == 0:
+        return np.ones(n, dtype=bool)
+    rng = np.random.default_rng(seed)
+    m = int(n / (mean_burst + mean_gap)) + 16
+    parts = []
+    total = 0
+    while total < n:
+        lengths = np.column_stack((rng.geometric(1 / mean_burst, m), rng.geometric(1 / mean_gap, m))).ravel()
+        parts.append(np.repeat(np.tile([True, False], m), lengths))
+        total += len(parts[-1])
+    return np.concatenate(parts)[:n]
+
+# ======================================================================
+# Simulation result
+# ======================================================================
+class FifoTrace:
+    """Per cycle signals of a FIFO simulation
+    Attributes:
+    in_vld, in_rdy, in_lvl -- in_vld_i, in_rdy_o and in_lvl_o per write clock cycle
+    out_vld, out_rdy, out_lvl -- out_vld_o, out_rdy_i and out_lvl_o per read clock cycle
+    wr_time, rd_time -- time of the clock edge writing / reading every word (only words read for rd_time)"""
+    def __init__(self, fifo, blocking, in_vld, in_rdy, in_lvl, out_vld, out_rdy, out_lvl, wr_time, rd_time, in_period, out_period):
+        self.fifo = fifo
+        self.blocking = blocking
+        self.in_vld, self.in_rdy, self.in_lvl = in_vld, in_rdy, in_lvl
+        self.out_vld, self.out_rdy, self.out_lvl = out_vld, out_rdy, out_lvl
+        self.wr_time, self.rd_time = wr_time, rd_time
+        self.in_period, self.out_period = in_period, out_period
+
+    def latency(self):
+        """Time from writing to reading for every word read"""
+        return self.rd_time - self.wr_time[:len(self.rd_time)]
+
+    def report(self):
+        """Statistics of the simulation as dictionary (times in the unit of the clock periods)
+        overflow_probability is the probability of in_rdy_o = '0' while in_vld_i = '1' (for dropping
+        sources the fraction of the words lost), lost also contains the words handshaked during reset"""
+        f = self.fifo
+        handshakes = int(np.count_nonzero(self.in_vld & self.in_rdy))
+        overflows = int(np.count_nonzero(self.in_vld & ~self.in_rdy))
+        offered = int(np.count_nonzero(self.in_vld))
+        written, read = len(self.wr_time), len(self.rd_time)
+        lat = self.latency()
+        ratio = lambda x, n: float(np.count_nonzero(x)) / n if n else 0.0
+        return {
+            "in_cycles": len(self.in_vld),
+            "out_cycles": len(self.out_vld),
+            "written": written,
+            "read": read,
+            "lost": handshakes - written + (0 if self.blocking else overflows),
+            "overflow_probability": overflows / offered if offered else 0.0,
+            "max_in_lvl": int(self.in_lvl.max()) if len(self.in_lvl) else 0,
+            "max_out_lvl": int(self.out_lvl.max()) if len(self.out_lvl) else 0,
+            "in_throughput": written / len(self.in_vld) if len(self.in_vld) else 0.0,
+            "out_throughput": read / len(self.out_vld) if len(self.out_vld) else 0.0,
+            "words_per_time": read / (len(self.out_vld) * self.out_period) if len(self.out_vld) else 0.0,
+            "latency_min": float(lat.min()) if read else None,
+            "latency_mean": float(lat.mean()) if read else None,
+            "latency_max": float(lat.max()) if read else None,
+            "in_afull_ratio": None if f.afull_lvl is None else ratio(self.in_lvl >= f.afull_lvl, len(self.in_lvl)),
+            "in_aempty_ratio": None if f.aempty_lvl is None else ratio(self.in_lvl <= f.aempty_lvl, len(self.in_lvl)),
+            "out_afull_ratio": None if f.afull_lvl is None else ratio(self.out_lvl >= f.afull_lvl, len(self.out_lvl)),
+            "out_aempty_ratio": None if f.aempty_lvl is None else ratio(self.out_lvl <= f.aempty_lvl, len(self.out_lvl)),
+        }
+
+# ======================================================================
+# FIFO models
+# ======================================================================
+class FifoModel(abc.ABC):
+    """Common part of SyncFifo and AsyncFifo
+    Keyword arguments:
+    depth -- depth_g
+    afull_lvl -- almost full level (None: almost full output not used)
+    aempty_lvl -- almost empty level (None: almost empty output not used)
+    rdy_rst_state -- rdy_rst_state_g, state of in_rdy_o during reset"""
+    in_period = out_period = 1.0
+
+    def __init__(self, depth, afull_lvl, aempty_lvl, rdy_rst_state):
+        self.depth = depth
+        self.afull_lvl = afull_lvl
+        self.aempty_lvl = aempty_lvl
+        self.rdy_rst_state = bool(rdy_rst_state)
+
+    @abc.abstractmethod
+    def edges(self, n):
+        """Clock edge times and pointer delays for n write clock cycles
+        Returns (t_in, t_out, cmap, wmap): times of the write edges 0..n and read edges 0..m (m read
+        clock cycles in the time of the n write cycles), the read pointer index (after that read edge)
+        seen by the write side in every write cycle and the write pointer index seen by the read side
+        in every read cycle (-1: before the first edge)"""
+
+    def out_cycles(self, n):
+        """Number of read clock cycles simulated for n write clock cycles"""
+        return len(self.edges(n)[1]) - 1
+
+    def solve(self, inc, bound, rdy, cmap, wmap):
+        """Write pointer W after write edges 0..len(inc) and read pointer R after read edges 0..len(rdy)
+        inc, bound -- write increment and bound per write cycle (read pointer bound not included)"""
+        nk, nj = len(inc), len(rdy)
+        ratio = max(1.0, self.in_period / self.out_period)
+        # element 0 is the pointer before the first edge, values are upper bounds until final
+        wp = np.zeros(nk + 2, dtype=np.int64)
+        wp[2:] = limit(0, inc, bound)
+        rp = np.zeros(nj + 2, dtype=np.int64)
+        rp[2:] = np.cumsum(rdy, dtype=np.int64)
+        fk = fj = 0     # W(0..fk) and R(0..fj) are final
+        span = WINDOW_MIN
+        while fk < nk or fj < nj:
+            ke = min(nk, fk + span)
+            je = min(nj, fj + int(span * ratio) + 1)
+            # write side from the read pointer
+            wp[fk+2:ke+2] = limit(wp[fk+1], inc[fk:ke], np.minimum(bound[fk:ke], rp[cmap[fk:ke] + 1] + self.depth))
+            fk_c = max(fk, min(ke, int(np.searchsorted(cmap, fj, side="right"))))
+            # read side from the write pointer
+            old = rp[fj+2:je+2].copy()
+            rp[fj+2:je+2] = limit(rp[fj+1], rdy[fj:je], wp[wmap[fj:je] + 1])
+            fj_c = max(fj, min(je, int(np.searchsorted(wmap, fk_c, side="right"))))
+            # pointers that did not change (and only depend on values computed in this pass) are final as well
+            diff = np.flatnonzero(rp[fj+2:je+2] != old)
+            same = diff[0] if len(diff) else je - fj
+            fj_a = fj + max(0, min(same, int(np.searchsorted(wmap, ke, side="right")) - fj))
+            fk_new = max(fk_c, min(ke, int(np.searchsorted(cmap, fj_a, side="right"))))
+            fj_new = max(fj_c, fj_a)
+            span = min(WINDOW_MAX, span * 2) if fk_new == ke else max(WINDOW_MIN, 4 * (fk_new - fk))
+            fk, fj = fk_new, fj_new
+        return wp, rp
+
+    def simulate(self, vld, rdy = True, blocking = False, reset_cycles = 0):
+        """Simulate the FIFO for a traffic profile
+        Keyword arguments:
+        vld -- per write clock cycle: in_vld_i of a source dropping the words not accepted or, for blocking
+               sources, the cycles a word arrives (the source queues words, in_vld_i is '1' while it has one)
+        rdy -- out_rdy_i per read clock cycle (scalar or at least out_cycles(len(vld)) elements)
+        blocking -- source type, see vld
+        reset_cycles -- number of write clock cycles the FIFO is in reset at the beginning
+        Returns a FifoTrace"""
+        vld = np.asarray(vld, dtype=bool)
+        n = len(vld)
+        t_in, t_out, cmap, wmap = self.edges(n)
+        m = len(t_out) - 1
+        rdy = np.asarray(rdy, dtype=bool)
+        rdy = np.broadcast_to(rdy, (m,)) if rdy.ndim == 0 else rdy[:m]
+        if len(rdy) < m:
+            raise ValueError("rdy must contain at least {} read clock cycles".format(m))
+        reset = min(reset_cycles, n)
+        in_rst_rdy = np.zeros(n, dtype=bool)
+        in_rst_rdy[:reset] = True
+        # bound of the write pointer independent of the read side
+        bound = np.full(n, np.iinfo(np.int64).max // 4, dtype=np.int64)
+        if blocking:
+            arrived = np.cumsum(vld, dtype=np.int64)
+            # words handshaked during reset are lost
+            dropped = limit(0, np.ones(reset, dtype=np.int64), arrived[:reset]) if self.rdy_rst_state else np.zeros(reset, dtype=np.int64)
+            bound = arrived - (dropped[-1] if reset else 0)
+            inc = np.ones(n, dtype=np.int64)
+        else:
+            inc = vld.astype(np.int64)
+        bound[:reset] = 0
+        wp, rp = self.solve(inc, bound, rdy, cmap, wmap)
+        w, r = wp[1:], rp[1:]
+        in_lvl = w[:n] - rp[cmap + 1]
+        out_lvl = wp[wmap + 1] - r[:m]
+        in_rdy = in_lvl != self.depth
+        if not self.rdy_rst_state:
+            in_rdy[:reset] = False
+        if blocking:
+            in_vld = w[:n] < bound
+            in_vld[:reset] = np.concatenate(([0], dropped[:-1])) < arrived[:reset] if reset else in_vld[:0]
+        else:
+            in_vld = vld
+        wr_time = t_in[np.searchsorted(w, np.arange(w[-1]), side="right")]
+        rd_time = t_out[np.searchsorted(r, np.arange(r[-1]), side="right")]
+        return FifoTrace(self, blocking, in_vld, in_rdy, in_lvl, out_lvl != 0, rdy, out_lvl, wr_time, rd_time,
+                         self.in_period, self.out_period)
+
+class SyncFifo(FifoModel):
+    """Model of psi_common_sync_fifo (one clock cycle of latency from write to out_vld_o and from read to in_rdy_o)"""
+    def __init__(self, depth = 32, afull_lvl = None, aempty_lvl = None, rdy_rst_state = 1):
+        super().__init__(depth, afull_lvl, aempty_lvl, rdy_rst_state)
+
+    def edges(self, n):
+        t = np.arange(n + 1, dtype=np.float64)
+        k = np.arange(n, dtype=np.int64)
+        return t, t, k - 1, k - 1
+
+class AsyncFifo(FifoModel):
+    """Model of psi_common_async_fifo
+    Keyword arguments (see FifoModel for the others):
+    in_period, out_period -- clock periods of in_clk_i and out_clk_i (any time unit)
+    out_phase -- time of the first out_clk_i edge (the first in_clk_i edge is at time 0)"""
+    def __init__(self, depth = 32, afull_lvl = None, aempty_lvl = None, rdy_rst_state = 1,
+                 in_period = 1.0, out_period = 1.0, out_phase = 0.0):
+        if log2(depth) != log2ceil(depth):
+            raise ValueError("only power of two depth is allowed")
+        super().__init__(depth, afull_lvl, aempty_lvl, rdy_rst_state)
+        self.in_period = in_period
+        self.out_period = out_period
+        self.out_phase = out_phase
+
+    def edges(self, n):
+        t_in = np.arange(n + 1, dtype=np.float64) * self.in_period
+        m = max(0, int(np.ceil((t_in[-1] - self.out_phase) / self.out_period)))
+        t_out = self.out_phase + np.arange(m + 1, dtype=np.float64) * self.out_period
+        m -= int(m > 0 and t_out[m-1] >= t_in[-1])
+        t_out = t_out[:m+1]
+        # the pointer of the other clock domain (after its last edge before) is sampled into the
+        # synchronizer and passed through two more registers, edge 0 is the last one in reset
+        cmap = np.full(n, -1, dtype=np.int64)
+        cmap[3:] = np.searchsorted(t_out, t_in[1:max(n-2, 1)], side="left") - 1
+        wmap = np.full(m, -1, dtype=np.int64)
+        wmap[4:] = np.searchsorted(t_in, t_out[1:max(m-3, 1)], side="left") - 1
+        return t_in, t_out, cmap, wmap
@@ -0,0 +1,122 @@
+##############################################################################
+# Python counterpart of hdl/psi_common_logic_pkg.vhd
+#
+# std_logic_vector values are represented by the integer of their bit
+# pattern (see psi_common_math_pkg.py), the vector length is given as
+# width (1 to 64 bits). All functions work element-wise on NumPy integer
+# arrays without loops over the elements: the bit-serial functions of the
+# package (gray_to_binary, ppc_or) are computed as parallel prefix with
+# log2(width) shift/xor resp. shift/or steps. The dtype of array inputs is
+# kept if it is wide enough for width (e.g. uint16 arrays for 16 bit
+# vectors), python integers give python integers (unsigned bit patterns).
+##############################################################################
+import numpy as np
+
+# ======================================================================
+# Helpers
+# ======================================================================
+def mask(width):
+    """Bit mask of width ones (python integer)"""
+    return (1 << width) - 1
+
+def as_bits(x, width):
+    """Array of the bit patterns (unsigned dtype wide enough for width) and the function
+    converting results back to the type of x"""
+    if not 1 <= width <= 64:
+        raise ValueError("width must be between 1 and 64 bits")
+    scalar = np.ndim(x) == 0 and not isinstance(x, np.ndarray)
+    a = np.asarray(x)
+    if a.dtype.kind not in "iu":
+        a = a.astype(np.int64)
+    if a.dtype.itemsize * 8 < width:
+        a = a.astype(np.int64 if a.dtype.kind == "i" else np.uint64)
+    dtype = a.dtype
+    udtype = np.dtype("u%d" % dtype.itemsize)
+    u = a.view(udtype) & udtype.type(mask(width))
+    def back(r):
+        return int(r) if scalar else np.asarray(r).view(dtype)
+    return u, back
+
+def shifts(width):
+    """Shift distances 1, 2, 4, ... below width (parallel prefix steps)"""
+    s = 1
+    while s < width:
+        yield s
+        s *= 2
+
+# ======================================================================
+# Functions of psi_common_logic_pkg
+# ======================================================================
+def zeros_vector(size):
+    return 0
+
+def ones_vector(size):
+    return mask(size)
+
+def partially_ones_vector(size, ones_nb):
+    """size bits with the ones_nb LSBs set"""
+    return mask(min(ones_nb, size))
+
+def shift_left(arg, bits, width, fill = 0):
+    """Shift a width bit vector left by bits (negative: right), the free bits are set to fill"""
+    if bits < 0:
+        return shift_right(arg, -bits, width, fill)
+    u, back = as_bits(arg, width)
+    t = u.dtype.type
+    if bits >= width:
+        return back(np.full_like(u, mask(width) if fill else 0))
+    r = (u << t(bits)) & t(mask(width))
+    if fill:
+        r |= t(mask(bits))
+    return back(r)
+
+def shift_right(arg, bits, width, fill = 0):
+    """Shift a width bit vector right by bits (negative: left), the free bits are set to fill"""
+    if bits < 0:
+        return shift_left(arg, -bits, width, fill)
+    u, back = as_bits(arg, width)
+    t = u.dtype.type
+    if bits >= width:
+        return back(np.full_like(u, mask(width) if fill else 0))
+    r = u >> t(bits)
+    if fill:
+        r |= t(mask(width) ^ mask(width - bits))
+    return back(r)
+
+def binary_to_gray(binary, width):
+    u, back = as_bits(binary, width)
+    return back(u ^ (u >> u.dtype.type(1)))
+
+def gray_to_binary(gray, width):
+    """Every bit is the xor of all gray bits at and above its position (prefix xor)"""
+    u, back = as_bits(gray, width)
+    for s in shifts(width):
+        u ^= u >> u.dtype.type(s)
+    return back(u)
+
+def ppc_or(inp, width):
+    """Parallel prefix or: every bit is the or of all input bits at and above its position"""
+    u, back = as_bits(inp, width)
+    for s in shifts(width):
+        u |= u >> u.dtype.type(s)
+    return back(u)
+
+def reduce_or(vec, width):
+    u, back = as_bits(vec, width)
+    r = u != 0
+    return bool(r) if np.ndim(r) == 0 else r
+
+def reduce_and(vec, width):
+    u, back = as_bits(vec, width)
+    r = u == u.dtype.type(mask(width))
+    return bool(r) if np.ndim(r) == 0 else r
+
+def invert_bit_order(inp, width):
+    """Reverse the order of the width bits"""
+    u, back = as_bits(inp, width)
+    v = u.astype(np.uint64)
+    for s, m in ((1, 0x5555555555555555), (2, 0x3333333333333333), (4, 0x0F0F0F0F0F0F0F0F)):
+        m = np.uint64(m)
+        v = ((v >> np.uint64(s)) & m) | ((v & m) << np.uint64(s))
+    v = v.byteswap() >> np.uint64(64 - width)
+    return back(v.astype(u.dtype))
@@ -0,0 +1,101 @@
+##############################################################################
+# Python counterpart of hdl/psi_common_math_pkg.vhd
+#
+# Integer functions take python integers and return python integers, given
+# NumPy integer arrays they work element-wise (without loops over the
+# elements). The slv conversions also work element-wise on NumPy integer
+# arrays (std_logic_vector values being represented by the integer of
+# their bit pattern).
+##############################################################################
+import numpy as np
+
+def bit_length(x):
+    """Number of bits of non-negative integers (element-wise int.bit_length())"""
+    if np.ndim(x) == 0 and not isinstance(x, np.ndarray):
+        return int(x).bit_length()
+    v = np.asarray(x).astype(np.uint64)
+    n = np.zeros(v.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        big = v >= np.uint64(1 << s)
+        n += big * s
+        v = np.where(big, v >> np.uint64(s), v)
+    return n + (v > 0)
+
+def log2(arg):
+    """Integer logarithm (rounded down), 0 for arg <= 1"""
+    if np.ndim(arg) == 0 and not isinstance(arg, np.ndarray):
+        return max(int(arg).bit_length() - 1, 0)
+    return np.maximum(bit_length(np.maximum(arg, 0)) - 1, 0)
+
+def log2ceil(arg):
+    """Number of bits required to represent arg values (0 to arg-1), 0 for arg = 0"""
+    if np.ndim(arg) == 0 and not isinstance(arg, np.ndarray):
+        if arg == 0:
+            return 0
+        return log2(arg * 2 - 1)
+    # log2(2*arg-1) = bit_length(arg-1) for arg >= 1
+    return bit_length(np.maximum(np.asarray(arg, dtype=np.int64) - 1, 0))
+
+def is_log2(arg):
+    """True if arg is a power of two (isLog2)"""
+    return log2(arg) == log2ceil(arg)
+
+def choose(s, t, f):
+    """t if s else f, element-wise for arrays"""
+    if np.ndim(s) == 0 and not isinstance(s, np.ndarray):
+        return t if s else f
+    return np.where(s, t, f)
+
+def count(a, v):
+    """Number of elements of a equal to v"""
+    return int(np.count_nonzero(np.asarray(a) == v))
+
+def count_bits(x, width, v = 1):
+    """Number of bits equal to v (0 or 1) in width bit vectors (count() of a std_logic_vector)"""
+    x = np.asarray(x, dtype=np.int64).view(np.uint64)
+    if width < 64:
+        x = x & np.uint64((1 << width) - 1)
+    if hasattr(np, "bitwise_count"):
+        ones = np.bitwise_count(x).astype(np.int64)
+    else:
+        x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        ones = ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+    r = ones if v else width - ones
+    return int(r) if np.ndim(r) == 0 else r
+
+def slv_bits(x):
+    """Bit patterns of an integer array as uint64 (two's complement for negative values)"""
+    a = np.asarray(x)
+    if a.dtype.kind == "u":
+        return a.astype(np.uint64)
+    return a.astype(np.int64).view(np.uint64)
+
+def to_uslv(x, width):
+    """Bit pattern of the unsigned vector of width bits (values are truncated to width bits)"""
+    return from_uslv(x, width)
+
+# The bit pattern of a signed vector is the same as the one of an unsigned vector of the same
+# width, both names are kept to match the VHDL package
+to_sslv = to_uslv
+
+def from_uslv(x, width):
+    """Value of the unsigned vector formed by the width LSBs of x (int64 arrays, uint64 arrays
+    for width = 64)"""
+    if np.ndim(x) == 0 and not isinstance(x, np.ndarray):
+        return int(x) & ((1 << width) - 1)
+    u = slv_bits(x)
+    if width >= 64:
+        return u
+    return (u & np.uint64((1 << width) - 1)).astype(np.int64)
+
+def from_sslv(x, width):
+    """Value of the signed vector formed by the width LSBs of x"""
+    if np.ndim(x) == 0 and not isinstance(x, np.ndarray):
+        v = int(x) & ((1 << width) - 1)
+        return v - (1 << width) if v >> (width - 1) else v
+    x = slv_bits(x).view(np.int64)
+    if width >= 64:
+        return x
+    return (x << np.int64(64 - width)) >> np.int64(64 - width)
@@ -0,0 +1,208 @@
+##############################################################################
+# Bit-true models of psi_common_find_min_max and psi_common_min_max_sum
+#
+# The models process input arrays of arbitrary length in chunks. Within a
+# chunk, the window boundaries are found with array operations (the chain
+# of counter restarts by pointer doubling) and the windows are reduced with
+# cumulative sums and reduceat. The state at the end of a chunk is carried
+# to the next one, so processing the input in pieces gives the same output
+# as processing it at once.
+#
+# Inputs are given per clock cycle (dat, vld, sync/raz), the outputs are the
+# values presented with vld_o = '1', in order.
+##############################################################################
+import numpy as np
+
+from .psi_common_math_pkg import log2ceil, from_sslv, from_uslv
+
+CHUNK_SIZE = 1 << 20
+
+# ======================================================================
+# Helpers
+# ======================================================================
+def to_width(x, width, signed):
+    """Interpret the width LSBs of x as signed or unsigned number (std_logic_vector conversion)"""
+    return from_sslv(x, width) if signed else from_uslv(x, width)
+
+def cycle_inputs(dat, *ctrl):
+    """Convert the per cycle inputs to arrays, control inputs default to '1' (None) or are broadcast"""
+    dat = np.asarray(dat, dtype=np.int64)
+    return [dat] + [np.broadcast_to(np.asarray(True if c is None else c, dtype=bool), dat.shape) for c in ctrl]
+
+def chunks(n):
+    for start in range(0, n, CHUNK_SIZE):
+        yield slice(start, min(start + CHUNK_SIZE, n))
+
+def window_extremes(values, valid, starts, mode):
+    """Minimum or maximum of the windows [starts[k], starts[k+1]), the first sample of a window is
+    always taken, the others only if valid. Returns (extreme before starts[0] or None, extremes of the windows)"""
+    fill = np.iinfo(np.int64).max if mode == "MIN" else np.iinfo(np.int64).min
+    reduce = np.minimum if mode == "MIN" else np.maximum
+    v = np.where(valid, values, fill)
+    v[starts] = values[starts]
+    first = starts[0] if len(starts) else len(v)
+    pre = reduce.reduce(v[:first]) if first else None
+    return pre, (reduce.reduceat(v, starts) if len(starts) else v[:0])
+
+# ======================================================================
+# psi_common_find_min_max
+# ======================================================================
+class FindMinMax:
+    """Model of psi_common_find_min_max
+    On a rising edge of raz_i, the minimum (maximum) of the samples since the
+    previous edge is output. The sample at the edge starts the new window,
+    independently of vld_i. The first window after reset also contains the
+    reset value 0."""
+    def __init__(self, width = 16, signed = True, mode = "MIN"):
+        if mode not in ("MIN", "MAX"):
+            raise ValueError("mode must be 'MIN' or 'MAX'")
+        self.width = width
+        self.signed = signed
+        self.mode = mode
+        self.reduce = np.minimum if mode == "MIN" else np.maximum
+        self.reset()
+
+    def reset(self):
+        self.data = 0       # data_s
+        self.raz_dff = False
+
+    def process_edges(self, dat, vld, edges):
+        """Process a chunk with the given raz edge positions, returns dat_o at the edges"""
+        pre, seg = window_extremes(dat, vld, edges, self.mode)
+        out = np.empty(len(edges), dtype=np.int64)
+        if len(edges):
+            out[0] = self.data if pre is None else self.reduce(self.data, pre)
+            out[1:] = seg[:-1]
+            self.data = int(seg[-1])
+        elif pre is not None:
+            self.data = int(self.reduce(self.data, pre))
+        return out
+
+    def process(self, dat, vld = None, raz = None):
+        """Process per cycle inputs, returns the dat_o values presented with vld_o = '1'"""
+        dat, vld, raz = cycle_inputs(to_width(dat, self.width, self.signed), vld, False if raz is None else raz)
+        out = []
+        for s in chunks(len(dat)):
+            r = raz[s]
+            prev = np.concatenate(([self.raz_dff], r[:-1]))
+            out.append(self.process_edges(dat[s], vld[s], np.flatnonzero(r & ~prev)))
+            self.raz_dff = bool(r[-1])
+        return np.concatenate(out) if out else np.empty(0, dtype=np.int64)
+
+# ======================================================================
+# psi_common_min_max_sum
+# ======================================================================
+class MinMaxSum:
+    """Model of psi_common_min_max_sum
+    Returns the sequence of (min_o, max_o, sum_o) presented with vld_o = '1'.
+    sum_o is the accumulator of the window, wrapped to accu_width bits."""
+    def __init__(self, clock_cycle = 128, signed_data = True, data_width = 16, accu_width = 63):
+        if not accu_width > log2ceil(clock_cycle) + data_width:
+            raise ValueError("mean vector length output is too small")
+        if data_width > 40:
+            raise ValueError("data_width above 40 bits is not supported by the model")
+        self.clock_cycle = clock_cycle
+        self.signed = signed_data
+        self.data_width = data_width
+        self.accu_width = accu_width
+        self.min = FindMinMax(data_width, signed_data, "MIN")
+        self.max = FindMinMax(data_width, signed_data, "MAX")
+        self.reset()
+
+    def reset(self):
+        self.min.reset()
+        self.max.reset()
+        self.counter = 0    # counter_s
+        self.accu = 0       # mean_dat_(u)sign_s
+        self.mean = 0       # mean_s
+        self.raz = False    # raz_s
+
+    def restarts(self, vld, sync):
+        """Cycles of a chunk at which the window counter restarts (sync_i or counter = clock_cycle-1)"""
+        n = len(vld)
+        valid_pos = np.flatnonzero(vld)
+        sync_pos = np.flatnonzero(sync)
+        # first restart from the counter state at the start of the chunk
+        need = self.clock_cycle - 1 - self.counter
+        first = 0 if need <= 0 else (valid_pos[need-1] + 1 if need <= len(valid_pos) else n)
+        if len(sync_pos):
+            first = min(first, sync_pos[0])
+        if first >= n:
+            return np.empty(0, dtype=np.int64)
+        if len(valid_pos) == n:
+            # all samples valid: every clock_cycle cycles from the first restart and from every sync
+            starts = np.union1d([first], sync_pos)
+            counts = -(-np.diff(np.append(starts, n)) // self.clock_cycle)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            return np.repeat(starts, counts) + offsets * self.clock_cycle
+        # next restart after a restart in cycle r: next sync or one cycle after the clock_cycle-1 th valid sample
+        nxt = np.full(n + 1, n, dtype=np.int64)
+        if self.clock_cycle == 1:
+            nxt[:n] = np.arange(1, n + 1)
+        else:
+            k = np.cumsum(vld) + (self.clock_cycle - 2)
+            ok = k < len(valid_pos)
+            nxt[:n][ok] = valid_pos[k[ok]] + 1
+        if len(sync_pos):
+            s = np.searchsorted(sync_pos, np.arange(n), side="right")
+            ok = s < len(sync_pos)
+            nxt[:n][ok] = np.minimum(nxt[:n][ok], sync_pos[s[ok]])
+        nxt = np.minimum(nxt, n)
+        # chain first, nxt(first), nxt(nxt(first)), ... by doubling
+        chain = np.array([first], dtype=np.int64)
+        jump = nxt
+        while chain[-1] < n:
+            chain = np.concatenate((chain, jump[chain]))
+            jump = jump[jump]
+        return chain[chain < n]
+
+    def wrap(self, x):
+        return to_width(x, self.accu_width, self.signed)
+
+    def process_chunk(self, dat, vld, sync):
+        n = len(dat)
+        rst = self.restarts(vld, sync)
+        # accumulator: the sample at a restart is always taken
+        w = np.where(vld, dat, 0)
+        w[rst] = dat[rst]
+        cs = np.concatenate(([0], np.cumsum(w)))
+        latched = np.empty(len(rst), dtype=np.int64)
+        if len(rst):
+            latched[0] = self.accu + cs[rst[0]]
+            latched[1:] = np.diff(cs[rst])
+            latched = self.wrap(latched)
+            self.accu = int(cs[n] - cs[rst[-1]])
+        else:
+            self.accu += int(cs[n])
+        self.accu = int(self.wrap(self.accu))
+        self.counter = int(np.count_nonzero(vld[rst[-1]+1:])) if len(rst) else self.counter + int(np.count_nonzero(vld))
+        # raz_s is set the cycle after a restart with vld_i or sync_i, the find_min_max entities react on its edges
+        raz = np.zeros(n + 1, dtype=bool)
+        raz[0] = self.raz
+        trig = rst[vld[rst] | sync[rst]]
+        raz[trig + 1] = True
+        prev = np.concatenate(([self.min.raz_dff], raz[:n]))
+        edges = np.flatnonzero(raz[:n] & ~prev[:n])
+        self.raz = bool(raz[n])
+        self.min.raz_dff = self.max.raz_dff = bool(raz[n-1])
+        mins = self.min.process_edges(dat, vld, edges)
+        maxs = self.max.process_edges(dat, vld, edges)
+        # sum_o is mean_s one cycle after the edge: the value latched by the last restart up to the edge
+        k = np.searchsorted(rst, edges, side="right") - 1
+        sums = np.where(k >= 0, latched[np.maximum(k, 0)] if len(rst) else 0, self.mean)
+        if len(rst):
+            self.mean = int(latched[-1])
+        return mins, maxs, sums
+
+    def process(self, dat, vld = None, sync = None):
+        """Process per cycle inputs
+        Keyword arguments:
+        dat -- input samples (integers, the data_width LSBs are used)
+        vld -- valid per cycle (default: all valid)
+        sync -- sync_i per cycle (default: '0')
+        Returns tuple of arrays (min_o, max_o, sum_o)"""
+        dat, vld, sync = cycle_inputs(to_width(dat, self.data_width, self.signed), vld, False if sync is None else sync)
+        out = [self.process_chunk(dat[s], vld[s], sync[s]) for s in chunks(len(dat))]
+        if not out:
+            return tuple(np.empty(0, dtype=np.int64) for _ in range(3))
+        return tuple(np.concatenate(o) for o in zip(*out))
@@ -0,0 +1,268 @@
+##############################################################################
+# Bit-true model of psi_common_ping_pong and host side buffer reader
+#
+# The RAM address of a sample is toggle & channel & sample, each field
+# being log2ceil() bits wide (channels and samples are rounded up to powers
+# of two). The read port always addresses the half not being written
+# (inverted toggle), so the memory seen on the bus is a 2D array
+# (2**log2ceil(ch_nb_g), 2**log2ceil(depth_g)) and the samples of the last
+# buffer are the NumPy view [:ch_nb_g, :depth_g] of it.
+#
+# PingPong gives the RAM content and the toggle (mem_irq_o) events for
+# inputs given per clock cycle. The write ordering of the RTL is modelled
+# exactly:
+# - PAR: a sample is taken one cycle after vld_i (dat_i must be stable in
+#   this cycle), vld_i pulses must be at least ch_nb_g + 1 cycles apart
+#   (the first one at least ch_nb_g - 1 cycles after reset). The first
+#   sample after reset toggles the buffer (first interrupt without data),
+#   the following buffers toggle with their first sample.
+# - TDM: the channel counter advances with vld_i, the last channel is only
+#   written if its sample directly follows the one of the channel before
+#   (otherwise it is skipped). The buffer toggles with the last channel of
+#   the last sample.
+#
+# PingPongReader maps the buffer (device file or any regular file) and
+# waits for the interrupts of a Linux UIO device.
+##############################################################################
+import os
+import mmap
+import select
+import struct
+
+import numpy as np
+
+from .psi_common_math_pkg import log2ceil, from_sslv, from_uslv
+
+CHUNK_SIZE = 1 << 20
+
+def chunks(n):
+    for start in range(0, n, CHUNK_SIZE):
+        yield slice(start, min(start + CHUNK_SIZE, n))
+
+def word_dtype(width, word_bytes = None):
+    """Little endian dtype of the memory words (smallest of 1, 2, 4, 8 bytes for word_bytes = None)"""
+    if word_bytes is None:
+        word_bytes = next(b for b in (1, 2, 4, 8) if 8 * b >= width)
+    if word_bytes not in (1, 2, 4, 8) or 8 * word_bytes < width:
+        raise ValueError("word_bytes must be 1, 2, 4 or 8 and hold width bits")
+    return np.dtype("<u{}".format(word_bytes))
+
+# ======================================================================
+# Model
+# ======================================================================
+class PingPong:
+    """Model of psi_common_ping_pong
+    Keyword arguments: the generics of the entity (ch_nb_g, depth_g, width_g, tdm_g)"""
+    def __init__(self, ch_nb = 16, depth = 1012, width = 16, tdm = False):
+        if tdm and ch_nb == 1:
+            raise ValueError("TDM mode requires more than one channel")
+        self.ch_nb = ch_nb
+        self.depth = depth
+        self.width = width
+        self.tdm = tdm
+        self.ch_size = 2**log2ceil(ch_nb)
+        self.spl_size = 2**log2ceil(depth)
+        self.reset()
+
+    def reset(self):
+        self.ram = np.zeros((2, self.ch_size, self.spl_size), dtype=word_dtype(self.width))
+        self.toggle = 0
+        self.sample = 0 if self.tdm else self.depth - 1
+        self.ch_cnt = 0                     # TDM channel counter
+        self.pending = False                # PAR: vld_i in the last cycle, dat_i of the next cycle is taken
+        # PAR: cycles since the last vld_i (spacing check), after reset the channel counter runs once
+        # as after a vld_i two cycles before the first cycle
+        self.last_vld = 1
+        self.startup = not self.tdm and self.ch_nb > 1
+        self.cycle = 0
+
+    def mem(self):
+        """RAM content seen on the read port (mem_addr_ch_i, mem_addr_spl_i), the buffer not written"""
+        return self.ram[1 - self.toggle]
+
+    def buffer(self):
+        """Samples of the last buffer (ch_nb, depth)"""
+        return self.mem()[:self.ch_nb, :self.depth]
+
+    def process(self, dat, vld):
+        """Inputs per clock cycle: dat_i (TDM: cycles, PAR: (cycles, ch_nb) with channel 0 in column 0)
+        and vld_i. Returns the cycles (counted from reset) of the vld_i pulses toggling the buffers
+        (mem_irq_o follows in the mem_clk_i domain)."""
+        dat = np.asarray(dat, dtype=np.int64)
+        vld = np.broadcast_to(np.asarray(vld, dtype=bool), dat.shape[:1])
+        toggles = [self.process_chunk(dat[c], vld[c]) for c in chunks(len(dat))]
+        return np.concatenate(toggles) if toggles else np.zeros(0, dtype=np.int64)
+
+    def write(self, ch, spl, half, dat):
+        """RAM writes in order (the last write to an address wins)"""
+        if len(dat) == 0:
+            return
+        addr = (half * self.ch_size + ch) * self.spl_size + spl
+        idx = np.arange(len(addr))
+        last = np.full(self.ram.size, -1)
+        np.maximum.at(last, addr, idx)
+        keep = last[addr] == idx
+        self.ram.reshape(-1)[addr[keep]] = from_uslv(dat[keep], self.width)
+
+    def slots(self, frames):
+        """Sample index and buffer half of the frames (samples counted from the current state)"""
+        pos = self.sample + frames + (0 if self.tdm else 1)
+        return pos % self.depth, (self.toggle + pos // self.depth) % 2
+
+    def count(self, frames):
+        """Update the sample counter and toggle for frames completed samples"""
+        pos = self.sample + frames
+        self.sample = int(pos % self.depth)
+        self.toggle = int((self.toggle + pos // self.depth) % 2)
+
+    def process_chunk(self, dat, vld):
+        n = len(vld)
+        base = self.cycle
+        self.cycle += n
+        if self.tdm:
+            return base + self.process_tdm(dat, vld)
+        return base + self.process_par(dat, vld)
+
+    def process_par(self, dat, vld):
+        # samples: dat_i one cycle after vld_i (pending vld_i of the previous chunk first)
+        n = len(vld)
+        if self.startup and n:
+            # channel counter run after reset: channels 1 to ch_nb - 1 of the sample at depth - 1 are
+            # written with channels 0 to ch_nb - 2 of dat_i in the first cycle
+            self.startup = False
+            ch = np.arange(1, self.ch_nb)
+            self.write(ch, np.full(len(ch), self.depth - 1), np.zeros(len(ch), dtype=np.int64),
+                       dat[0].reshape(self.ch_nb)[:-1])
+        strobes = np.flatnonzero(vld)
+        if self.ch_nb > 1 and len(strobes):
+            prev = np.concatenate(([-self.last_vld - 1], strobes))
+            if (np.diff(prev) < self.ch_nb + 1).any():
+                raise ValueError("vld_i pulses must be at least ch_nb + 1 cycles apart (the first one ch_nb - 1 "
+                                 "cycles after reset) in PAR mode")
+        self.last_vld = n - 1 - int(strobes[-1]) if len(strobes) else self.last_vld + n
+        times = np.concatenate(([-1], strobes)) if self.pending else strobes
+        self.pending = bool(n and vld[-1])
+        if self.pending:
+            times = times[:-1]
+        spl, half = self.slots(np.arange(len(times)))
+        words = dat[times + 1].reshape(len(times), self.ch_nb)
+        self.write(np.tile(np.arange(self.ch_nb), len(times)), np.repeat(spl, self.ch_nb),
+                   np.repeat(half, self.ch_nb), words.reshape(-1))
+        self.count(len(times))
+        # the buffer toggles with the samples written to index 0 (sample counter at depth - 1)
+        return times[spl == 0]
+
+    def process_tdm(self, dat, vld):
+        # frames of ch_nb - 1 samples plus the last channel if it directly follows the channel before
+        n = len(vld)
+        last_ch = self.ch_nb - 1
+        c0 = self.ch_cnt
+        strobes = np.flatnonzero(vld)
+        times = np.concatenate((np.arange(-c0, 0), strobes))     # channels 0 to c0-1 in previous chunks
+        m = len(times)
+        idx = np.arange(m)
+        if (np.diff(times) == 1).all():
+            # continuous stream: all frames complete
+            ch = idx % self.ch_nb
+        else:
+            cand = np.arange(m + 1) + last_ch
+            follows = np.zeros(m + 1, dtype=bool)
+            ok = cand < m
+            follows[ok] = times[cand[ok]] == times[cand[ok] - 1] + 1
+            nxt = np.minimum(cand + follows, m)
+            # chain of frame starts 0, nxt(0), nxt(nxt(0)), ... by doubling
+            chain = np.array([0], dtype=np.int64)
+            jump = nxt
+            while chain[-1] < m:
+                chain = np.concatenate((chain, jump[chain]))
+                jump = jump[jump]
+            starts = chain[chain < m]
+            ch = idx - starts[np.searchsorted(starts, idx, side="right") - 1]
+        # channel counter after the chunk
+        c = int(ch[-1]) + 1 if m else c0
+        if c > last_ch:
+            c = 0
+        t_last = int(times[-1]) if m else -1
+        if c == last_ch and t_last + 1 < n:
+            c = 0
+        self.ch_cnt = c
+        ch, times = ch[c0:], times[c0:]
+        # sample index: samples completed before each write
+        done = ch == last_ch
+        frames = np.cumsum(done) - done
+        spl, half = self.slots(frames)
+        self.write(ch, spl, half, dat[times])
+        self.count(int(done.sum()))
+        # the buffer toggles with the last channel of sample depth - 1
+        return times[done & (spl == self.depth - 1)]
+
+# ======================================================================
+# Reader
+# ======================================================================
+class PingPongReader:
+    """Reads the buffers of psi_common_ping_pong through a memory mapped file
+    Keyword arguments:
+    path -- device file (or regular file) containing the memory of the read port, one word per sample
+    ch_nb, depth, width -- generics of the entity (ch_nb_g, depth_g, width_g)
+    word_bytes -- bytes per memory word on the bus (None: smallest of 1, 2, 4, 8 holding width bits)
+    offset -- offset of the memory in the file in bytes (multiple of the page size)
+    uio -- Linux UIO device file of mem_irq_o (None: no interrupts, see wait())"""
+    def __init__(self, path, ch_nb, depth, width, word_bytes = None, offset = 0, uio = None):
+        self.ch_nb = ch_nb
+        self.depth = depth
+        self.width = width
+        self.dtype = word_dtype(width, word_bytes)
+        shape = (2**log2ceil(ch_nb), 2**log2ceil(depth))
+        size = shape[0] * shape[1] * self.dtype.itemsize
+        with open(path, "rb") as fh:
+            self.map = mmap.mmap(fh.fileno(), size, access=mmap.ACCESS_READ, offset=offset)
+        self.mem = np.frombuffer(self.map, dtype=self.dtype).reshape(shape)
+        self.uio = None if uio is None else os.open(uio, os.O_RDWR)
+        self.irq_count = None
+        self.missed = 0                     # interrupts missed (buffers overwritten before being read)
+
+    def close(self):
+        self.mem = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass                            # views still in use, unmapped when they are released
+        if self.uio is not None:
+            os.close(self.uio)
+            self.uio = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def view(self):
+        """Samples of the last buffer (ch_nb, depth) without copying. The content is valid until the
+        next interrupt, the buffer is overwritten one buffer period after it."""
+        return self.mem[:self.ch_nb, :self.depth]
+
+    def read(self, signed = False):
+        """Copy of the samples of the last buffer (ch_nb, depth) as int64 (signed: two's complement,
+        uint64 for unsigned 64 bit samples)"""
+        v = self.view().astype(np.int64)
+        return from_sslv(v, self.width) if signed else from_uslv(v, self.width)
+
+    def wait(self, timeout = None):
+        """Wait for the next interrupt (buffer swap), returns False on timeout.
+        Interrupts missed since the last call are counted in missed."""
+        if self.uio is None:
+            raise ValueError("no UIO device given, interrupts not available")
+        os.write(self.uio, struct.pack("=I", 1))                # (re-)enable the interrupt
+        if timeout is not None and not select.select([self.uio], [], [], timeout)[0]:
+            return False
+        count = struct.unpack("=I", os.read(self.uio, 4))[0]
+        if self.irq_count is not None:
+            self.missed += max(count - self.irq_count - 1, 0)
+        self.irq_count = count
+        return True
+
+    def buffers(self, timeout = None):
+        """Generator of the buffers (views, see view()) after each interrupt, stops on timeout"""
+        while self.wait(timeout):
+            yield self.view()
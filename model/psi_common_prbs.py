@@ -0,0 +1,147 @@
+##############################################################################
+# Bit-true model of psi_common_prbs
+#
+# The LFSR state after k enabled clock cycles is A^k * seed with A the
+# (width x width) transition matrix over GF(2). Sequences are generated in
+# blocks: the states of one block are mapped to the states of the next block
+# by the matrix A^blocksize, applied to all words at once through lookup
+# tables. Seeking to an arbitrary sequence index uses A^index computed by
+# repeated squaring.
+##############################################################################
+import numpy as np
+
+# Feedback masks of hdl/psi_common_prbs.vhd (poly_c), index is the width
+POLY = {2  : 0x00000003, 3  : 0x00000006, 4  : 0x0000000C, 5  : 0x00000014,
+        6  : 0x00000030, 7  : 0x00000060, 8  : 0x000000B8, 9  : 0x00000110,
+        10 : 0x00000240, 11 : 0x00000500, 12 : 0x00000829, 13 : 0x0000100D,
+        14 : 0x00002015, 15 : 0x00006000, 16 : 0x0000D008, 17 : 0x00012000,
+        18 : 0x00020400, 19 : 0x00040023, 20 : 0x00090000, 21 : 0x00140000,
+        22 : 0x00300000, 23 : 0x00420000, 24 : 0x00E10000, 25 : 0x01200000,
+        26 : 0x02000023, 27 : 0x04000013, 28 : 0x09000000, 29 : 0x14000000,
+        30 : 0x20000029, 31 : 0x48000000, 32 : 0x80200003}
+
+BLOCK_SIZE = 1 << 16
+
+# ======================================================================
+# GF(2) matrices, stored as list of columns (column i = image of bit i)
+# ======================================================================
+def step_matrix(width):
+    """Transition matrix of one LFSR step: q <= q(width-2 downto 0) & xor(q and mask)"""
+    mask = POLY[width]
+    full = (1 << width) - 1
+    return [((1 << (i+1)) & full) | ((mask >> i) & 1) for i in range(width)]
+
+def mat_apply(m, v):
+    """Apply matrix m to the state v (integer)"""
+    r = 0
+    i = 0
+    while v:
+        if v & 1:
+            r ^= m[i]
+        v >>= 1
+        i += 1
+    return r
+
+def mat_mul(a, b):
+    """Matrix product a*b (b is applied first)"""
+    return [mat_apply(a, col) for col in b]
+
+def mat_pow(m, n):
+    """Matrix power m^n by repeated squaring"""
+    r = [1 << i for i in range(len(m))]
+    while n:
+        if n & 1:
+            r = mat_mul(m, r)
+        m = mat_mul(m, m)
+        n >>= 1
+    return r
+
+class MatLut:
+    """Matrix applied to arrays of states through lookup tables
+    The state is split into slices of at most 16 bits, each slice has a table
+    containing the images of all its values."""
+    def __init__(self, m):
+        width = len(m)
+        luts = -(-width // 16)
+        self.slice = -(-width // luts)
+        self.tables = []
+        values = np.arange(1 << self.slice, dtype=np.uint32)
+        for first in range(0, width, self.slice):
+            table = np.zeros(1 << self.slice, dtype=np.uint32)
+            for i, col in enumerate(m[first:first+self.slice]):
+                table ^= np.where((values >> i) & 1, np.uint32(col), np.uint32(0))
+            self.tables.append(table)
+
+    def apply(self, v, out = None):
+        mask = np.uint32((1 << self.slice) - 1)
+        out = np.take(self.tables[0], v & mask, out=out)
+        for k, table in enumerate(self.tables[1:], 1):
+            out ^= table[(v >> np.uint32(k * self.slice)) & mask]
+        return out
+
+# ======================================================================
+# Model
+# ======================================================================
+class Prbs:
+    """Model of psi_common_prbs
+    Word 0 of the sequence is the seed (dat_o after reset), word k is dat_o
+    after k valid input samples. The sequence repeats after 2^width-1 words,
+    a seed of 0 gives a constant 0 sequence (as in the HDL)."""
+    def __init__(self, width, seed):
+        if width not in POLY:
+            raise ValueError("width must be in range 2 to 32, got {}".format(width))
+        if not 0 <= seed < (1 << width):
+            raise ValueError("seed must be in range 0 to 2^width-1")
+        self.width = width
+        self.seed = seed
+        self.step = step_matrix(width)
+        self.period = (1 << width) - 1
+        self.index = 0
+        self.state = seed
+        self._first = None
+        self._next = None
+
+    def seek(self, index):
+        """Set the position to sequence index (0 = seed)"""
+        self.index = index
+        self.state = mat_apply(mat_pow(self.step, index % self.period), self.seed)
+
+    def generate(self, n):
+        """Return the next n words of the sequence (numpy uint32 array) and advance"""
+        out = np.empty(n, dtype=np.uint32)
+        if n == 0:
+            return out
+        if self._first is None:
+            # first block: doubling, states [0,s) mapped by A^s to [s,2s)
+            self._first = []
+            s = 1
+            while s < BLOCK_SIZE:
+                self._first.append(MatLut(mat_pow(self.step, s)))
+                s *= 2
+            self._next = MatLut(mat_pow(self.step, BLOCK_SIZE))
+        out[0] = self.state
+        s = 1
+        for lut in self._first:
+            if s >= n:
+                break
+            m = min(s, n - s)
+            lut.apply(out[:m], out=out[s:s+m])
+            s += m
+        # further blocks from the previous block
+        for start in range(BLOCK_SIZE, n, BLOCK_SIZE):
+            m = min(BLOCK_SIZE, n - start)
+            self._next.apply(out[start-BLOCK_SIZE:start-BLOCK_SIZE+m], out=out[start:start+m])
+        self.index += n
+        self.state = mat_apply(self.step, int(out[-1]))
+        return out
+
+    def skip(self, n):
+        """Advance by n words without generating them"""
+        self.seek(self.index + n)
+
+def prbs(width, seed, n, start = 0):
+    """n words of the PRBS sequence of the given width and seed, starting at sequence index start"""
+    p = Prbs(width, seed)
+    if start:
+        p.seek(start)
+    return p.generate(n)
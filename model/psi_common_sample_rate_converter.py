@@ -0,0 +1,101 @@
+##############################################################################
+# Bit-true model of psi_common_sample_rate_converter
+#
+# Two views of the entity are provided:
+# - SampleRateConverter.process_cycles() takes dat_i/vld_i per clock cycle
+#   and returns dat_o/vld_o per clock cycle (cycle accurate, the state is
+#   carried between calls)
+# - resample() takes the valid input samples only and returns the output
+#   samples, assuming a regular input rate of one sample every
+#   clk_to_vld_ratio clock cycles
+# Both are computed with array operations, without a loop over clock cycles.
+##############################################################################
+import numpy as np
+
+CHUNK_SIZE = 1 << 22
+
+def forward_fill(n, pos, values, initial):
+    """Array of length n holding values[k] from index pos[k] on (pos increasing), initial before pos[0]"""
+    idx = np.searchsorted(pos, np.arange(n), side="right") - 1
+    out = np.asarray(values)[np.maximum(idx, 0)] if len(pos) else np.zeros(n, dtype=np.int64)
+    return np.where(idx >= 0, out, initial)
+
+class SampleRateConverter:
+    """Cycle accurate model of psi_common_sample_rate_converter
+    DOWN: every rate-th valid input sample is output.
+    UP: vld_o pulses every clk_to_vld_ratio/rate+1 clock cycles (free running,
+    integer division), dat_o is the sample captured on the last rising edge
+    of vld_i. If clk_to_vld_ratio = rate, dat_i is forwarded every cycle."""
+    def __init__(self, rate = 2, mode = "DOWN", length = 16, clk_to_vld_ratio = 10):
+        if mode not in ("DOWN", "UP"):
+            raise ValueError("mode must be 'DOWN' or 'UP'")
+        self.rate = rate
+        self.mode = mode
+        self.length = length
+        self.clk_to_vld_ratio = clk_to_vld_ratio
+        self.period = clk_to_vld_ratio // rate + 1
+        self.out_count = 0      # vld_out_count_s, not affected by the reset
+        self.reset()
+
+    def reset(self):
+        self.sample_count = 0   # sample_count_s
+        self.dat = 0            # dat_s
+        self.sample = 0         # sample_s
+        self.vld_dff = False    # vdl_dff_s
+
+    def process_cycles(self, dat, vld):
+        """Process dat_i/vld_i per clock cycle
+        Returns tuple (dat_o, vld_o) per clock cycle, element t being the output
+        after the rising clock edge at which element t of the inputs is sampled"""
+        dat = np.asarray(dat)
+        vld = np.broadcast_to(np.asarray(vld, dtype=bool), dat.shape)
+        n = len(dat)
+        if self.mode == "DOWN":
+            pos = np.flatnonzero(vld)
+            take = pos[(self.sample_count + np.arange(len(pos))) % self.rate == self.rate - 1]
+            vld_o = np.zeros(n, dtype=bool)
+            vld_o[take] = True
+            dat_o = forward_fill(n, take, dat[take], self.dat)
+            self.sample_count = (self.sample_count + len(pos)) % self.rate
+        elif self.clk_to_vld_ratio == self.rate:
+            vld_o = np.ones(n, dtype=bool)
+            dat_o = dat.copy()
+        else:
+            prev = np.concatenate(([self.vld_dff], vld[:-1]))
+            edges = np.flatnonzero(vld & ~prev)
+            # dat_s gets the sample_s of before the edge, captures become visible one cycle later
+            dat_o = forward_fill(n, edges + 1, dat[edges], self.sample)
+            vld_o = (self.out_count - np.arange(n)) % self.period == 0
+            if len(edges):
+                self.sample = dat[edges[-1]]
+            self.vld_dff = bool(vld[-1]) if n else self.vld_dff
+            self.out_count = (self.out_count - n) % self.period
+        if n:
+            self.dat = dat_o[-1]
+        return dat_o, vld_o
+
+def resample(x, rate, mode = "DOWN", clk_to_vld_ratio = 10, phase = 0):
+    """Output samples of psi_common_sample_rate_converter for the input samples x
+    The input samples are assumed to arrive as single cycle vld_i pulses every
+    clk_to_vld_ratio clock cycles, the first one phase clock cycles after the
+    reset (UP mode only, the output strobe is free running from the reset).
+    For clk_to_vld_ratio = rate, dat_i is assumed to be held between samples.
+    Returns the samples output with vld_o = '1' up to the arrival time of the
+    sample after the last one"""
+    x = np.asarray(x)
+    if mode == "DOWN":
+        return x[rate-1::rate]
+    if clk_to_vld_ratio == rate:
+        return np.repeat(x, rate)
+    if clk_to_vld_ratio < 2:
+        raise ValueError("vld_i must be low between samples (clk_to_vld_ratio >= 2)")
+    period = clk_to_vld_ratio // rate + 1
+    n = -(-(phase + len(x) * clk_to_vld_ratio) // period)
+    out = np.zeros(n, dtype=x.dtype)
+    for start in range(0, n, CHUNK_SIZE):
+        t = np.arange(start, min(start + CHUNK_SIZE, n), dtype=np.int64) * period
+        # sample_s at the clock edge t: last input sample with edge before t
+        idx = (t - phase - 1) // clk_to_vld_ratio
+        ok = idx >= 0
+        out[start:start+len(t)][ok] = x[idx[ok]]
+    return out
@@ -0,0 +1,318 @@
+##############################################################################
+# Bit-true data ordering models of the TDM and width conversion entities
+# (psi_common_par_tdm, psi_common_par_tdm_cfg, psi_common_tdm_par,
+# psi_common_tdm_par_cfg, psi_common_tdm_mux, psi_common_wconv_n2xn and
+# psi_common_wconv_xn2n)
+#
+# The entities only reorder data, the models give the sequence of output
+# words for a sequence of input words (flow control and latency are not
+# modelled). Parallel words are 2D arrays (words, channels), channel 0
+# resp. the first input word being in the lowest bits (column 0). This is
+# also the memory layout of parallel words written little endian by a DMA,
+# so for channel widths of 8, 16, 32 or 64 bits a byte buffer is decoded
+# without copying (channels()) and the models return NumPy views of their
+# input wherever the RTL ordering allows it (packets of whole words, all
+# channels enabled). Words closed early by last_i contain the register
+# content of the previous words in the channels not written, like the RTL
+# (0 after reset).
+#
+# The entities collecting samples (TdmPar, TdmParCfg, TdmMux, WconvN2xn)
+# keep incomplete words across calls of process(), so a stream can be
+# decoded in chunks of arbitrary size (e.g. DMA buffers).
+##############################################################################
+import numpy as np
+
+from .psi_common_math_pkg import from_sslv
+
+CHUNK_SIZE = 1 << 20
+
+# ======================================================================
+# Byte buffers
+# ======================================================================
+def sample_dtype(width, signed = False):
+    """Little endian dtype of width bit samples, None if width is not 8, 16, 32 or 64"""
+    if width not in (8, 16, 32, 64):
+        return None
+    return np.dtype("<{}{}".format("i" if signed else "u", width // 8))
+
+def channels(buf, ch_width, ch_nb, signed = False):
+    """Channels (words, ch_nb) of the parallel words in a byte buffer (bytes, bytearray, memoryview,
+    mmap or uint8 array), channel 0 in the lowest bits of a word. The result is a view of the buffer
+    for ch_width 8, 16, 32 or 64, other widths are unpacked into an int64 array.
+    Incomplete words at the end of the buffer are ignored."""
+    word_bits = ch_width * ch_nb
+    if word_bits % 8:
+        raise ValueError("parallel words must be a multiple of 8 bits")
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    n = len(raw) // (word_bits // 8)
+    dtype = sample_dtype(ch_width, signed)
+    if dtype is not None:
+        return raw[:n * word_bits // 8].view(dtype).reshape(n, ch_nb)
+    if ch_width > 64:
+        raise ValueError("channels must be up to 64 bits wide")
+    # copy the words to 64 bit integers (aligned, one row per integer position), a channel spans
+    # at most two of them
+    word_bytes = word_bits // 8
+    rows = np.zeros((n, (word_bytes // 8 + 1) * 8), dtype=np.uint8)
+    rows[:, :word_bytes] = raw[:n * word_bytes].reshape(n, word_bytes)
+    q = np.ascontiguousarray(rows.view("<u8").T)
+    out = np.empty((ch_nb, n), dtype=np.int64)
+    for ch in range(ch_nb):
+        lo = ch * ch_width
+        i, r = lo // 64, lo % 64
+        v = q[i] >> np.uint64(r)
+        if r + ch_width > 64:
+            v |= q[i + 1] << np.uint64(64 - r)
+        v &= np.uint64((1 << ch_width) - 1)
+        out[ch] = from_sslv(v.view(np.int64), ch_width) if signed else v.view(np.int64)
+    return out.T
+
+def pack(chs, ch_width):
+    """Byte string of parallel words (inverse of channels()), e.g. to generate DMA buffers"""
+    chs = np.asarray(chs)
+    n, ch_nb = chs.shape
+    if (ch_width * ch_nb) % 8:
+        raise ValueError("parallel words must be a multiple of 8 bits")
+    dtype = sample_dtype(ch_width)
+    if dtype is not None:
+        return np.ascontiguousarray(chs).astype(dtype, copy=False).tobytes()
+    word_bytes = ch_width * ch_nb // 8
+    m = np.uint64((1 << ch_width) - 1)
+    q_nb = word_bytes // 8 + 1
+    q = np.zeros((n, q_nb), dtype="<u8")
+    for ch in range(ch_nb):
+        lo = ch * ch_width
+        i, r = lo // 64, lo % 64
+        v = chs[:, ch].astype(np.int64).view(np.uint64) & m
+        q[:, i] |= v << np.uint64(r)
+        if r + ch_width > 64:
+            q[:, i + 1] |= v >> np.uint64(64 - r)
+    return q.view(np.uint8)[:, :word_bytes].tobytes()
+
+# ======================================================================
+# Helpers
+# ======================================================================
+def samples(dat):
+    """Input samples as array, NumPy arrays (and views) are taken as they are"""
+    return dat if isinstance(dat, np.ndarray) else np.asarray(dat, dtype=np.int64)
+
+def chunks(n):
+    for start in range(0, n, CHUNK_SIZE):
+        yield slice(start, min(start + CHUNK_SIZE, n))
+
+def flags(f, n):
+    return np.zeros(n, dtype=bool) if f is None else np.broadcast_to(np.asarray(f, dtype=bool), (n,))
+
+class Collector:
+    """Collects samples into words of size samples, a word is closed when it is full or by last
+    (psi_common_tdm_par, psi_common_tdm_par_cfg and psi_common_wconv_n2xn). The register content
+    (channels not written since the last word) is kept across calls, as well as incomplete words."""
+    def __init__(self, size):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.reg = None                     # register content after the last closed word
+        self.tail = None                    # samples of the incomplete word (dat, last)
+
+    def collect(self, dat, last):
+        """Returns tuple (words (n, size), written (n, size), last per word)"""
+        dat = samples(dat)
+        n = len(dat)
+        last = None if last is None or not np.any(last) else flags(last, n)
+        if self.tail is not None:
+            dat = np.concatenate((self.tail[0], dat))
+            if last is not None or self.tail[1].any():
+                last = np.concatenate((self.tail[1], flags(last, n)))
+            self.tail = None
+        if self.reg is None:
+            self.reg = np.zeros(self.size, dtype=dat.dtype)
+        if last is None:
+            return self.collect_words(dat, np.zeros(0, dtype=np.int64))
+        res = [self.collect_words(dat[c], np.flatnonzero(last[c])) for c in chunks(len(dat))]
+        if len(res) == 1:
+            return res[0]
+        return tuple(np.concatenate(r) for r in zip(*res))
+
+    def collect_words(self, dat, ends):
+        """Collect the samples dat (following the incomplete word of the previous call) with last at
+        the positions ends"""
+        if self.tail is not None:
+            ends = np.concatenate((np.flatnonzero(self.tail[1]), ends + len(self.tail[0])))
+            dat = np.concatenate((self.tail[0], dat))
+            self.tail = None
+        size = self.size
+        n = len(dat)
+        # packets end with last, the last word of a packet is padded to size samples
+        start = int(ends[-1]) + 1 if len(ends) else 0
+        lens = np.diff(ends, prepend=-1)
+        pads = -lens % size
+        offs = np.concatenate(([0], np.cumsum(pads)))
+        used = start + (n - start) // size * size     # samples of complete words
+        if used < n:
+            self.tail = (dat[used:].copy(), np.zeros(n - used, dtype=bool))
+        words_nb = (used + int(offs[-1])) // size
+        word_last = np.zeros(words_nb, dtype=bool)
+        word_last[(ends + offs[:-1]) // size] = True
+        if offs[-1] == 0:
+            # packets of whole words: view of the input
+            words = dat[:used].reshape(-1, size)
+            written = np.ones(words.shape, dtype=bool)
+        else:
+            slot = np.arange(used) + np.repeat(offs, np.append(lens, used - start))
+            words = np.empty(words_nb * size, dtype=dat.dtype)
+            words[slot] = dat[:used]
+            written = np.zeros(words_nb * size, dtype=bool)
+            written[slot] = True
+            words, written = words.reshape(-1, size), written.reshape(-1, size)
+            # channels not written keep the value of the previous word: forward fill over the
+            # incomplete words and the complete words directly before them
+            part = ~written.all(axis=1)
+            sel = part.copy()
+            sel[:-1] |= part[1:]
+            rows = np.flatnonzero(sel)
+            w, wr = words[rows], written[rows]
+            src = np.maximum.accumulate(np.where(wr, np.arange(len(rows))[:, None], -1), axis=0)
+            cols = np.broadcast_to(np.arange(size), src.shape)
+            words[rows] = np.where(src >= 0, w[np.maximum(src, 0), cols], self.reg[None, :])
+        if words_nb:
+            self.reg = words[-1].copy()
+        return words, written, word_last
+
+# ======================================================================
+# Parallel to TDM
+# ======================================================================
+def par_tdm(par, last = None):
+    """Model of psi_common_par_tdm
+    Keyword arguments:
+    par -- parallel input words (words, ch_nb)
+    last -- last_i per input word (None: not used)
+    Returns tuple (dat_o, last_o) of the TDM samples, dat_o is a view of par for C-contiguous par"""
+    par = samples(par)
+    tdm = par.reshape(-1)
+    last_o = np.zeros(par.shape, dtype=bool)
+    last_o[:, -1] = flags(last, len(par))
+    return tdm, last_o.reshape(-1)
+
+def par_tdm_cfg(par, enabled_ch):
+    """Model of psi_common_par_tdm_cfg, only the enabled_ch lowest channels are played out
+    Keyword arguments:
+    par -- parallel input words (words, ch_nb)
+    enabled_ch -- enabled_ch_i
+    Returns tuple (dat_o, last_o) of the TDM samples (view of par if all channels are enabled)"""
+    par = samples(par)
+    if not 0 <= enabled_ch <= par.shape[1]:
+        raise ValueError("enabled_ch must be between 0 and ch_nb")
+    tdm = par[:, :enabled_ch].reshape(-1)
+    last_o = np.zeros((len(par), enabled_ch), dtype=bool)
+    if enabled_ch:
+        last_o[:, -1] = True
+    return tdm, last_o.reshape(-1)
+
+# ======================================================================
+# TDM to parallel
+# ======================================================================
+class TdmPar:
+    """Model of psi_common_tdm_par
+    Output words are returned when complete (ch_nb samples or tdm_last_i), par_keep_o marks the
+    channels written since the previous word."""
+    def __init__(self, ch_nb = 8):
+        self.ch_nb = ch_nb
+        self.collector = Collector(ch_nb)
+
+    def reset(self):
+        self.collector.reset()
+
+    def process(self, dat, last = None):
+        """Input samples (dat_i with tdm_last_i), returns tuple (dat_o (words, ch_nb), par_keep_o, par_last_o)
+        dat_o is a view of dat if no samples are left from the previous call and all packets are whole words"""
+        return self.collector.collect(dat, last)
+
+class TdmParCfg:
+    """Model of psi_common_tdm_par_cfg
+    The samples of enabled_ch channels form a word, last_i closes a word early (the RTL requires at
+    least one cycle without vld_i after last_i). The channels above enabled_ch are '0'."""
+    def __init__(self, ch_nb = 8, enabled_ch = None):
+        self.ch_nb = ch_nb
+        self.enabled_ch = ch_nb if enabled_ch is None else enabled_ch
+        if not 1 <= self.enabled_ch <= ch_nb:
+            raise ValueError("enabled_ch must be between 1 and ch_nb")
+        self.collector = Collector(self.enabled_ch)
+
+    def reset(self):
+        self.collector.reset()
+
+    def process(self, dat, last = None):
+        """Input samples (dat_i with last_i), returns dat_o (words, ch_nb)"""
+        words, _, _ = self.collector.collect(dat, last)
+        if self.enabled_ch == self.ch_nb:
+            return words
+        out = np.zeros((len(words), self.ch_nb), dtype=words.dtype)
+        out[:, :self.enabled_ch] = words
+        return out
+
+class TdmMux:
+    """Model of psi_common_tdm_mux
+    One sample (channel ch_sel) per complete TDM frame of ch_nb samples is output."""
+    def __init__(self, ch_nb = 8):
+        self.ch_nb = ch_nb
+        self.reset()
+
+    def reset(self):
+        self.tail = None                    # samples of the incomplete frame
+
+    def process(self, dat, ch_sel):
+        """Input samples (tdm_dat_i with tdm_vld_i = '1'), ch_sel_i as scalar or one value per frame
+        (frames completed by this call). Returns tdm_dat_o (view of dat for scalar ch_sel and no
+        samples left over from the previous call)"""
+        dat = samples(dat)
+        if self.tail is not None:
+            dat = np.concatenate((self.tail, dat))
+        frames = len(dat) // self.ch_nb
+        self.tail = dat[frames * self.ch_nb:].copy() if len(dat) % self.ch_nb else None
+        sel = np.asarray(ch_sel, dtype=np.int64)
+        if ((sel < 0) | (sel >= self.ch_nb)).any():
+            raise ValueError("ch_sel must be lower than ch_nb (no output for other values)")
+        if sel.ndim == 0:
+            return dat[int(sel):frames * self.ch_nb:self.ch_nb]
+        return dat[:frames * self.ch_nb].reshape(frames, self.ch_nb)[np.arange(frames), sel]
+
+# ======================================================================
+# Width conversion
+# ======================================================================
+class WconvN2xn:
+    """Model of psi_common_wconv_n2xn
+    ratio = width_out_g / width_in_g input words form an output word (first input word in the lowest
+    bits, column 0), last_i flushes an incomplete word. we_o marks the input words written."""
+    def __init__(self, ratio = 2):
+        self.ratio = ratio
+        self.collector = Collector(ratio)
+
+    def reset(self):
+        self.collector.reset()
+
+    def process(self, dat, last = None):
+        """Input words (dat_i with last_i), returns tuple (dat_o (words, ratio), we_o, last_o)
+        dat_o is a view of dat if no samples are left from the previous call and all packets are whole words"""
+        return self.collector.collect(dat, last)
+
+def wconv_xn2n(dat, we = None, last = None):
+    """Model of psi_common_wconv_xn2n
+    Keyword arguments:
+    dat -- input words (words, ratio), ratio = width_in_g / width_out_g, column 0 are the lowest bits
+    we -- we_i (words, ratio), None: all words enabled
+    last -- last_i per input word (None: not used)
+    Returns tuple (dat_o, last_o), dat_o is a view of dat if all words are enabled and dat is C-contiguous.
+    last_o is set for each enabled word with last_i whose next higher word is disabled (like the RTL)."""
+    dat = samples(dat)
+    last = flags(last, len(dat))
+    if we is not None:
+        we = np.asarray(we, dtype=bool)
+    if we is None or we.all():
+        last_o = np.zeros(dat.shape, dtype=bool)
+        last_o[:, -1] = last
+        return dat.reshape(-1), last_o.reshape(-1)
+    nxt = np.zeros(we.shape, dtype=bool)
+    nxt[:, :-1] = we[:, 1:]
+    last_o = we & ~nxt & last[:, None]
+    return dat[we], last_o[we]
@@ -0,0 +1,167 @@
+##############################################################################
+# Bit-true models of psi_common_trigger_analog and psi_common_trigger_digital
+#
+# Every input channel is evaluated as if it was the selected trigger source
+# (trg_anlg_src_cfg_i / trg_digital_source_cfg_i), which allows to see for
+# all channels at once which triggers a configuration would generate.
+#
+# The condition of every cycle (threshold crossing or digital edge) is
+# computed for all channels with array operations. The arm/disarm state
+# machine is then evaluated per channel only at the cycles where something
+# can happen (conditions, arm edges, external disarm). The input is
+# processed in chunks of cycles, so np.memmap / np.load(mmap_mode="r")
+# arrays of recorded data can be replayed without loading them.
+##############################################################################
+import abc
+
+import numpy as np
+
+from .psi_common_math_pkg import from_sslv, from_uslv
+
+CHUNK_SIZE = 1 << 20
+
+class TriggerBase(abc.ABC):
+    """Arm/disarm state machine common to the trigger entities
+    Keyword arguments:
+    mode -- trg_mode_cfg_i (0: continuous, 1: single)
+    edge -- trg_edge_cfg_i (bit 0: falling edge, bit 1: rising edge)"""
+    def __init__(self, mode = 0, edge = 2):
+        self.single = bool(mode & 1)
+        self.rising = bool(edge & 2)
+        self.falling = bool(edge & 1)
+        self.reset()
+
+    def reset(self):
+        self.cycle = 0          # absolute cycle number of the next input
+        self.armed = None       # TrgArmed per channel
+        self.trg = None         # OTrg per channel
+        self.inputs = None      # input registers per channel (entity specific)
+
+    @abc.abstractmethod
+    def conditions(self, chunk):
+        """Trigger condition per cycle and channel, (n, channels) boolean array"""
+
+    def run_continuous(self, cond, arm, k):
+        """Triggers of channel k in continuous mode (armed state only toggled by arm edges)"""
+        n = len(cond)
+        armed = ((np.cumsum(arm) - arm) % 2 == 1) ^ self.armed[k]
+        hit = np.flatnonzero(armed & cond) + 1
+        trig = hit[hit < n]
+        if self.trg[k]:
+            trig = np.concatenate(([0], trig))
+        self.trg[k] = bool(armed[-1] & cond[-1])
+        self.armed[k] = bool(armed[-1] ^ arm[-1])
+        return trig
+
+    def run_single(self, cond, arm, disarm, k):
+        """Triggers of channel k in single mode, evaluated only at event cycles"""
+        n = len(cond)
+        events = np.flatnonzero(cond | arm | disarm)
+        arm_only = np.flatnonzero(arm & ~disarm)
+        a, o = self.armed[k], self.trg[k]
+        trig = []
+        t = 0
+        while t < n:
+            if not o:
+                # nothing happens until an arm edge (disarmed) or any event (armed)
+                pos = arm_only if not a else events
+                i = np.searchsorted(pos, t)
+                if i == len(pos):
+                    break
+                t = int(pos[i])
+            else:
+                trig.append(t)
+            # one clock cycle of the state machine
+            a, o = (False if (o or disarm[t]) else a ^ bool(arm[t])), bool(a and cond[t])
+            t += 1
+        self.armed[k], self.trg[k] = a, o
+        return np.array(trig, dtype=np.int64)
+
+    def process(self, samples, arm = (0,), ext_disarm = ()):
+        """Replay input samples
+        Keyword arguments:
+        samples -- input per clock cycle, shape (cycles,) or (cycles, channels), may be memory mapped
+        arm -- absolute cycles with a rising edge of trg_arm_cfg_i (default: armed in the first cycle)
+        ext_disarm -- absolute cycles with ext_disarm_i = '1'
+        Returns absolute cycles with trig_o = '1', one array per channel (a single array for 1-d samples)"""
+        samples = np.asanyarray(samples)
+        one_channel = np.ndim(samples) == 1
+        samples = samples.reshape(-1, 1) if one_channel else samples
+        channels = samples.shape[1]
+        if self.armed is None:
+            self.armed = [False] * channels
+            self.trg = [False] * channels
+        arm = np.asarray(arm, dtype=np.int64)
+        ext_disarm = np.asarray(ext_disarm, dtype=np.int64)
+        result = [[] for _ in range(channels)]
+        for start in range(0, len(samples), CHUNK_SIZE):
+            chunk = np.asarray(samples[start:start+CHUNK_SIZE])
+            n = len(chunk)
+            cond = self.conditions(chunk)
+            arm_c = np.zeros(n, dtype=bool)
+            sel = arm[(arm >= self.cycle) & (arm < self.cycle + n)] - self.cycle
+            arm_c[sel] = True
+            disarm_c = np.zeros(n, dtype=bool)
+            sel = ext_disarm[(ext_disarm >= self.cycle) & (ext_disarm < self.cycle + n)] - self.cycle
+            disarm_c[sel] = True
+            for k in range(channels):
+                if self.single:
+                    trig = self.run_single(cond[:, k], arm_c, disarm_c, k)
+                else:
+                    trig = self.run_continuous(cond[:, k], arm_c, k)
+                result[k].append(trig + self.cycle)
+            self.cycle += n
+        result = [np.concatenate(r) if r else np.empty(0, dtype=np.int64) for r in result]
+        return result[0] if one_channel else result
+
+class TriggerAnalog(TriggerBase):
+    """Model of psi_common_trigger_analog
+    trig_o is set two clock cycles after the sample crossing the threshold
+    (rising: previous < threshold <= current, falling: previous > threshold >= current).
+    Samples are integers, the width LSBs are interpreted signed or unsigned."""
+    def __init__(self, width = 16, is_signed = True, mode = 0, edge = 2, threshold = 0):
+        self.width = width
+        self.is_signed = is_signed
+        self.threshold = int((from_sslv if is_signed else from_uslv)(threshold, width))
+        super().__init__(mode, edge)
+
+    def reset(self):
+        super().reset()
+        self.th_reg = 0         # RegAnalogTh, 0 after reset
+
+    def conditions(self, chunk):
+        x = np.asarray(chunk)
+        if not (x.dtype.kind == ("i" if self.is_signed else "u") and x.dtype.itemsize * 8 == self.width):
+            x = (from_sslv if self.is_signed else from_uslv)(x, self.width)
+        if self.inputs is None:
+            self.inputs = np.zeros((2, x.shape[1]), dtype=np.int64)    # RegAnalogValue_dff, RegAnalogValue
+        xe = np.concatenate((self.inputs.astype(x.dtype), x))
+        cond = self.crossings(xe[:-2], xe[1:-1], self.threshold)
+        cond[0] = self.crossings(xe[:1], xe[1:2], self.th_reg)[0]
+        self.inputs = xe[-2:].astype(np.int64)
+        self.th_reg = self.threshold
+        return cond
+
+    def crossings(self, prev, cur, th):
+        cond = np.zeros(cur.shape, dtype=bool)
+        if self.rising:
+            cond |= (prev < th) & (cur >= th)
+        if self.falling:
+            cond |= (prev > th) & (cur <= th)
+        return cond
+
+class TriggerDigital(TriggerBase):
+    """Model of psi_common_trigger_digital
+    trigger_o is set one clock cycle after the edge of the input."""
+    def conditions(self, chunk):
+        x = np.asarray(chunk).astype(bool)
+        if self.inputs is None:
+            self.inputs = np.zeros((1, x.shape[1]), dtype=bool)     # RegDigitalValue_dff
+        prev = np.concatenate((self.inputs, x[:-1]))
+        cond = np.zeros(x.shape, dtype=bool)
+        if self.rising:
+            cond |= ~prev & x
+        if self.falling:
+            cond |= prev & ~x
+        self.inputs = x[-1:]
+        return cond
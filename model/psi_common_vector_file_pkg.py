@@ -0,0 +1,241 @@
+##############################################################################
+# Python counterpart of testbench/psi_common_vector_file_pkg
+#
+# Test vector files are text files that can be read and written with
+# std.textio. Every line contains one vector, the columns are hexadecimal
+# numbers (two's complement for signed columns) of fixed width separated by
+# a single space:
+#
+#   # psi_common_vector_file: dat:16s vld:1u
+#   FFF0 1
+#   0012 0
+#
+# Lines starting with '#' are comments, the first comment line may describe
+# the columns (name:width followed by s for signed or u for unsigned). Empty
+# lines and lines starting with '#' or white space are skipped anywhere in
+# the file, like vec_readline does in VHDL. Digits 'X' or '-' mark don't
+# care bits in expected vectors, they are ignored by the VHDL checker. In
+# simulator dumps, 'X' marks U/X outputs (vec_hex) and never matches a
+# value that is not don't care.
+#
+# As all data lines have the same length, files are written from a character
+# array with tofile() and read through np.memmap, both in chunks of lines.
+# Files with comments or empty lines between the vectors are read with a
+# line scan into the same character array. Simulator dumps (vec_write in
+# VHDL, including CR LF line ends) are read the same way.
+##############################################################################
+import os
+
+import numpy as np
+
+from .psi_common_math_pkg import from_sslv
+
+CHUNK_SIZE = 1 << 20
+HEADER = "# psi_common_vector_file:"
+
+HEX_CHARS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+DONT_CARE = 16
+INVALID = 255
+HEX_VALUES = np.full(256, INVALID, dtype=np.uint8)
+HEX_VALUES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+HEX_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+HEX_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+HEX_VALUES[np.frombuffer(b"Xx-", dtype=np.uint8)] = DONT_CARE
+# first characters of lines skipped by the reader (comments, white space, empty lines)
+SKIP_LINE = b"# \t\r\n"
+SKIP_CHARS = np.frombuffer(SKIP_LINE, dtype=np.uint8)
+
+# ======================================================================
+# Helpers
+# ======================================================================
+def digits(width):
+    """Number of hex digits of a column"""
+    return (width + 3) // 4
+
+def column_format(widths, signed = False, names = None):
+    """Normalize the column description to lists (widths, signed, names)"""
+    widths = [int(w) for w in widths]
+    if any(w < 1 or w > 64 for w in widths):
+        raise ValueError("column widths must be between 1 and 64 bits")
+    signed = [bool(s) for s in (signed if np.ndim(signed) else [signed] * len(widths))]
+    names = list(names) if names is not None else ["c%d" % i for i in range(len(widths))]
+    if not len(signed) == len(names) == len(widths):
+        raise ValueError("widths, signed and names must have the same number of columns")
+    return widths, signed, names
+
+def header(widths, signed, names):
+    return HEADER + "".join(" %s:%d%s" % (n, w, "s" if s else "u") for n, w, s in zip(names, widths, signed))
+
+def parse_header(line):
+    """Column description (widths, signed, names) of a header line, None for other comments"""
+    if not line.startswith(HEADER):
+        return None
+    cols = [c.rpartition(":") for c in line[len(HEADER):].split()]
+    return [int(w[:-1]) for _, _, w in cols], [w[-1] == "s" for _, _, w in cols], [n for n, _, _ in cols]
+
+# ======================================================================
+# Writer
+# ======================================================================
+def write_vectors(path, columns, widths, signed = False, names = None, dont_care = None, comments = ()):
+    """Write a vector file
+    Keyword arguments:
+    path -- file name
+    columns -- sequence of integer arrays (one per column, all of the same length), the width LSBs are written
+    widths -- bits per column
+    signed -- column is signed (only stored in the header), bool or one per column
+    names -- column names (default: c0, c1, ...)
+    dont_care -- None or one bool array (or None) per column, True marks don't care vectors
+    comments -- additional comment lines written after the header"""
+    widths, signed, names = column_format(widths, signed, names)
+    if len(columns) != len(widths):
+        raise ValueError("number of columns does not match the number of widths")
+    n = len(columns[0]) if len(columns) else 0
+    if any(len(c) != n for c in columns):
+        raise ValueError("all columns must have the same length")
+    nd = [digits(w) for w in widths]
+    offs = np.cumsum([0] + [d + 1 for d in nd])
+    line_len = int(offs[-1])
+    with open(path, "wb") as f:
+        f.write((header(widths, signed, names) + "\n").encode())
+        for c in comments:
+            f.write(("# " + c + "\n").encode())
+        for start in range(0, n, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, n)
+            buf = np.empty((stop - start, line_len), dtype=np.uint8)
+            buf[:, offs[1:] - 1] = ord(" ")
+            buf[:, -1] = ord("\n")
+            for k, (w, d, o) in enumerate(zip(widths, nd, offs)):
+                v = np.asarray(columns[k][start:stop]).astype(np.int64).view(np.uint64)
+                if w < 64:
+                    v = v & np.uint64((1 << w) - 1)
+                for i in range(d):
+                    buf[:, o + i] = HEX_CHARS[(v >> np.uint64(4 * (d - 1 - i))) & np.uint64(0xF)]
+                if dont_care is not None and dont_care[k] is not None:
+                    dc = np.broadcast_to(np.asarray(dont_care[k], dtype=bool), (n,))[start:stop]
+                    buf[dc, o:o + d] = ord("X")
+            buf.tofile(f)
+
+# ======================================================================
+# Reader
+# ======================================================================
+class VectorFile:
+    """Memory mapped vector file
+    Keyword arguments:
+    path -- file name
+    widths, signed, names -- column description for files without header (e.g. simulator dumps)
+    Attributes:
+    widths, signed, names -- column description
+    n -- number of vectors"""
+    def __init__(self, path, widths = None, signed = False, names = None):
+        fmt = None
+        offset = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                line = raw.decode(errors="replace").rstrip()
+                if not line.startswith("#"):
+                    break
+                fmt = fmt or parse_header(line)
+                offset += len(raw)
+        if widths is not None:
+            fmt = (widths, signed, names)
+        if fmt is None:
+            raise ValueError("file has no column description, widths must be given")
+        self.widths, self.signed, self.names = column_format(*fmt)
+        nd = [digits(w) for w in self.widths]
+        self.offsets = np.cumsum([0] + [d + 1 for d in nd])[:-1]
+        self.digits = nd
+        data = np.memmap(path, dtype=np.uint8, mode="r", offset=offset) if os.path.getsize(path) > offset else np.empty(0, dtype=np.uint8)
+        # all lines have the same length, LF or CR LF
+        line_len = int(self.offsets[-1] + nd[-1])
+        line_len += 2 if len(data) > line_len and data[line_len] == ord("\r") else 1
+        self.data = None
+        if len(data) % line_len == 0:
+            rows = data.reshape(-1, line_len)
+            if len(rows) == 0 or ((rows[:, -1] == ord("\n")).all() and not np.isin(rows[:, 0], SKIP_CHARS).any()):
+                self.data = rows
+        if self.data is None:
+            self.data = self.scan(path, offset)
+        self.n = len(self.data)
+
+    @staticmethod
+    def scan(path, offset):
+        """Data lines (without line end) of a file with comments or empty lines between the vectors"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            lines = [l.rstrip(b"\r\n") for l in f]
+        lines = [l for l in lines if l and l[0] not in SKIP_LINE]
+        if len({len(l) for l in lines}) > 1:
+            raise ValueError("%s: data lines of different length" % path)
+        return np.frombuffer(b"".join(lines), dtype=np.uint8).reshape(len(lines), -1)
+
+    def index(self, column):
+        return self.names.index(column) if isinstance(column, str) else column
+
+    def bits(self, k, rows):
+        """Bit patterns (uint64, width LSBs) and don't care bits ('X'/'-' digits) of column k for a slice of lines"""
+        o, d, w = self.offsets[k], self.digits[k], self.widths[k]
+        nib = HEX_VALUES[self.data[rows, o:o + d]]
+        if (nib == INVALID).any():
+            line = rows.start + int(np.flatnonzero((nib == INVALID).any(axis=1))[0])
+            raise ValueError("invalid character in column %s of vector %d" % (self.names[k], line))
+        dc = nib == DONT_CARE
+        nib[dc] = 0
+        v = np.zeros(len(nib), dtype=np.uint64)
+        x = np.zeros(len(nib), dtype=np.uint64)
+        for i in range(d):
+            v = (v << np.uint64(4)) | nib[:, i]
+            x = (x << np.uint64(4)) | (dc[:, i].astype(np.uint64) * np.uint64(0xF))
+        if w < 64:
+            v &= np.uint64((1 << w) - 1)
+            x &= np.uint64((1 << w) - 1)
+        return v, x
+
+    def decode(self, k, rows):
+        """Values and don't care flags (any 'X'/'-' digit) of column k for a slice of lines"""
+        v, x = self.bits(k, rows)
+        v = v.view(np.int64)
+        return (from_sslv(v, self.widths[k]) if self.signed[k] else v), x != 0
+
+    def column(self, column, masked = False):
+        """Values of a column (index or name) as int64 array, with masked = True as masked array
+        with the don't care vectors masked"""
+        k = self.index(column)
+        parts = [self.decode(k, slice(s, min(s + CHUNK_SIZE, self.n))) for s in range(0, self.n, CHUNK_SIZE)]
+        v = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, dtype=np.int64)
+        if not masked:
+            return v
+        return np.ma.masked_array(v, np.concatenate([p[1] for p in parts]) if parts else np.empty(0, dtype=bool))
+
+    def columns(self, masked = False):
+        """All columns as dictionary name -> array"""
+        return {name: self.column(k, masked) for k, name in enumerate(self.names)}
+
+def read_vectors(path, widths = None, signed = False, names = None, masked = False):
+    """Read all columns of a vector file, dictionary name -> array (see VectorFile)"""
+    return VectorFile(path, widths, signed, names).columns(masked)
+
+def compare(expected, actual, columns = None):
+    """Vectorized comparison of two vector files (e.g. expected vectors and a simulator dump)
+    Keyword arguments:
+    expected, actual -- VectorFile or file name, the file actual is read with the column description of expected.
+                        Don't care digits in expected are ignored (like std_match in vec_check), 'X' digits in
+                        actual (U/X outputs) are mismatches unless expected is don't care
+    columns -- names of the columns to compare (default: all columns of expected)
+    Returns dictionary name -> indices of the mismatching vectors"""
+    expected = expected if isinstance(expected, VectorFile) else VectorFile(expected)
+    if not isinstance(actual, VectorFile):
+        actual = VectorFile(actual, expected.widths, expected.signed, expected.names)
+    if expected.n != actual.n:
+        raise ValueError("number of vectors differs (expected %d, actual %d)" % (expected.n, actual.n))
+    result = {}
+    for name in (columns or expected.names):
+        ke = expected.index(name)
+        ka = actual.index(name) if name in actual.names else ke
+        bad = []
+        for s in range(0, expected.n, CHUNK_SIZE):
+            rows = slice(s, min(s + CHUNK_SIZE, expected.n))
+            ve, xe = expected.bits(ke, rows)
+            va, xa = actual.bits(ka, rows)
+            bad.append(np.flatnonzero(((ve ^ va) | xa) & ~xe) + s)
+        result[name] = np.concatenate(bad) if bad else np.empty(0, dtype=np.int64)
+    return result
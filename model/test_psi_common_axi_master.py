@@ -0,0 +1,76 @@
+##############################################################################
+# Tests of the burst splitting of psi_common_axi_master.py (run with pytest
+# from the repository root)
+#
+# The expected bursts are the ones checked by tb_case_split and
+# tb_case_max_transact of psi_common_axi_master_simple_tb. The randomized
+# test compares with the burst loop of tb_case_split generalized to any
+# data width and axi_max_beats_g.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_axi_master import split_bursts, full_command, AxiMasterSimple, AxiMasterFull
+
+# generics of psi_common_axi_master_simple_tb (psi_common_axi_master_simple_tb_pkg)
+AXI_BYTES = 2
+MAX_BEATS = 16
+MAX_OPEN = 3
+
+def ref_bursts(addr, beats, axi_bytes, max_beats):
+    """Burst loop of tb_case_split: axi_max_beats_g, no burst over a 4k boundary, stop at the end"""
+    bursts = []
+    checked = 0
+    while checked < beats:
+        n = max_beats
+        if (addr + n * axi_bytes - 1) // 4096 != addr // 4096:
+            n = (4096 - addr % 4096) // axi_bytes
+        if checked + n > beats:
+            n = beats - checked
+        bursts.append((addr, n))
+        checked += n
+        addr += n * axi_bytes
+    return bursts
+
+def test_tb_case_split():
+    """Expected bursts of tb_case_split (the same for writes and reads)"""
+    cases = [((0x00020FFC, 4), [(0x00020FFC, 2), (0x00021000, 2)]),
+             ((0x00020000, MAX_BEATS + 2), [(0x00020000, MAX_BEATS), (0x00020000 + MAX_BEATS * 2, 2)]),
+             ((0x00020000, 2 * MAX_BEATS + 2), [(0x00020000, MAX_BEATS), (0x00020000 + MAX_BEATS * 2, MAX_BEATS),
+                                                (0x00020000 + MAX_BEATS * 2 * 2, 2)]),
+             ((0x00020F08, 4096), ref_bursts(0x00020F08, 4096, AXI_BYTES, MAX_BEATS))]
+    for (addr, beats), expected in cases:
+        assert split_bursts(addr, beats, AXI_BYTES, MAX_BEATS) == expected
+    # large transfer over 2*4k: 4096 beats in bursts of at most 16 beats, split at 0x21000 and 0x22000
+    bursts = split_bursts(0x00020F08, 4096, AXI_BYTES, MAX_BEATS)
+    assert sum(n for _, n in bursts) == 4096
+    assert [a for a, _ in bursts if a % 4096 == 0] == [0x21000, 0x22000]
+
+def test_tb_case_max_transact():
+    """Commands of tb_case_max_transact: one burst each (single beat resp. 8 beats)"""
+    master = AxiMasterSimple(16, MAX_BEATS, MAX_OPEN, 14)
+    for beats in (1, 8):
+        cmds = [(0x00001000 * i, beats) for i in range(MAX_OPEN + 1)]
+        assert master.bursts(cmds) == [(i, 0x00001000 * i, beats) for i in range(MAX_OPEN + 1)]
+
+@pytest.mark.parametrize("axi_bytes", [1, 2, 4, 8, 16, 32])
+def test_random(axi_bytes):
+    """Random addresses, sizes and axi_max_beats_g compared with the burst loop of tb_case_split"""
+    rng = np.random.default_rng(axi_bytes)
+    for _ in range(200):
+        max_beats = int(rng.choice([1, 2, 3, 16, 100, 256]))
+        addr = int(rng.integers(0, 2**30)) & ~(axi_bytes - 1)
+        beats = int(rng.integers(1, 3 * 4096 // axi_bytes))
+        bursts = split_bursts(addr + int(rng.integers(0, axi_bytes)), beats, axi_bytes, max_beats)
+        assert bursts == ref_bursts(addr, beats, axi_bytes, max_beats)
+        # psi_common_axi_master_full: all bytes of the command are covered by the beats
+        size = int(rng.integers(1, 10000))
+        first, n = full_command(addr + 3, size, axi_bytes)
+        assert first <= addr + 3 and first % axi_bytes == 0
+        assert first + (n - 1) * axi_bytes <= addr + 3 + size - 1 < first + n * axi_bytes
+    master = AxiMasterFull(8 * axi_bytes, 256, 8, 512, 8)
+    assert master.bursts([(0x1FFF, 2)]) == [(0, 0x2000 - axi_bytes, 1), (0, 0x2000, 1)]
+
+def test_address_wrap():
+    """Bursts wrap at the end of the address space (axi_addr_width_g)"""
+    assert split_bursts(0xFFFFFFF0, 16, 4, 256) == [(0xFFFFFFF0, 4), (0x00000000, 12)]
@@ -0,0 +1,113 @@
+##############################################################################
+# Tests of the register access of psi_common_axi_slave_ipif.py (run with
+# pytest from the repository root)
+#
+# The batching of RegisterMap is checked with the access counters of
+# IpifModel: accesses (backend calls) and rd_count/wr_count (o_reg_rd and
+# o_reg_wr pulses per register).
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_axi_slave_ipif import IpifModel, MmapBackend, RegisterMap, mem_words
+
+def regmap(num_reg = 16, **kwargs):
+    ip = IpifModel(num_reg, rst_val=range(100, 100 + num_reg))
+    return ip, RegisterMap(ip, num_reg, **kwargs)
+
+def test_blocks():
+    """Gaps are bridged unless they are longer than max_gap or contain a volatile register"""
+    regs = np.array([0, 1, 2, 5, 6, 10])
+    assert regmap()[1].blocks(regs) == [(0, 11)]
+    assert regmap(max_gap=2)[1].blocks(regs) == [(0, 7), (10, 1)]
+    assert regmap(max_gap=3)[1].blocks(regs) == [(0, 11)]
+    assert regmap(max_gap=0)[1].blocks(regs) == [(0, 3), (5, 2), (10, 1)]
+    assert regmap(volatile=[8])[1].blocks(regs) == [(0, 7), (10, 1)]
+    assert regmap(volatile=[3, 9])[1].blocks(regs) == [(0, 3), (5, 2), (10, 1)]
+    # requested volatile registers are read, also inside a block
+    assert regmap(volatile=[5])[1].blocks(regs) == [(0, 11)]
+    assert regmap()[1].blocks(np.zeros(0, dtype=np.int64)) == []
+
+def test_read_batching():
+    """One backend read per block, unrequested registers of bridged gaps are read once, volatile never"""
+    ip, rm = regmap(volatile=[7], max_gap=2)
+    ip.drive(3, 0x1234)
+    assert rm.read([4, 3, 0, 1, 9, 3]).tolist() == [104, 0x1234, 100, 101, 109, 0x1234]
+    assert ip.accesses == 2                             # blocks (0, 5) and (9, 1)
+    assert ip.rd_count.tolist() == [1, 1, 1, 1, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+    assert rm.read(7) == 107 and ip.rd_count[7] == 1 and ip.accesses == 3
+    assert rm[2] == 102 and ip.accesses == 4
+
+def test_read_only_cache():
+    """Read only registers are read once and served from the cache until invalidate()"""
+    ip, rm = regmap(read_only=["version"], names={"version": 0, "status": 1})
+    assert rm.read(["version", "status"]).tolist() == [100, 101]
+    ip.drive([0, 1], [200, 201])
+    assert rm.read(["version", "status"]).tolist() == [100, 201]
+    assert ip.rd_count[:2].tolist() == [1, 2] and ip.accesses == 2
+    assert rm["version"] == 100 and ip.accesses == 2
+    rm.invalidate()
+    assert rm["version"] == 200 and ip.rd_count[0] == 2
+    with pytest.raises(ValueError):
+        rm["version"] = 1
+    with pytest.raises(ValueError):
+        rm.read(16)
+
+def test_write():
+    """One backend write per contiguous run, the last value of a register wins"""
+    ip, rm = regmap()
+    rm.write([5, 2, 3, 5, 9], [1, 2, 3, 4, 5])
+    assert ip.accesses == 3                             # (2, 2), (5, 1), (9, 1)
+    assert ip.wr_count.tolist() == [0, 0, 1, 1, 0, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+    assert ip.reg_wdata[[2, 3, 5, 9]].tolist() == [2, 3, 4, 5]
+    rm[0] = 7
+    assert rm[0] == 7
+    rm.write([], [])
+    assert ip.accesses == 5
+
+@pytest.mark.parametrize("data_width", [32, 64])
+def test_write_strobes(data_width):
+    """s_axi_wstrb byte enables on a write crossing from the registers into the memory window"""
+    ip = IpifModel(4, rst_val=[0x11111111] * 4, data_width=data_width, addr_width=8)
+    nb = data_width // 8
+    assert len(ip.mem) == mem_words(4, True, data_width, 8) == 256 // nb - 4
+    ip.mem[:] = 0x22
+    values = np.array([0xA1A2A3A4, 0xB1B2B3B4, 0xC1C2C3C4], dtype=ip.dtype)
+    strb = np.zeros((3, nb), dtype=bool)
+    strb[0, 0] = strb[1, 1:] = strb[2, nb - 1] = True
+    ip.write(3, values, strb)
+    expected = []
+    for old, new, en in zip([0x11111111, 0x22, 0x22], values.tolist(), strb):
+        expected.append(sum(((new if e else old) >> (8 * b) & 0xFF) << (8 * b) for b, e in enumerate(en)))
+    assert ip.read(3, 3).tolist() == expected
+
+def test_decerr():
+    ip = IpifModel(8, use_mem=False)
+    rm = RegisterMap(ip, 8, use_mem=False)
+    with pytest.raises(ValueError):
+        ip.read(6, 3)
+    with pytest.raises(ValueError):
+        rm.mem_read(0, 1)
+    with pytest.raises(ValueError):
+        IpifModel(6)
+
+@pytest.mark.parametrize("data_width", [32, 64])
+def test_mmap_backend(tmp_path, data_width):
+    """Registers and memory window mapped from a regular file"""
+    num_reg = 8
+    words = num_reg + mem_words(num_reg, True, data_width, 10)
+    nb = data_width // 8
+    path = tmp_path / "ipif.bin"
+    path.write_bytes(bytes(range(256)) * (words * nb // 256))
+    with MmapBackend(str(path), words, data_width) as backend:
+        rm = RegisterMap(backend, num_reg, data_width=data_width, read_only=[0])
+        assert rm[0] == int.from_bytes(bytes(range(nb)), "little")
+        rm.write([1, 2], [5, 6])
+        rm.mem_write(3, [7, 8])
+        assert rm.read([1, 2]).tolist() == [5, 6]
+        assert rm.mem_read(3, 2).tolist() == [7, 8]
+        assert backend.accesses == 5
+    raw = np.fromfile(str(path), dtype="<u{}".format(nb))
+    assert raw[[1, 2, num_reg + 3, num_reg + 4]].tolist() == [5, 6, 7, 8]
+    with MmapBackend(str(path), words, data_width, writable=False) as backend:
+        assert RegisterMap(backend, num_reg, data_width=data_width).mem_read(3, 2).tolist() == [7, 8]
@@ -0,0 +1,112 @@
+##############################################################################
+# Comparison of psi_common_dyn_sft.py with a per stage translation of the
+# RTL on Python integers (run with pytest from the repository root)
+#
+# ref_shift applies the stages of p_comb one after the other (TempData_v
+# filled with the sign resp. zeros), ref_pipeline additionally executes the
+# Vld/Data/Shift registers clock edge by clock edge.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_dyn_sft import DynSft, WORD, to_words, from_words
+
+def ref_stage(data, sel, step, width, left, sign_extend):
+    """One stage of p_comb on the bit pattern data"""
+    mask = (1 << width) - 1
+    if left:
+        return (data << (sel * step)) & mask
+    if sign_extend and data >> (width - 1):
+        data -= 1 << width
+    return (data >> (sel * step)) & mask
+
+def ref_shift(data, shift, width, left, sign_extend, sel_bits, stages):
+    for stg in range(stages):
+        sel = (shift >> (stg * sel_bits)) & ((1 << sel_bits) - 1)
+        data = ref_stage(data, sel, 2**(stg * sel_bits), width, left, sign_extend)
+    return data
+
+def ref_pipeline(dat, shift, vld, width, left, sign_extend, sel_bits, stages):
+    """Vld/Data/Shift registers (reset to 0), returns (vld_o, dat_o) per cycle"""
+    r_vld, r_data, r_shift = [False] * (stages + 1), [0] * (stages + 1), [0] * (stages + 1)
+    out = []
+    for d, s, v in zip(dat, shift, vld):
+        out.append((r_vld[stages], r_data[stages]))
+        n_vld, n_data, n_shift = [bool(v)] + r_vld[:-1], [d] + r_data[:-1], [s] + r_shift[:-1]
+        for stg in range(stages):
+            sel = r_shift[stg] & ((1 << sel_bits) - 1)
+            n_data[stg + 1] = ref_stage(r_data[stg], sel, 2**(stg * sel_bits), width, left, sign_extend)
+            n_shift[stg + 1] = r_shift[stg] >> sel_bits
+        r_vld, r_data, r_shift = n_vld, n_data, n_shift
+    return out
+
+def model_in(m, patterns):
+    """Model input from bit patterns: integers (as int64) up to 64 bits, words above"""
+    if m.width > WORD:
+        return to_words(patterns, m.width)
+    return np.array([p - 2**64 if p >= 2**63 else p for p in patterns], dtype=np.int64)
+
+def model_out(m, res):
+    """Bit patterns of the model output"""
+    if m.width > WORD:
+        return from_words(res)
+    return [int(v) & ((1 << m.width) - 1) for v in res]
+
+CONFIGS = [(direction, sign_extend, sel_bits, width)
+           for direction in ("LEFT", "RIGHT") for sign_extend in (False, True)
+           for sel_bits in (1, 2, 3, 4) for width in (8, 17, 63, 64, 65, 100, 128, 130)]
+
+@pytest.mark.parametrize("direction, sign_extend, sel_bits, width", CONFIGS)
+def test_shift(direction, sign_extend, sel_bits, width):
+    """Random vectors (and the corner patterns) with random valid shift values"""
+    rng = np.random.default_rng(width * 16 + sel_bits * 4 + 2 * sign_extend + (direction == "LEFT"))
+    max_shift = int(rng.choice([1, width // 2, width]))
+    m = DynSft(direction, sel_bits, max_shift, width, sign_extend)
+    shifts = m.valid_shifts()
+    assert shifts.max() >= max_shift
+    n = 300
+    patterns = [int.from_bytes(rng.bytes((width + 7) // 8), "little") & ((1 << width) - 1) for _ in range(n)]
+    patterns[:4] = [0, (1 << width) - 1, 1 << (width - 1), 1]
+    shift = rng.choice(shifts, n)
+    ref = [ref_shift(p, int(s), width, m.left, m.sign_extend, sel_bits, m.stages) for p, s in zip(patterns, shift)]
+    assert model_out(m, m.shift(model_in(m, patterns), shift)) == ref
+    # sign of the integer outputs
+    if width < WORD:
+        res = m.shift(model_in(m, patterns), shift)
+        if m.sign_extend:
+            assert res.tolist() == [v - (1 << width) if v >> (width - 1) else v for v in ref]
+        else:
+            assert (res >= 0).all()
+
+@pytest.mark.parametrize("direction, sign_extend, width", [("LEFT", False, 12), ("RIGHT", True, 12),
+                                                           ("RIGHT", False, 80), ("RIGHT", True, 80)])
+def test_process(direction, sign_extend, width):
+    """Latency and vld_o of process() compared with the registers of the RTL, random chunk cuts"""
+    rng = np.random.default_rng(width)
+    m = DynSft(direction, 2, width - 1, width, sign_extend)
+    assert m.latency == m.stages + 1
+    n = 200
+    patterns = [int.from_bytes(rng.bytes((width + 7) // 8), "little") & ((1 << width) - 1) for _ in range(n)]
+    shift = rng.choice(m.valid_shifts(), n)
+    vld = rng.random(n) < 0.7
+    cuts = np.concatenate(([0], np.sort(rng.integers(0, n + 1, 3)), [n]))
+    res = [m.process(model_in(m, patterns[a:b]), shift[a:b], vld[a:b]) for a, b in zip(cuts[:-1], cuts[1:])]
+    vld_o = np.concatenate([v for v, _ in res]).tolist()
+    dat_o = model_out(m, np.concatenate([d for _, d in res]))
+    ref = ref_pipeline(patterns, shift.tolist(), vld, width, m.left, m.sign_extend, 2, m.stages)
+    assert vld_o == [v for v, _ in ref]
+    assert dat_o == [d for _, d in ref]
+
+def test_check_shift():
+    """Shift values with a stage part larger than width_g are rejected"""
+    m = DynSft("LEFT", 4, 47, 20)
+    # stage 1 part of 0x1F is 16 <= 20, of 0x2F 32 > 20
+    assert m.check_shift([0x1F, 20]).tolist() == [0x1F, 20]
+    assert 0x2F not in m.valid_shifts() and 0x1F in m.valid_shifts()
+    with pytest.raises(ValueError):
+        m.check_shift([3, 0x2F])
+    with pytest.raises(ValueError):
+        m.shift([1], 0x2F)
+    # stage 0 part larger than width_g
+    with pytest.raises(ValueError):
+        DynSft("RIGHT", 4, 15, 8).shift([1], 9)
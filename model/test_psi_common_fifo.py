@@ -0,0 +1,125 @@
+##############################################################################
+# Comparison of the FIFO models with per cycle translations of the RTL
+# (run with pytest from the repository root)
+#
+# The reference functions execute the clocked processes of
+# psi_common_sync_fifo and psi_common_async_fifo edge by edge (pointers as
+# unbounded integers, the gray coding does not change the values). Clock
+# edges at the same time sample the registers of the other domain before
+# the update, like in VHDL. The scenarios follow psi_common_async_fifo_tb
+# (in/out clock ratios, full/empty, continuous and bursty traffic).
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_fifo import SyncFifo, AsyncFifo, bursts, random_bursts
+
+def ref_sync_fifo(depth, vld, rdy):
+    """psi_common_sync_fifo, returns per cycle (in_rdy, in_lvl, out_vld, out_lvl)"""
+    wr_level = rd_level = 0
+    rd_up = wr_down = False
+    res = []
+    for v, r in zip(vld, rdy):
+        res.append((wr_level != depth, wr_level, rd_level > 0, rd_level))
+        nxt_wr_level, nxt_rd_level = wr_level, rd_level
+        nxt_rd_up = nxt_wr_down = False
+        if wr_level != depth and v:
+            nxt_rd_up = True
+            if not wr_down:
+                nxt_wr_level = wr_level + 1
+        elif wr_down:
+            nxt_wr_level = wr_level - 1
+        if rd_level != 0 and r:
+            nxt_wr_down = True
+            if not rd_up:
+                nxt_rd_level = rd_level - 1
+        elif rd_up:
+            nxt_rd_level = rd_level + 1
+        wr_level, rd_level, rd_up, wr_down = nxt_wr_level, nxt_rd_level, nxt_rd_up, nxt_wr_down
+    return [np.array(x) for x in zip(*res)]
+
+def ref_async_fifo(depth, vld, rdy, t_in, t_out):
+    """psi_common_async_fifo for the clock edges t_in / t_out (edge 0 in reset)
+    Returns (in_rdy, in_lvl) per write cycle and (out_vld, out_lvl) per read cycle"""
+    ri = dict(wr=0, wr_gray=0, rd_sync=0, rd_gray=0, rd=0)
+    ro = dict(rd=0, rd_gray=0, wr_sync=0, wr_gray=0, wr=0, lvl=0)
+    n, m = len(t_in) - 1, len(t_out) - 1
+    k = j = 0                                   # last edge executed
+    in_rdy, in_lvl, out_vld, out_lvl = [], [], [], []
+    while k < n or j < m:
+        t = min(t_in[k + 1] if k < n else np.inf, t_out[j + 1] if j < m else np.inf)
+        do_in = k < n and t_in[k + 1] == t
+        do_out = j < m and t_out[j + 1] == t
+        vi, vo = dict(ri), dict(ro)
+        if do_in:
+            level = ri["wr"] - ri["rd"]
+            in_rdy.append(level != depth)
+            in_lvl.append(level)
+            if level != depth and vld[k]:
+                vi["wr"] = ri["wr"] + 1
+            vi["wr_gray"] = vi["wr"]
+            vi["rd_sync"] = ro["rd_gray"]
+            vi["rd_gray"] = ri["rd_sync"]
+            vi["rd"] = ri["rd_gray"]
+        if do_out:
+            out_vld.append(ro["lvl"] != 0)
+            out_lvl.append(ro["lvl"])
+            if ro["wr"] == ro["rd"]:
+                vo["lvl"] = 0
+            else:
+                vo["lvl"] = ro["wr"] - ro["rd"]
+                if rdy[j] and ro["lvl"] != 0:
+                    vo["lvl"] -= 1
+            if ro["lvl"] != 0 and rdy[j]:
+                vo["rd"] = ro["rd"] + 1
+            vo["rd_gray"] = vo["rd"]
+            vo["wr_sync"] = ri["wr_gray"]
+            vo["wr_gray"] = ro["wr_sync"]
+            vo["wr"] = ro["wr_gray"]
+        if do_in:
+            ri, k = vi, k + 1
+        if do_out:
+            ro, j = vo, j + 1
+    return [np.array(x, dtype=np.int64) for x in (in_rdy, in_lvl, out_vld, out_lvl)]
+
+def check(trace, ref):
+    in_rdy, in_lvl, out_vld, out_lvl = ref
+    assert (trace.in_rdy == in_rdy).all()
+    assert (trace.in_lvl == in_lvl).all()
+    assert (trace.out_vld == out_vld).all()
+    assert (trace.out_lvl == out_lvl).all()
+
+@pytest.mark.parametrize("depth, vld, rdy", [
+    (32, "ones", "ones"),           # continuous
+    (32, "ones", "zeros"),          # fill until full
+    (16, "bursts", "ones"),
+    (8, "random", "random"),
+    (4, "ones", "random"),
+])
+def test_sync_fifo(depth, vld, rdy):
+    n = 5000
+    traffic = {"ones": lambda seed: np.ones(n, dtype=bool), "zeros": lambda seed: np.zeros(n, dtype=bool),
+               "bursts": lambda seed: bursts(n, 20, 7), "random": lambda seed: random_bursts(n, 5, 4, seed=seed)}
+    trace = SyncFifo(depth=depth).simulate(traffic[vld](depth), traffic[rdy](depth + 1))
+    check(trace, ref_sync_fifo(depth, trace.in_vld, trace.out_rdy))
+
+@pytest.mark.parametrize("in_period, out_period, out_phase", [
+    (10.0, 10.0, 0.0),              # same frequency, simultaneous edges
+    (10.0, 10.0, 3.3),
+    (10.0, 13.1, 1.7),              # read clock slower
+    (12.7, 10.0, 0.0),              # read clock faster
+    (10.0, 31.0, 5.0),
+    (29.3, 10.0, 2.0),
+])
+@pytest.mark.parametrize("depth", [4, 32])
+def test_async_fifo(in_period, out_period, out_phase, depth):
+    n = 4000
+    fifo = AsyncFifo(depth=depth, in_period=in_period, out_period=out_period, out_phase=out_phase)
+    m = fifo.out_cycles(n)
+    seed = int(in_period * 10 + out_period + depth)
+    for vld, rdy in ((np.ones(n, dtype=bool), random_bursts(m, 30, 40, seed=seed)),
+                     (random_bursts(n, 40, 30, seed=seed), np.ones(m, dtype=bool)),
+                     (random_bursts(n, 3, 2, seed=seed), random_bursts(m, 2, 3, seed=seed + 1))):
+        trace = fifo.simulate(vld, rdy)
+        t_in, t_out, _, _ = fifo.edges(n)
+        check(trace, ref_async_fifo(depth, vld, rdy, t_in, t_out))
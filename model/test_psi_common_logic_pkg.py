@@ -0,0 +1,71 @@
+##############################################################################
+# Tests of psi_common_logic_pkg.py and the slv conversions of
+# psi_common_math_pkg.py (run with pytest from the repository root)
+#
+# test_logic_pkg_tb repeats the checks of psi_common_logic_pkg_tb, the other
+# tests compare the array functions with bit by bit implementations.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_logic_pkg import (zeros_vector, ones_vector, shift_left, shift_right, binary_to_gray,
+                                        gray_to_binary, ppc_or, invert_bit_order)
+from model.psi_common_math_pkg import log2, from_uslv, from_sslv, to_uslv, to_sslv
+
+def test_logic_pkg_tb():
+    """Expectations of psi_common_logic_pkg_tb"""
+    assert zeros_vector(5) == 0b00000
+    assert ones_vector(5) == 0b11111
+    assert shift_left(0b11101, 2, 5, 0) == 0b10100
+    assert shift_left(0b11101, 2, 5, 1) == 0b10111
+    assert shift_left(0b10101, 1, 5, 1) == 0b01011
+    assert shift_right(0b10111, 2, 5, 0) == 0b00101
+    assert shift_right(0b10111, 2, 5, 1) == 0b11101
+    assert shift_right(0b10101, 1, 5, 1) == 0b11010
+    gray = [0b000, 0b001, 0b011, 0b010, 0b110, 0b111, 0b101, 0b100]
+    for i in range(8):
+        assert binary_to_gray(i, 3) == gray[i]
+        assert gray_to_binary(gray[i], 3) == i
+    for length in range(1, 7):
+        for value in range(2**length):
+            assert ppc_or(value, length) == (0 if value == 0 else 2**(log2(value) + 1) - 1)
+
+def bits(x, width):
+    return [(x >> i) & 1 for i in range(width)]
+
+def from_bits(b):
+    return sum(v << i for i, v in enumerate(b))
+
+@pytest.mark.parametrize("width", [1, 3, 8, 13, 32, 63, 64])
+def test_arrays(width):
+    """Array results (int64 and uint64 inputs) are the ones of the bit-serial VHDL functions"""
+    rng = np.random.default_rng(width)
+    x = rng.integers(0, 2**width, 200, dtype=np.uint64)
+    ref_gray, ref_bin, ref_ppc, ref_inv = [], [], [], []
+    for v in x.tolist():
+        b = bits(v, width)
+        ref_gray.append(from_bits([b[i] ^ (b[i + 1] if i + 1 < width else 0) for i in range(width)]))
+        ref_bin.append(from_bits([sum(b[i:]) % 2 for i in range(width)]))
+        ref_ppc.append(from_bits([int(any(b[i:])) for i in range(width)]))
+        ref_inv.append(from_bits(b[::-1]))
+    for inp in (x, x.view(np.int64)):
+        for func, ref in ((binary_to_gray, ref_gray), (gray_to_binary, ref_bin), (ppc_or, ref_ppc),
+                          (invert_bit_order, ref_inv)):
+            res = func(inp, width)
+            assert res.dtype == inp.dtype
+            assert res.view(np.uint64).tolist() == ref
+            assert func(int(x[0]), width) == ref[0]
+
+def test_slv_conversions():
+    """64 bit vectors: unsigned values above 2**63 - 1, python integers for scalars"""
+    assert from_uslv(2**64 - 1, 64) == 2**64 - 1
+    assert from_uslv(-1, 64) == 2**64 - 1
+    assert from_sslv(2**64 - 1, 64) == -1
+    assert from_sslv(0x8000, 16) == -0x8000
+    assert to_uslv(-1, 8) == to_sslv(-1, 8) == 0xFF
+    assert isinstance(from_uslv(np.int64(5), 8), int)
+    x = np.array([0, 2**63, 2**64 - 1], dtype=np.uint64)
+    assert from_uslv(x, 64).dtype == np.uint64 and from_uslv(x, 64).tolist() == [0, 2**63, 2**64 - 1]
+    assert from_sslv(x, 64).tolist() == [0, -2**63, -1]
+    assert from_uslv(x, 8).dtype == np.int64 and from_uslv(x, 8).tolist() == [0, 0, 0xFF]
+    assert from_sslv(np.array([0x7F, 0x80, -1]), 8).tolist() == [0x7F, -0x80, -1]
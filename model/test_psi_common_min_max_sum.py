@@ -0,0 +1,107 @@
+##############################################################################
+# Comparison of psi_common_min_max_sum.py with per cycle translations of the
+# RTL (run with pytest from the repository root)
+#
+# The references execute proc_min_max of psi_common_find_min_max and
+# proc_count of psi_common_min_max_sum clock edge by clock edge. Registers
+# without reset (raz_s, mean_s) start at 0 like in the model.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_min_max_sum import FindMinMax, MinMaxSum
+
+class RefFindMinMax:
+    """proc_min_max, dat_i given as the signed or unsigned value"""
+    def __init__(self, mode):
+        self.mode = mode
+        self.data = 0
+        self.raz_dff = False
+        self.vld_o = False
+        self.dat_o = 0
+
+    def edge(self, dat, vld, raz):
+        """One clock edge, the outputs are the registers after the edge"""
+        edge = raz and not self.raz_dff
+        self.raz_dff = raz
+        self.vld_o = edge
+        if edge:
+            self.dat_o = self.data
+            self.data = dat
+        elif vld and (dat <= self.data if self.mode == "MIN" else dat >= self.data):
+            self.data = dat
+
+def ref_find_min_max(mode, dat, vld, raz):
+    ref = RefFindMinMax(mode)
+    out = []
+    for d, v, r in zip(dat, vld, raz):
+        ref.edge(d, v, r)
+        if ref.vld_o:
+            out.append(ref.dat_o)
+    return out
+
+def ref_min_max_sum(clock_cycle, signed, accu_width, dat, vld, sync):
+    """proc_count with the two find_min_max instances, returns the outputs (min_o, max_o, sum_o) with vld_o
+    of the raz_s edges seen in the cycles of the inputs"""
+    wrap = (lambda x: ((x + 2**(accu_width - 1)) % 2**accu_width) - 2**(accu_width - 1)) if signed else \
+           (lambda x: x % 2**accu_width)
+    mins, maxs = RefFindMinMax("MIN"), RefFindMinMax("MAX")
+    counter = accu = mean = 0
+    raz = False
+    out = []
+    n = len(dat)
+    # one more cycle to output the result of a raz_s edge in the last cycle
+    for t in range(n + 1):
+        d, v, s = (int(dat[t]), bool(vld[t]), bool(sync[t])) if t < n else (0, False, False)
+        if mins.vld_o:
+            out.append((mins.dat_o, maxs.dat_o, mean))
+        if t == n:
+            break
+        n_raz = (counter == clock_cycle - 1 and v) or s
+        if s or counter == clock_cycle - 1:
+            counter, accu, mean = 0, wrap(d), accu
+        elif v:
+            counter, accu = counter + 1, wrap(accu + d)
+        mins.edge(d, v, raz)
+        maxs.edge(d, v, raz)
+        raz = n_raz
+    return out
+
+def random_inputs(rng, n, width, signed):
+    lo, hi = (-2**(width - 1), 2**(width - 1)) if signed else (0, 2**width)
+    dat = rng.integers(lo, hi, n)
+    vld = rng.random(n) < rng.choice([0.3, 0.8, 1.0])
+    return dat, vld
+
+def cuts(rng, n):
+    return np.concatenate(([0], np.sort(rng.integers(0, n + 1, int(rng.integers(0, 5)))), [n]))
+
+@pytest.mark.parametrize("mode", ["MIN", "MAX"])
+@pytest.mark.parametrize("signed", [True, False])
+def test_find_min_max(mode, signed):
+    """Random vld_i/raz_i and chunk sizes"""
+    rng = np.random.default_rng(signed + 2 * (mode == "MIN"))
+    for _ in range(50):
+        n = int(rng.integers(0, 300))
+        dat, vld = random_inputs(rng, n, 8, signed)
+        raz = rng.random(n) < rng.choice([0.05, 0.5])
+        model = FindMinMax(8, signed, mode)
+        c = cuts(rng, n)
+        res = np.concatenate([model.process(dat[a:b], vld[a:b], raz[a:b]) for a, b in zip(c[:-1], c[1:])])
+        assert res.tolist() == ref_find_min_max(mode, dat, vld, raz)
+
+@pytest.mark.parametrize("clock_cycle", [1, 2, 3, 8, 17])
+@pytest.mark.parametrize("signed", [True, False])
+def test_min_max_sum(clock_cycle, signed):
+    """Random vld_i/sync_i patterns and chunk sizes"""
+    rng = np.random.default_rng(clock_cycle + 100 * signed)
+    accu_width = (clock_cycle - 1).bit_length() + 8 + 1
+    for _ in range(40):
+        n = int(rng.integers(0, 400))
+        dat, vld = random_inputs(rng, n, 8, signed)
+        sync = rng.random(n) < rng.choice([0.0, 0.01, 0.2])
+        model = MinMaxSum(clock_cycle, signed, 8, accu_width)
+        c = cuts(rng, n)
+        res = [model.process(dat[a:b], vld[a:b], sync[a:b]) for a, b in zip(c[:-1], c[1:])]
+        mins, maxs, sums = (np.concatenate(r).tolist() for r in zip(*res))
+        assert list(zip(mins, maxs, sums)) == ref_min_max_sum(clock_cycle, signed, accu_width, dat, vld, sync)
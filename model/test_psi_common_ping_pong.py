@@ -0,0 +1,137 @@
+##############################################################################
+# Comparison of psi_common_ping_pong.py with a per cycle translation of the
+# RTL (run with pytest from the repository root)
+#
+# ref_ping_pong executes proc_ctrl of psi_common_ping_pong clock edge by
+# clock edge, including the write port of the RAM (written on the edge after
+# dpram_add_s / dpram_wren_s / dpram_data_write_s are set). Registers
+# without reset start at 0 like the RAM of the model.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_ping_pong import PingPong, PingPongReader, word_dtype
+
+def ref_ping_pong(ch_nb, depth, tdm, dat, vld):
+    """proc_ctrl for the inputs per cycle, returns (RAM (2, ch_size, spl_size), cycles of the vld_i pulses
+    toggling the buffer)"""
+    ch_size, spl_size = 2**(ch_nb - 1).bit_length(), 2**(depth - 1).bit_length()
+    ram = np.zeros((2, ch_size, spl_size), dtype=np.int64)
+    sample, toggle = (0 if tdm else depth - 1), 0
+    str_s = str_dff = wren = False
+    ch_cnt = 0
+    add = (0, 0, 0)
+    data_array = [0] * ch_nb
+    dat_s = data_write = 0
+    toggles = []
+    for t in range(len(vld)):
+        if wren:
+            ram[add] = data_write
+        d = [int(x) for x in np.atleast_1d(dat[t])]
+        n_str, n_str_dff, n_ch_cnt, n_sample, n_toggle = bool(vld[t]), str_dff, ch_cnt, sample, toggle
+        n_data_array, n_dat_s, n_data_write = list(data_array), dat_s, data_write
+        if not tdm:
+            if ch_nb > 1:
+                n_data_array = list(d)
+            else:
+                n_dat_s = d[0]
+        else:
+            n_dat_s = d[0]
+        # channel counter
+        if not tdm:
+            if str_s:
+                n_ch_cnt, n_str_dff = 0, True
+            elif ch_cnt == ch_nb - 1:
+                n_str_dff = False
+            else:
+                n_ch_cnt, n_str_dff = ch_cnt + 1, True
+        else:
+            if ch_cnt == ch_nb - 1:
+                n_ch_cnt = 0
+            elif str_s:
+                n_ch_cnt = ch_cnt + 1
+        # sample counter
+        if not tdm:
+            if sample == depth - 1 and str_s:
+                n_sample, n_toggle = 0, 1 - toggle
+            elif str_s:
+                n_sample = sample + 1
+        elif ch_cnt == ch_nb - 1 and str_s:
+            if sample == depth - 1:
+                n_sample, n_toggle = 0, 1 - toggle
+            else:
+                n_sample = sample + 1
+        n_add = (toggle, ch_cnt, sample)
+        n_wren = str_s if tdm else str_dff
+        # data alignment (the shift overrides the load of data_array_s(0 to ch_nb_g - 2))
+        if not tdm:
+            if ch_nb > 1 and str_dff:
+                n_data_write = data_array[0]
+                n_data_array[:ch_nb - 1] = data_array[1:]
+            else:
+                n_data_write = dat_s
+        elif str_s:
+            n_data_write = dat_s
+        if n_toggle != toggle:
+            toggles.append(t - 1)
+        str_s, str_dff, ch_cnt, sample, toggle = n_str, n_str_dff, n_ch_cnt, n_sample, n_toggle
+        data_array, dat_s, data_write, add, wren = n_data_array, n_dat_s, n_data_write, n_add, n_wren
+    return ram, np.array(toggles, dtype=np.int64)
+
+def random_vld(rng, n, ch_nb, tdm):
+    """Random vld_i: any pattern for TDM, pulses at least ch_nb + 1 cycles apart for PAR (the first one
+    ch_nb - 1 cycles after reset), no vld_i in the last cycles (all writes done at the end)"""
+    vld = np.zeros(n, dtype=bool)
+    tail = 2 * ch_nb + 4
+    if tdm:
+        p = rng.choice([0.2, 0.7, 1.0])
+        vld[:n - tail] = rng.random(n - tail) < p
+    else:
+        t = ch_nb - 1 + int(rng.integers(0, 3))
+        while t < n - tail:
+            vld[t] = True
+            t += ch_nb + 1 + int(rng.integers(0, 3) if rng.random() < 0.5 else rng.integers(0, 20))
+    return vld
+
+@pytest.mark.parametrize("tdm", [False, True])
+def test_random(tdm):
+    """RAM content and toggle cycles for random vld_i patterns and chunk splits"""
+    rng = np.random.default_rng(1 + tdm)
+    for _ in range(100):
+        ch_nb = int(rng.choice([2, 3, 4, 5] if tdm else [1, 2, 3, 4, 5]))
+        depth = int(rng.choice([1, 2, 4, 5, 8]))
+        n = int(rng.integers(30, 300))
+        vld = random_vld(rng, n, ch_nb, tdm)
+        dat = rng.integers(0, 2**16, n if tdm else (n, ch_nb))
+        ram, toggles = ref_ping_pong(ch_nb, depth, tdm, dat, vld)
+        pp = PingPong(ch_nb, depth, 16, tdm)
+        cuts = np.concatenate(([0], np.sort(rng.integers(0, n, int(rng.integers(0, 6)))), [n]))
+        res = np.concatenate([pp.process(dat[a:b], vld[a:b]) for a, b in zip(cuts[:-1], cuts[1:])])
+        assert res.tolist() == toggles.tolist()
+        assert (pp.ram == ram).all()
+
+def test_par_spacing():
+    """vld_i pulses closer than ch_nb + 1 cycles are rejected in PAR mode"""
+    vld = np.zeros(20, dtype=bool)
+    vld[[5, 8]] = True
+    with pytest.raises(ValueError):
+        PingPong(4, 8, 16).process(np.zeros((20, 4)), vld)
+
+@pytest.mark.parametrize("width, word_bytes, signed", [(12, None, True), (16, 4, False), (64, None, False)])
+def test_reader(tmp_path, width, word_bytes, signed):
+    """PingPongReader on a regular file holding the read port memory"""
+    ch_nb, depth = 3, 5
+    rng = np.random.default_rng(width)
+    pp = PingPong(ch_nb, depth, width, True)
+    dat = rng.integers(0, 2**min(width, 62), 4 * ch_nb * depth)
+    pp.process(dat, True)
+    path = str(tmp_path / "mem.bin")
+    pp.mem().astype(word_dtype(width, word_bytes)).tofile(path)
+    with PingPongReader(path, ch_nb, depth, width, word_bytes) as reader:
+        assert (reader.view() == pp.buffer()).all()
+        expected = pp.buffer().astype(np.int64)
+        if signed:
+            expected = np.where(expected >= 2**(width - 1), expected - 2**width, expected)
+        assert reader.read(signed).tolist() == expected.tolist()
+        with pytest.raises(ValueError):
+            reader.wait(0)
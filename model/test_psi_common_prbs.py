@@ -0,0 +1,79 @@
+##############################################################################
+# Comparison of psi_common_prbs.py with a per bit translation of the RTL
+# (run with pytest from the repository root)
+#
+# ref_prbs executes p_lfsr of psi_common_prbs on a list of bits:
+# q_s <= q_s(width_g-2 downto 0) & xor(mask_c and q_s) for every vld_i.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_prbs import POLY, BLOCK_SIZE, Prbs, prbs
+
+def ref_prbs(width, seed, n):
+    """dat_o after 0 .. n-1 valid input samples"""
+    mask = [(POLY[width] >> i) & 1 for i in range(width)]
+    q = [(seed >> i) & 1 for i in range(width)]     # q[i] = q_s(i)
+    out = []
+    for _ in range(n):
+        out.append(sum(b << i for i, b in enumerate(q)))
+        d0 = 0
+        for b, m in zip(q, mask):
+            d0 ^= b & m
+        q = [d0] + q[:-1]
+    return out
+
+@pytest.mark.parametrize("width", range(2, 33))
+def test_sequence(width):
+    """Random seeds, the sequence generated in random chunks"""
+    rng = np.random.default_rng(width)
+    for _ in range(3):
+        seed = int(rng.integers(1, 2**width))
+        n = 2000
+        p = Prbs(width, seed)
+        cuts = np.concatenate(([0], np.sort(rng.integers(0, n + 1, 4)), [n]))
+        res = np.concatenate([p.generate(int(b - a)) for a, b in zip(cuts[:-1], cuts[1:])])
+        assert res.tolist() == ref_prbs(width, seed, n)
+        assert p.index == n
+
+@pytest.mark.parametrize("width", [2, 5, 12, 19, 26, 32])
+def test_seek(width):
+    """seek/skip give the same words as sequential generation (also over the block size)"""
+    rng = np.random.default_rng(width)
+    seed = int(rng.integers(1, 2**width))
+    n = 3 * BLOCK_SIZE + 17
+    seq = Prbs(width, seed).generate(n)
+    for _ in range(5):
+        start = int(rng.integers(0, n - 100))
+        assert prbs(width, seed, 100, start).tolist() == seq[start:start + 100].tolist()
+        p = Prbs(width, seed)
+        k = int(rng.integers(0, min(start, 100) + 1))
+        p.generate(k)
+        p.skip(start - k)
+        assert p.generate(10).tolist() == seq[start:start + 10].tolist()
+        q = Prbs(width, seed)
+        q.seek(start)
+        assert q.generate(50).tolist() == seq[start:start + 50].tolist()
+    # index larger than the period
+    p = Prbs(width, seed)
+    p.seek(p.period + 5)
+    assert p.generate(1)[0] == seq[5]
+
+@pytest.mark.parametrize("width", range(2, 18))
+def test_full_period(width):
+    """All 2^width-1 non zero states, the sequence repeats after the period"""
+    seed = 1
+    seq = Prbs(width, seed).generate(2**width)
+    assert seq.tolist() == ref_prbs(width, seed, 2**width)
+    assert len(np.unique(seq[:-1])) == 2**width - 1
+    assert seq[-1] == seed
+
+def test_zero_seed():
+    """A seed of 0 gives a constant 0 sequence"""
+    assert not prbs(16, 0, 1000).any()
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        Prbs(33, 1)
+    with pytest.raises(ValueError):
+        Prbs(8, 256)
@@ -0,0 +1,79 @@
+##############################################################################
+# Comparison of psi_common_sample_rate_converter.py with a per cycle
+# translation of the RTL (run with pytest from the repository root)
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_sample_rate_converter import SampleRateConverter, resample
+
+def ref_sample_rate_converter(dat, vld, rate, mode, clk_to_vld_ratio):
+    """Process proc of psi_common_sample_rate_converter, returns (dat_o, vld_o) per cycle"""
+    sample_count = dat_s = sample = out_count = 0
+    vld_s = vld_dff = False
+    dat_o, vld_o = [], []
+    for d, v in zip(dat, vld):
+        if mode == "DOWN":
+            if v:
+                if sample_count == rate - 1:
+                    dat_s, vld_s, sample_count = d, True, 0
+                else:
+                    vld_s, sample_count = False, sample_count + 1
+            else:
+                vld_s = False
+        elif clk_to_vld_ratio == rate:
+            dat_s, vld_s = d, True
+        else:
+            # dat_s gets sample_s before the capture, the assignments of the counter
+            # branch override the reload of vld_out_count_s on an edge
+            dat_s = sample
+            if v and not vld_dff:
+                sample = d
+            vld_dff = v
+            if out_count > 0:
+                vld_s, out_count = False, out_count - 1
+            else:
+                vld_s, out_count = True, clk_to_vld_ratio // rate
+        dat_o.append(dat_s)
+        vld_o.append(vld_s)
+    return np.array(dat_o, dtype=np.int64), np.array(vld_o)
+
+def pulses(n, clk_to_vld_ratio, phase):
+    vld = np.zeros(n, dtype=bool)
+    vld[phase::clk_to_vld_ratio] = True
+    return vld
+
+@pytest.mark.parametrize("rate, mode, clk_to_vld_ratio", [
+    (2, "DOWN", 10), (3, "DOWN", 1), (5, "DOWN", 3),
+    (2, "UP", 10), (3, "UP", 10), (4, "UP", 17), (3, "UP", 3),
+])
+def test_process_cycles(rate, mode, clk_to_vld_ratio):
+    """Random inputs processed in chunks of different lengths (state carried between the calls)"""
+    rng = np.random.default_rng(rate * 100 + clk_to_vld_ratio)
+    n = 3000
+    dat = rng.integers(-2**15, 2**15, n)
+    vld = rng.integers(0, 2, n).astype(bool) if mode == "DOWN" else pulses(n, clk_to_vld_ratio, 3)
+    vld[1500:1600] = True           # UP: vld_i held high, only the rising edge captures
+    src = SampleRateConverter(rate, mode, 16, clk_to_vld_ratio)
+    splits = [0, 1, 7, 500, 1555, 2999, n]
+    res = [src.process_cycles(dat[a:b], vld[a:b]) for a, b in zip(splits[:-1], splits[1:])]
+    dat_o, vld_o = ref_sample_rate_converter(dat, vld, rate, mode, clk_to_vld_ratio)
+    assert (np.concatenate([r[1] for r in res]) == vld_o).all()
+    assert (np.concatenate([r[0] for r in res]) == dat_o).all()
+
+@pytest.mark.parametrize("rate, mode, clk_to_vld_ratio, phase", [
+    (2, "DOWN", 10, 0), (4, "DOWN", 5, 2),
+    (2, "UP", 10, 0), (3, "UP", 10, 4), (5, "UP", 23, 11), (4, "UP", 4, 0),
+])
+def test_resample(rate, mode, clk_to_vld_ratio, phase):
+    """resample() returns the dat_o of all cycles with vld_o = '1' for regular input samples"""
+    x = np.random.default_rng(rate).integers(-1000, 1000, 200)
+    n = phase + len(x) * clk_to_vld_ratio
+    if clk_to_vld_ratio == rate:
+        dat, vld = np.repeat(x, rate), np.ones(n, dtype=bool)
+    else:
+        vld = pulses(n, clk_to_vld_ratio, phase)
+        dat = np.zeros(n, dtype=np.int64)
+        dat[vld] = x
+    dat_o, vld_o = ref_sample_rate_converter(dat, vld, rate, mode, clk_to_vld_ratio)
+    assert (resample(x, rate, mode, clk_to_vld_ratio, phase) == dat_o[vld_o]).all()
@@ -0,0 +1,128 @@
+##############################################################################
+# Comparison of psi_common_tdm.py with per cycle translations of the RTL
+# (run with pytest from the repository root)
+#
+# ref_tdm_par and ref_wconv_n2xn execute the two process records of
+# psi_common_tdm_par and psi_common_wconv_n2xn cycle by cycle with random
+# vld_i and rdy_i. The data registers have no reset and start at 0 like the
+# register content of the models.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_tdm import TdmPar, WconvN2xn, channels, pack
+
+def drive(step, dat, last, rng, n_out):
+    """Present the samples with random vld_i/rdy_i until n_out words were output (or a timeout)
+    step(vld, dat, last, rdy) executes one clock cycle, returns (sample taken, new word or None)"""
+    words = []
+    k = 0
+    for _ in range(20 * len(dat) + 100):
+        vld = k < len(dat) and rng.random() < 0.7
+        taken, word = step(vld, dat[k] if vld else 0, bool(last[k]) if vld else False, rng.random() < 0.6)
+        k += taken
+        if word is not None:
+            words.append(word)
+        if k == len(dat) and len(words) == n_out:
+            break
+    return words
+
+def ref_tdm_par(ch_nb):
+    """p_comb/p_seq of psi_common_tdm_par"""
+    r = dict(idx=0, last_reg=False, data_reg=[0] * ch_nb, vld_reg=[False] * ch_nb, ovld=False)
+
+    def step(vld_i, dat_i, last_i, rdy_i):
+        v = dict(r, data_reg=list(r["data_reg"]), vld_reg=list(r["vld_reg"]))
+        done = r["vld_reg"][-1] or r["last_reg"]
+        blocked = done and r["ovld"] and not rdy_i
+        word = None
+        if vld_i and not blocked:
+            v["data_reg"][r["idx"]] = dat_i
+            v["vld_reg"][r["idx"]] = True
+            v["last_reg"] = last_i
+            v["idx"] = 0 if last_i or r["idx"] == ch_nb - 1 else r["idx"] + 1
+        if done and not blocked:
+            v["ovld"] = True
+            word = (list(r["data_reg"]), list(r["vld_reg"]), r["last_reg"])
+            v["vld_reg"] = [bool(vld_i)] + [False] * (ch_nb - 1)
+            v["last_reg"] = bool(vld_i and last_i)
+        elif r["ovld"] and rdy_i:
+            v["ovld"] = False
+        r.clear()
+        r.update(v)
+        return vld_i and not blocked, word
+    return step
+
+def ref_wconv_n2xn(ratio):
+    """p_comb/p_seq of psi_common_wconv_n2xn"""
+    r = dict(data_vld=[False] * ratio, data=[0] * ratio, data_last=False, vld_o=False, cnt=0)
+
+    def step(vld_i, dat_i, last_i, rdy_i):
+        v = dict(r, data=list(r["data"]), data_vld=list(r["data_vld"]))
+        done = r["data_vld"][-1] or r["data_last"]
+        stuck = done and r["vld_o"] and not rdy_i
+        word = None
+        if r["vld_o"] and rdy_i:
+            v["vld_o"] = False
+        if done and (not r["vld_o"] or rdy_i):
+            v["vld_o"] = True
+            word = (list(r["data"]), list(r["data_vld"]), r["data_last"])
+            v["data_vld"] = [False] * ratio
+            v["data_last"] = False
+        if vld_i and not stuck:
+            v["data"][r["cnt"]] = dat_i
+            v["data_vld"][r["cnt"]] = True
+            if last_i:
+                v["data_last"] = True
+            v["cnt"] = 0 if r["cnt"] == ratio - 1 or last_i else r["cnt"] + 1
+        r.clear()
+        r.update(v)
+        return vld_i and not stuck, word
+    return step
+
+@pytest.mark.parametrize("entity", ["tdm_par", "wconv_n2xn"])
+def test_random(entity):
+    """Random last patterns (including none) and chunk cuts"""
+    rng = np.random.default_rng(len(entity))
+    for _ in range(100):
+        size = int(rng.integers(1, 6))
+        n = int(rng.integers(0, 120))
+        dat = rng.integers(0, 2**16, n)
+        last = rng.random(n) < rng.choice([0.0, 0.05, 0.3, 1.0])
+        model = TdmPar(size) if entity == "tdm_par" else WconvN2xn(size)
+        cuts = np.concatenate(([0], np.sort(rng.integers(0, n + 1, int(rng.integers(0, 5)))), [n]))
+        res = [model.process(dat[a:b], last[a:b] if last.any() else None) for a, b in zip(cuts[:-1], cuts[1:])]
+        words = np.concatenate([w for w, _, _ in res])
+        written = np.concatenate([k for _, k, _ in res])
+        word_last = np.concatenate([l for _, _, l in res])
+        step = ref_tdm_par(size) if entity == "tdm_par" else ref_wconv_n2xn(size)
+        ref = drive(step, dat, last, rng, len(words))
+        assert len(ref) == len(words)
+        assert words.tolist() == [w for w, _, _ in ref]
+        assert written.tolist() == [k for _, k, _ in ref]
+        assert word_last.tolist() == [l for _, _, l in ref]
+
+def test_view():
+    """Packets of whole words give a view of the input"""
+    dat = np.arange(24)
+    words, written, word_last = TdmPar(4).process(dat, np.arange(24) % 8 == 7)
+    assert np.shares_memory(words, dat) and written.all() and word_last.tolist() == [False, True] * 3
+
+@pytest.mark.parametrize("ch_width, ch_nb", [(12, 2), (12, 6), (24, 3), (40, 1), (40, 5), (8, 3), (16, 4)])
+@pytest.mark.parametrize("signed", [False, True])
+def test_pack_channels(ch_width, ch_nb, signed):
+    """channels() is the inverse of pack(), channel 0 in the lowest bits of a word"""
+    rng = np.random.default_rng(ch_width * ch_nb)
+    lo, hi = (-2**(ch_width - 1), 2**(ch_width - 1)) if signed else (0, 2**ch_width)
+    chs = rng.integers(lo, hi, (50, ch_nb))
+    buf = pack(chs, ch_width)
+    assert len(buf) == 50 * ch_width * ch_nb // 8
+    assert channels(buf, ch_width, ch_nb, signed).tolist() == chs.tolist()
+    # bit layout: the word as little endian integer holds channel k at bit k * ch_width
+    word_bytes = ch_width * ch_nb // 8
+    for i in (0, 49):
+        word = int.from_bytes(buf[i * word_bytes:(i + 1) * word_bytes], "little")
+        assert [(word >> (k * ch_width)) & (2**ch_width - 1) for k in range(ch_nb)] == \
+               [int(c) & (2**ch_width - 1) for c in chs[i]]
+    # incomplete words at the end are ignored
+    assert len(channels(buf + b"\0", ch_width, ch_nb, signed)) == 50
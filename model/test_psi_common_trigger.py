@@ -0,0 +1,92 @@
+##############################################################################
+# Comparison of psi_common_trigger.py with per cycle translations of the
+# RTL (run with pytest from the repository root)
+#
+# ref_trigger executes p_comb/p_seq of psi_common_trigger_analog resp.
+# psi_common_trigger_digital for one trigger source, trg_arm_cfg_i being
+# '1' only in the cycles of the arm edges.
+##############################################################################
+import numpy as np
+import pytest
+
+from model.psi_common_trigger import TriggerAnalog, TriggerDigital
+
+def ref_trigger(x, analog, mode, edge, threshold, arm, ext_disarm):
+    """Cycles with trig_o = '1' for the source values x per cycle (signed/unsigned values resp. bits)"""
+    arm_i = np.zeros(len(x) + 1, dtype=bool)
+    arm_i[arm] = True
+    disarm_i = np.zeros(len(x) + 1, dtype=bool)
+    disarm_i[ext_disarm] = True
+    value = value_dff = th = 0              # value_dff: RegDigitalValue_dff for the digital trigger
+    o_trg = armed = arm_dff = False
+    trig = []
+    for t in range(len(x)):
+        if o_trg:
+            trig.append(t)
+        n_armed = armed
+        if (o_trg or disarm_i[t]) and mode & 1:
+            n_armed = False
+        elif arm_i[t] and not arm_dff:
+            n_armed = not armed
+        n_o_trg = False
+        if analog:
+            # RegAnalogValue_dff, RegAnalogValue and RegAnalogTh
+            rising, falling = value_dff < th <= value, value_dff > th >= value
+            value_dff, value, n_th = value, int(x[t]), threshold
+        else:
+            # RegDigitalValue_dff and the input
+            rising, falling = not value_dff and x[t], value_dff and not x[t]
+            value_dff, n_th = bool(x[t]), th
+        if armed:
+            if rising and edge & 2:
+                n_o_trg = True
+            if falling and edge & 1:
+                n_o_trg = True
+        o_trg, armed, arm_dff, th = n_o_trg, n_armed, bool(arm_i[t]), n_th
+    return trig
+
+def random_events(rng, n, p):
+    """Cycles of single cycle pulses (never in adjacent cycles)"""
+    t = np.flatnonzero(rng.random(n) < p)
+    return t[np.concatenate(([True], np.diff(t) > 1))] if len(t) else t
+
+def cuts(rng, n):
+    return np.concatenate(([0], np.sort(rng.integers(0, n + 1, int(rng.integers(0, 4)))), [n]))
+
+@pytest.mark.parametrize("mode", [0, 1])
+@pytest.mark.parametrize("edge", [1, 2, 3])
+@pytest.mark.parametrize("analog, signed", [(True, True), (True, False), (False, False)])
+def test_random(mode, edge, analog, signed):
+    """Random inputs of several channels, arm edges, external disarm and chunk cuts"""
+    rng = np.random.default_rng(mode + 2 * edge + 8 * analog + 16 * signed)
+    width = 6
+    for _ in range(20):
+        n = int(rng.integers(1, 400))
+        channels = int(rng.integers(1, 4))
+        if analog:
+            lo, hi = (-2**(width - 1), 2**(width - 1)) if signed else (0, 2**width)
+            # random walk around the threshold (many crossings), raw unsigned bit patterns as input
+            x = np.clip(np.cumsum(rng.integers(-6, 7, (n, channels)), axis=0) + (0 if signed else 32), lo, hi - 1)
+            threshold = int(rng.integers(lo, hi))
+            model = TriggerAnalog(width, signed, mode, edge, threshold)
+            samples = x & (2**width - 1)
+        else:
+            x = (rng.random((n, channels)) < rng.choice([0.1, 0.5])).astype(np.int64)
+            threshold = 0
+            model = TriggerDigital(mode, edge)
+            samples = x.astype(bool)
+        arm = random_events(rng, n, rng.choice([0.01, 0.05]))
+        if rng.random() < 0.5:
+            arm = np.union1d([0], arm[arm > 1])
+        ext_disarm = random_events(rng, n, 0.02) if rng.random() < 0.5 else np.zeros(0, dtype=np.int64)
+        c = cuts(rng, n)
+        res = [model.process(samples[a:b], arm, ext_disarm) for a, b in zip(c[:-1], c[1:])]
+        for k in range(channels):
+            got = np.concatenate([r[k] for r in res]).tolist()
+            assert got == ref_trigger(x[:, k], analog, mode, edge, threshold, arm, ext_disarm)
+
+def test_list_input():
+    """Plain lists are accepted like arrays (1-d: one channel)"""
+    samples = [0, 0, 5, 0, 0, 7, 0, 0]
+    assert TriggerAnalog(8, True, 0, 2, 3).process(samples).tolist() == [4, 7]
+    assert TriggerDigital(0, 2).process([[0, 1], [1, 1], [0, 0], [1, 1], [0, 0]])[0].tolist() == [2, 4]
@@ -0,0 +1,42 @@
+##############################################################################
+# Tests of psi_common_vector_file_pkg.py (run with pytest from the repository root)
+##############################################################################
+import numpy as np
+
+from model.psi_common_vector_file_pkg import write_vectors, read_vectors, compare
+
+def write_lines(path, lines, end = "\n"):
+    with open(path, "w", newline="") as f:
+        f.write(end.join(lines) + end)
+
+def vectors(tmp_path):
+    rng = np.random.default_rng(1)
+    dat = rng.integers(-1000, 1000, 300)
+    vld = rng.integers(0, 2, 300)
+    path = str(tmp_path / "expected.txt")
+    write_vectors(path, [dat, vld], [16, 1], [True, False], ["dat", "vld"])
+    with open(path) as f:
+        return path, dat, vld, f.read().splitlines()
+
+def test_comments_and_empty_lines(tmp_path):
+    """Comments, white space and empty lines between the vectors are skipped (like vec_readline)"""
+    path, dat, vld, lines = vectors(tmp_path)
+    for name, mixed, end in (("mixed.txt", lines[:5] + ["# comment", ""] + lines[5:] + ["", "  "], "\r\n"),
+                             ("same_length.txt", lines[:9] + ["#" + "x" * (len(lines[5]) - 1)] + lines[9:], "\n")):
+        write_lines(str(tmp_path / name), mixed, end)
+        res = read_vectors(str(tmp_path / name))
+        assert (res["dat"] == dat).all() and (res["vld"] == vld).all()
+        assert all(len(v) == 0 for v in compare(path, str(tmp_path / name)).values())
+
+def test_x_in_actual(tmp_path):
+    """X digits of a simulator dump (U/X outputs) are mismatches unless the expected value is don't care"""
+    path, dat, vld, lines = vectors(tmp_path)
+    dump = lines[1:]
+    dump[3] = "XXXX" + dump[3][4:]
+    dump[4] = "X" + dump[4][1:]
+    write_lines(str(tmp_path / "dump.txt"), dump)
+    assert compare(path, str(tmp_path / "dump.txt"))["dat"].tolist() == [3, 4]
+    dc = np.zeros(len(dat), dtype=bool)
+    dc[3] = True
+    write_vectors(str(tmp_path / "dc.txt"), [dat, vld], [16, 1], [True, False], ["dat", "vld"], dont_care=[dc, None])
+    assert compare(str(tmp_path / "dc.txt"), str(tmp_path / "dump.txt"))["dat"].tolist() == [4]
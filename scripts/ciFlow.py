@@ -4,23 +4,129 @@
 #  Authors: Oliver Bruendler
 ##############################################################################
 import os
+import re
+import sys
+import gzip
+import argparse
+import subprocess
+from collections import deque
+
+from sim_config import parse_config, tb_run_jobs
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.abspath(THIS_DIR + "/../sim")
+
+ERROR_MARKER = "###ERROR###"
+SUCCESS_MARKER = "SIMULATIONS COMPLETED SUCCESSFULLY"
+
+class TbRunTracker:
+	"""Tracks which tb run and generic set is simulated from the vsim commands echoed to the transcript"""
+	def __init__(self, config):
+		self.jobs = {}
+		for job in tb_run_jobs(config, "Modelsim"):
+			self.jobs.setdefault(job["tb"].lower(), []).append(job)
+		self.current = None
+
+	def feed(self, line):
+		if "vsim" not in line:
+			return
+		for tb in re.findall(r"\w+", line):
+			if tb.lower() in self.jobs:
+				break
+		else:
+			return
+		generics = set(re.findall(r"-g\S+", line.lower()))
+		candidates = self.jobs[tb.lower()]
+		matching = [j for j in candidates if {a.lower() for a in j["args"]} <= generics]
+		if matching:
+			self.current = max(matching, key=lambda j: len(j["args"]))
+		else:
+			self.current = {"tb" : candidates[0]["tb"], "index" : None, "args" : [], "line" : line.strip()}
+
+	def describe(self):
+		if self.current is None:
+			return "unknown tb run (compilation?)"
+		if self.current["index"] is None:
+			return "{} (unknown generic set, vsim line: {})".format(self.current["tb"], self.current["line"])
+		return "{} (generic set {}: {})".format(self.current["tb"], self.current["index"],
+											   " ".join(self.current["args"]) or "default generics")
+
+class BoundedTranscript:
+	"""gzip compressed transcript of bounded size
+	The first head_bytes of output are stored, then only error lines (up to
+	max_errors) and finally the last tail_lines lines."""
+	def __init__(self, file_name, head_bytes, tail_lines, max_errors = 1000):
+		self.file = gzip.open(file_name, "wt", encoding="utf-8", errors="replace")
+		self.head_bytes = head_bytes
+		self.written = 0
+		self.errors = 0
+		self.max_errors = max_errors
+		self.skipped = 0
+		self.tail = deque(maxlen=tail_lines)
+
+	def write(self, line):
+		if self.written < self.head_bytes:
+			self.file.write(line)
+			self.written += len(line)
+			return
+		self.skipped += 1
+		if ERROR_MARKER in line and self.errors < self.max_errors:
+			self.errors += 1
+			self.file.write(line)
+		else:
+			self.tail.append(line)
+
+	def close(self):
+		if self.skipped:
+			dropped = self.skipped - self.errors - len(self.tail)
+			self.file.write("\n### TRANSCRIPT TRUNCATED: {} lines dropped ###\n\n".format(dropped))
+			self.file.writelines(self.tail)
+		self.file.close()
+
+def run(args):
+	"""Run the simulator and scan its output while it streams
+	Returns the exit code: -1 on errors, -2 if the simulation did not complete, 0 on success"""
+	tracker = TbRunTracker(parse_config(os.path.join(SIM_DIR, "config.tcl")))
+	transcript = BoundedTranscript(os.path.join(SIM_DIR, args.transcript), args.max_transcript_mb * 2**20, args.tail_lines)
+	proc = subprocess.Popen(["vsim", "-batch", "-do", "ci.do", "-logfile", os.devnull], cwd=SIM_DIR,
+							stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, errors="replace")
+	errors = 0
+	completed = False
+	try:
+		for line in proc.stdout:
+			transcript.write(line)
+			if not args.quiet:
+				sys.stdout.write(line)
+			tracker.feed(line)
+			if ERROR_MARKER in line:
+				errors += 1
+				if errors == 1:
+					print("[ERROR]: first error in {}\n         {}".format(tracker.describe(), line.strip()))
+				if args.fail_fast:
+					print("[ERROR]: fail-fast, simulation aborted")
+					proc.kill()
+					break
+			elif SUCCESS_MARKER in line:
+				completed = True
+	finally:
+		proc.stdout.close()
+		proc.wait()
+		transcript.close()
+
+	#Expected Errors
+	if errors:
+		return -1
+	#Unexpected Errors
+	if not completed:
+		return -2
+	#Success
+	return 0
 
-os.chdir(THIS_DIR + "/../sim")
-
-os.system("vsim -batch -do ci.do -logfile Transcript.transcript")
-
-with open("Transcript.transcript") as f:
-	content = f.read()
-	
-#Expected Errors
-if "###ERROR###" in content:
-	exit(-1)
-#Unexpected Errors
-if "SIMULATIONS COMPLETED SUCCESSFULLY" not in content:
-	exit(-2)
-	
-	
-#Success
-exit(0)
\ No newline at end of file
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Run the Modelsim regression for CI")
+	parser.add_argument("-fail_fast", help="abort the simulation on the first error", action="store_true")
+	parser.add_argument("-transcript", help="compressed transcript file (in sim/)", default="Transcript.transcript.gz")
+	parser.add_argument("-max_transcript_mb", help="size of the transcript head kept in full (MB, uncompressed)", type=int, default=64)
+	parser.add_argument("-tail_lines", help="number of lines kept from the end of a truncated transcript", type=int, default=10000)
+	parser.add_argument("-quiet", help="do not echo the simulator output", action="store_true")
+	exit(run(parser.parse_args()))
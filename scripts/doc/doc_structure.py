@@ -0,0 +1,129 @@
+# ======================================================================
+# Structure of doc/psi_common_list.md and doc/psi_common_index.md
+# Chapters with the components they contain (entity/package name and
+# short description), used by hdl2md_all.py to rebuild both files.
+# New components must be added here to appear in the documentation.
+# ======================================================================
+
+# (chapter title in the index, section title in the list, [(name, description), ...], related components)
+CHAPTERS = [
+    ("Packages", "Packages", [
+        ("psi_common_array_pkg", "array"),
+        ("psi_common_logic_pkg", "logic"),
+        ("psi_common_axi_pkg", "AXI"),
+        ("psi_common_math_pkg", "Math"),
+    ], []),
+    ("Memories", "Memory components", [
+        ("psi_common_sdp_ram", "Simple dual port RAM"),
+        ("psi_common_sp_ram_be", "Simple dual port RAM with byte enable"),
+        ("psi_common_tdp_ram", "True Dual port RAM"),
+        ("psi_common_tdp_ram_be", "True dual port RAM with byte enable"),
+    ], []),
+    ("FIFOs", "FIFO components", [
+        ("psi_common_async_fifo", "Asynchronous FIFO"),
+        ("psi_common_sync_fifo", "Synchronous FIFO"),
+    ], []),
+    ("Clock Crossings", "Clock domain crossing (CDC) components", [
+        ("psi_common_pulse_cc", "Pulse clock crossing (asynchronous pulse/vld transfer)"),
+        ("psi_common_simple_cc", "Simple clock crossing (asynchronous data value transfer)"),
+        ("psi_common_status_cc", "Status clock crossing (asynchronous slow changing value transfer)"),
+        ("psi_common_sync_cc_n2xn", "Synchronous CDC with AXI-S handshaking from **Lower** clock to **Higher** multiple integer clock frequency"),
+        ("psi_common_sync_cc_xn2n", "Synchronous CDC with AXI-S handshaking from **Higher** clock to **lower** multiple integer clock frequency"),
+        ("psi_common_bit_cc", "Bit CDC"),
+    ], ["psi_common_tdp_ram", "psi_common_async_fifo"]),
+    ("Timing", "Timing components", [
+        ("psi_common_strobe_generator", "Strobe generator"),
+        ("psi_common_strobe_divider", "Strobe divider"),
+        ("psi_common_tickgenerator", "Tick generator"),
+        ("psi_common_pulse_shaper", "Pulse shaper"),
+        ("psi_common_pulse_shaper_cfg", "Pulse shaper with duration settable via register"),
+        ("psi_common_clk_meas", "Clock frequency measurement"),
+        ("psi_common_strobe_generator_cfg", "Strobe generator with frequency settable via register"),
+    ], []),
+    ("Conversions", "Conversions components", [
+        ("psi_common_wconv_n2xn", "Data width conversion from a N-bits to a multiple N-bits"),
+        ("psi_common_wconv_xn2n", "Data width conversion from a multiple N-bits to a N-bits"),
+    ], []),
+    ("TDM Handling", "Time Division Multiplexing (TDM) data Handling components", [
+        ("psi_common_par_tdm", "Parallel to TDM data"),
+        ("psi_common_tdm_par", "TDM data to parallel"),
+        ("psi_common_tdm_par_cfg", "TDM data to Parallel with configurable valid output channel number"),
+        ("psi_common_tdm_mux", "TDM data multiplexer"),
+        ("psi_common_par_tdm_cfg", "Parallel to TDM with configurable valid output channel number"),
+    ], []),
+    ("Arbiters", "Arbiters components", [
+        ("psi_common_arb_priority", "Priority"),
+        ("psi_common_arb_round_robin", "Round robin"),
+    ], []),
+    ("Interfaces", "Interfaces components", [
+        ("psi_common_spi_master", "SPI master"),
+        ("psi_common_i2c_master", "I2C master"),
+        ("psi_common_axi_master_simple", "AXI master Simple"),
+        ("psi_common_axi_master_full", "AXI master Full"),
+        ("psi_common_axi_slave_ipif", "AXI slave IP (32 bits)"),
+        ("psi_common_axilite_slave_ipif", "AXI slave Lite IP"),
+        ("psi_common_spi_master_cfg", "SPI master configurable width"),
+        ("psi_common_axi_slave_ipif64", "AXI slave IP (64 bits)"),
+        ("psi_common_axi_multi_pl_stage", "AXI multi pipeline stage"),
+    ], []),
+    ("Miscellaneous", "miscellaneous components", [
+        ("psi_common_delay", "Delay settable via generics"),
+        ("psi_common_pl_stage", "Pipeline stage"),
+        ("psi_common_multi_pl_stage", "Multi pipeline stage"),
+        ("psi_common_ping_pong", "Sizable Ping pong buffer // & tdm (interface to stream continuously data into DPRAM)"),
+        ("psi_common_delay_cfg", "Delay settable via register"),
+        ("psi_common_watchdog", "Generic Watchdog"),
+        ("psi_common_dont_opt", "Don't optimize (Xilinx) allows evaluating synthesis"),
+        ("psi_common_debouncer", "Generic Debouncer"),
+        ("psi_common_trigger_analog", "Analog Trigger Generator"),
+        ("psi_common_trigger_digital", "Digital Trigger Generator"),
+        ("psi_common_dyn_sft", "Dynamic Shifter"),
+        ("psi_common_ramp_gene", "Pulse/Ramp generator"),
+        ("psi_common_pulse_generator_ctrl_static", "Pulse generator ctrl static"),
+        ("psi_common_par_ser", "Parallel to serial"),
+        ("psi_common_ser_par", "Serial to parallel"),
+        ("psi_common_find_min_max", "Find Min Max"),
+        ("psi_common_min_max_sum", "Min Max Sum"),
+        ("psi_common_prbs", "PRBS"),
+        ("psi_common_pwm", "PWM generator"),
+        ("psi_common_sample_rate_converter", "Sample rate converter"),
+    ], []),
+]
+
+# Documentation of the components without MD file in doc/files (relative to doc/)
+DOC_LINKS = {
+    "psi_common_array_pkg": "old/ch2_packages/ch2_packages.md#21-psi_common_array_pkg",
+    "psi_common_logic_pkg": "old/ch2_packages/ch2_packages.md#22-psi_common_logic_pkg",
+    "psi_common_axi_pkg": "old/ch2_packages/ch2_packages.md#23-psi_common_axi_pkg",
+    "psi_common_math_pkg": "old/ch2_packages/ch2_packages.md#24-psi_common_math_pkg",
+}
+
+LOGO = '<img align="right" src="psi_logo.png">\n\n***\n'
+
+INDEX_HEAD = LOGO + '''
+# **PSI COMMON Library index**
+
+[Component available list](psi_common_list.md)
+
+### 1 Introduction
+
+[1.1 Working Copy Structure ](ch1_introduction/ch1_introduction.md#11-working-copy-structure)
+
+[1.2 VHDL Libraries](ch1_introduction/ch1_introduction.md#12-vhdl-libraries)
+
+[1.3 Running Simulations](ch1_introduction/ch1_introduction.md#13-running-simulations)
+
+[1.4 Contribute to PSI VHDL Libraries](ch1_introduction/ch1_introduction.md#14contribute-to-psi-vhdl-libraries)
+
+[1.5 Handshaking Signals](ch1_introduction/ch1_introduction.md#15-handshaking-signals)
+
+[1.6 TDM](ch1_introduction/ch1_introduction.md#16-TDM)
+'''
+
+INDEX_TAIL = '''
+### Others
+
+[presentation](presentation/psi_common_presentation.pdf)
+
+[GHDL install](ghdl/GHDL.md)
+'''
@@ -4,169 +4,108 @@
 # Used for library psi_lib
 # Do not work for pkg & testbench only vHDL/RTL file
 # ======================================================================
-import pandas as pd
-import re
 import os
+import re
+import sys
 
-# ======================================================================
-def hdl2md (file_name_i, path_name_o, psi_lib):
-    """Create MD file out of VHDL entity file.
-    Keyword arguments:
-    file_name_i -- the file to convert
-    path_name_o -- the path where to create the Md file
-    psi_lib -- if true psi_lib add logo to md file corresponding to PSI LIB structure"""
-    ports = []
-    name = []
-    vector = []
-    size = []
-    desc = []
-    cmt = []
-    direction = []
-    # helpers
-    count = 0
-    start = 0
-    gene = 0
-    exep = 0
-    # definition for generic processing
-    gName = []
-    gType = []
-    gVal = []
-    gDesc = []
-    gCmt = []
-
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
-    start_port = re.compile(r'port')
-    end_entity = re.compile(r'end')
-    start_generic = re.compile(r'generic')
-    end_element = re.compile(r'[);]|[*);]]|[*);*]]')
-
-
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    with open(file_name_i) as fh:  # open text file
-        lines = [l.strip() for l in fh.readlines()]
-        for l in lines:
-            exep = 0
-            # check start of entity
-            if re.match(start_port, l.lower()):
-                start = 1
-            elif re.match(end_entity, l.lower()):
-                start = 0
-                break
-
-            if re.match(start_generic, l.lower()):
-                gene = 1
-            elif (re.match(start_port, l.lower())) and (gene == 1):
-                exep = 1
-                gene = 0
-
-            # process parsing of generics
-            if gene == 1 or exep == 1:
-                parts = re.sub('\s+', ' ', l.lower()).split(':')
-                # print(parts)
-                if len(parts) > 1:
-                    if gene == 1:
-                        gName.append(parts[0])
-                        gType.append(parts[1].split()[0])
-                        gCmt = parts[-1].split( '--' )
-                        if len(gCmt) == 2:
-                            gDesc.append(parts[-1].split('--')[1])
-                        else:
-                            gDesc.append('N.A')
-
-            # Process parsing of ports
-            if start == 1:
-                parts = re.sub('\s+', ' ', l.lower()).split(':')
-                if len(parts) == 2:
-                    ports = parts[0].strip()
-                    vector = parts[-1].split('(')
-
-                    # extract port of the file and put into lists
-                    if ports:
-                        if not(ports[0:2] == "--"):
-                            if re.match(r'port',ports):
-                                name.append(ports.split('(')[-1])
-                            else:
-                                name.append(ports)
-                            size.append(vector[-1].split(" ")[0])
-                            cmt.append(parts[-1].split(';')[-1])
-                            direction.append((vector[0].strip()[0]))
-
-                            # description auto
-                            if cmt[count]:
-                                if len(parts[-1].split('--')) == 2: # re.match(r'[--]',parts[-1]):
-                                    desc.append(parts[-1].split('--')[-1])
-                                else:
-                                    desc.append( "N.A" )
-                            else:
-                                desc.append("N.A" )
-                            count += 1
-
-    # ======================================================================
-    # Debug print
-    # ======================================================================
-    #print(name)
-    #print(direction)
-    #print(size)
-    #print(desc)
+# shared VHDL lexer and declaration index (scripts/vhdl_index.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from vhdl_index import parse_file, description as comment_description
 
-    #print(gName)
-    #print(gType)
-    #print(gVal)
-    #print(gDesc)
+GENERICS_HEADER = ["Name", "type", "Description"]
+PORTS_HEADER = ["Name", "In/Out", "Length", "Description"]
+MIN_PADDING = 2
 
-    # ======================================================================
-    # Create dict to feed into pandas Data Frame to write MD file
-    # ======================================================================
-    for i in range(0, len(size)):
-        if not size[i] or size[i] == '0':
-            size[i] = '1'
+def description(declaration):
+    """Description of a generic/port: text of its comment (after the last --)"""
+    return comment_description(declaration) or 'N.A'
 
-    md_name = os.path.basename(fh.name)
-    md_name = md_name.split('.')
-    # print(md_name)
-    df1 = pd.DataFrame({"Name": gName, "type": gType, "Description": gDesc})
-    df1 = df1.set_index('Name')
-    df2 = pd.DataFrame({"Name": name, "In/Out": direction, "Length": size, "Description": desc})
-    df2 = df2.set_index('Name')
+def md_escape_cell(text):
+    """Escape | in a table cell"""
+    return re.sub(r'(?<!\\)\|', r'\\|', text)
 
-    # ======================================================================
-    # Format MD file
-    # ======================================================================
-    f = open(path_name_o+"/"+md_name[0]+".md", "w+")  # write into file
-    if psi_lib:
-        f.write('<img align="right" src="../doc/psi_logo.png">')
-    f.write('\n')
-    f.write('***\n')
-    f.write('\n')
-    f.write('# '+md_name[0])
-    f.write('\n')
-    f.write(" - VHDL source: ["+md_name[0]+"]("+file_name_i+")\n")
+def md_table(header, rows, align = None):
+    """Markdown (pipe) table, same layout as pandas to_markdown()
+    Keyword arguments:
+    header -- column titles
+    rows -- list of rows (sequences of cells, converted to str)
+    align -- one of 'l', 'c', 'r' per column (default: all left aligned)"""
+    rows = [[md_escape_cell(str(c)) for c in row] for row in rows]
+    align = align or ['l'] * len(header)
+    widths = [max([len(h) + MIN_PADDING] + [len(row[i]) for row in rows]) for i, h in enumerate(header)]
+    sep = {'l': lambda w: ':' + '-' * (w + 1), 'c': lambda w: ':' + '-' * w + ':', 'r': lambda w: '-' * (w + 1) + ':'}
+    lines = ['| ' + ' | '.join(h.ljust(w) for h, w in zip(header, widths)) + ' |',
+             '|' + '|'.join(sep[a](w) for a, w in zip(align, widths)) + '|']
+    lines += ['| ' + ' | '.join(c.ljust(w) for c, w in zip(row, widths)) + ' |' for row in rows]
+    return '\n'.join(lines)
+
+def entity_tables(entity):
+    """Markdown tables (generics, interfaces) of an entity from the VHDL index"""
+    generics = [(g['name'], g['type'], description(g)) for g in entity['generics']]
+    ports = [(p['name'], (p['direction'] or 'in')[0], p['width'] or '1', description(p)) for p in entity['ports']]
+    return md_table(GENERICS_HEADER, generics), md_table(PORTS_HEADER, ports)
+
+def update_tables(content, generics, ports):
+    """Replace the tables below the Generics and Interfaces titles of an existing MD file, the rest
+    (descriptions, figures) is kept. Returns the new content, None if a title is missing"""
+    for title, table in (('Generics', generics), ('Interfaces', ports)):
+        # title, optional blank lines, table (all rows up to the first line not starting with |)
+        m = re.search(r'^### ' + title + r'[^\n]*\n(?:[ \t]*\n)*((?:[ \t]*\|[^\n]*(?:\n|$))*)', content, re.MULTILINE)
+        if m is None:
+            return None
+        old = m.group(1)
+        rest = content[m.end(1):]
+        if old:
+            new = table + ('\n' if old.endswith('\n') else '')
+        else:
+            new = table + ('\n\n' if rest else '\n')
+        content = content[:m.start(1)] + new + rest
+    return content
+
+def template(file_name_i, md_name, psi_lib, generics, ports):
+    """Content of a new MD file"""
+    text = '<img align="right" src="../doc/psi_logo.png">' if psi_lib else ''
+    text += '\n***\n\n# ' + md_name + '\n'
+    text += " - VHDL source: [" + md_name + "](" + file_name_i + ")\n"
     if psi_lib:
-        f.write(" - Testbench source: ["+md_name[0]+"_tb.vhd](../testbench/"+md_name[0]+"_tb/"+md_name[0]+"_tb.vhd)\n")
-    f.write('\n')
-    f.write('### Description')
-    f.write('\n')
-    f.write("*INSERT YOUR TEXT*")
-    f.write('\n')
-    f.write('\n')
-    f.write('### Generics\n')
-    f.write(df1.to_markdown())
-    f.write('\n')
-    f.write('\n')
-    f.write('### Interfaces\n')
-    f.write(df2.to_markdown())
+        text += " - Testbench source: [" + md_name + "_tb.vhd](../testbench/" + md_name + "_tb/" + md_name + "_tb.vhd)\n"
+    text += '\n### Description\n*INSERT YOUR TEXT*\n\n'
+    text += '### Generics\n' + generics + '\n\n'
+    text += '### Interfaces\n' + ports
+    return text
 
-    f.close()
-    return  print("[INFO]: "+md_name[0]+".vhd MD File created")
-
-def hdl2md1():
-    print('enter file name path + file to convert:')
-    fileName = input()
-    print('enter path to paste md file:')
-    pathName = input()
-    hdl2md(fileName, pathName)
-    return
+# ======================================================================
+def hdl2md (file_name_i, path_name_o, psi_lib, entity = None, verbose = True):
+    """Create MD file out of VHDL entity file.
+    An existing MD file is kept, only its Generics and Interfaces tables are updated.
+    Keyword arguments:
+    file_name_i -- the file to convert
+    path_name_o -- the path where to create the Md file
+    psi_lib -- if true psi_lib add logo to md file corresponding to PSI LIB structure
+    entity -- entity from the VHDL index (see vhdl_index.py), parsed from file_name_i if not given
+    verbose -- print a message for every file
+    Returns True if the MD file was written (False if its content did not change)"""
+    if entity is None:
+        entity = parse_file(file_name_i)['entities'][0]
+    md_name = os.path.basename(file_name_i).split('.')[0]
+    md_file = os.path.join(path_name_o, md_name + ".md")
+    generics, ports = entity_tables(entity)
+
+    old = None
+    if os.path.isfile(md_file):
+        with open(md_file, encoding='utf-8') as f:
+            old = f.read()
+    if old is None:
+        content = template(file_name_i, md_name, psi_lib, generics, ports)
+    else:
+        content = update_tables(old, generics, ports)
+        if content is None:
+            print("[WARNING]: " + md_file + " has no Generics/Interfaces titles, not updated")
+            return False
+    if content == old:
+        return False
+    with open(md_file, "w+", encoding='utf-8') as f:
+        f.write(content)
+    if verbose:
+        print("[INFO]: " + md_name + ".vhd MD File " + ("updated" if old is not None else "created"))
+    return True
@@ -1,42 +1,170 @@
 # ======================================================================
 # Script that generate MD file template for PSI library
 # Benoît Stef - WBBA 311
+#
+# Generates the MD files of all entities below the source folder (packages
+# and files without entity are skipped) and rebuilds the component list and
+# the index (doc/psi_common_list.md, doc/psi_common_index.md, see
+# doc_structure.py). Only entities whose source changed since the last run
+# are converted (the declaration index of the last run is stored in
+# .hdl2md_index.json), the files are parsed and converted in parallel
+# processes.
+#
+# Usage: python hdl2md_all.py [-src <hdl folder>] [-dst <md folder>] [-doc <doc folder>] [-jobs <n>] [-force]
 # ======================================================================
-import pandas as pd
-import re
+import argparse
 import os
-from os import listdir
-from os.path import isfile, join
-from hdl2md import hdl2md
-
-print('select path with files to convert:')
-path_file = input()
-print('select path to copy MD files:')
-md_file = input()
-print('Is psi_lib ? (true or false):')
-psi_lib = input()
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(THIS_DIR, '..', '..'))
+sys.path.append(os.path.join(THIS_DIR, '..'))
+
+from hdl2md import hdl2md, md_table
+from vhdl_index import build_index, load_index, save_index, index_path
+from doc_structure import CHAPTERS, DOC_LINKS, LOGO, INDEX_HEAD, INDEX_TAIL
+
+DOC_INDEX_FILE = os.path.join(THIS_DIR, '.hdl2md_index.json')
+
+def rel_link(path, start):
+    return Path(os.path.relpath(path, start)).as_posix()
+
+def md_escape(name):
+    return name.replace('_', '\\_')
+
+def write_if_changed(file_name, content):
+    """Write content to file_name if it differs from the current content, returns True if written"""
+    if os.path.isfile(file_name):
+        with open(file_name, encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
 # ======================================================================
-# Discard pkg from the entire repo
+# Component list and index
 # ======================================================================
-c = 0
-onlyfiles = [f for f in listdir(path_file) if isfile(join(path_file, f))]
-nPop = []
-newList = []
-
-for p in range(0, len(onlyfiles)):
-    test = onlyfiles[p].split('pkg')
-    if len(test) == 2:
-        nPop.append(p)
-        # print(test)
-    else:
-        newList.append(onlyfiles[p])
+def doc_link(name, md_dir, doc_dir):
+    """Link (relative to doc_dir) to the documentation of a component, None if there is none"""
+    md_file = os.path.join(md_dir, name + '.md')
+    if os.path.isfile(md_file):
+        return rel_link(md_file, doc_dir)
+    return DOC_LINKS.get(name)
+
+def md_anchor(title):
+    """Anchor of a Markdown title (GitHub style)"""
+    return re.sub(r'[^\w\- ]', '', title.lower()).replace(' ', '-')
+
+def related_title(section):
+    return 'Other components that can be used as {}'.format(section.split(' components')[0].lower())
+
+def build_list(sources, md_dir, doc_dir):
+    """Content of psi_common_list.md
+    Keyword arguments:
+    sources -- dictionary component name -> VHDL file
+    md_dir -- folder of the MD files of the components
+    doc_dir -- folder of psi_common_list.md"""
+    text = LOGO
+    for _, section, components, related in CHAPTERS:
+        rows = []
+        for name, desc in components:
+            if name not in sources:
+                continue
+            link = doc_link(name, md_dir, doc_dir)
+            rows.append((desc, '[{}.vhd]({})'.format(name, rel_link(sources[name], doc_dir)),
+                         '[link]({})'.format(link) if link else 'N.A'))
+        text += '\n### {}\n\n'.format(section)
+        text += md_table(['Component', 'Source', 'Description'], rows, ['l', 'l', 'c']) + '\n'
+        if related:
+            text += '\n##### {}\n'.format(related_title(section))
+            for name in related:
+                text += '- [{}]({})\n'.format(name, doc_link(name, md_dir, doc_dir))
+        text += '\n***\n'
+    return text
+
+def build_index_md(sources, md_dir, doc_dir):
+    """Content of psi_common_index.md, see build_list()"""
+    text = INDEX_HEAD
+    for chapter, (title, section, components, related) in enumerate(CHAPTERS, 2):
+        text += '\n### {} {}\n'.format(chapter, title)
+        entries = []
+        for name in [name for name, _ in components if name in sources]:
+            entries.append((md_escape(name), doc_link(name, md_dir, doc_dir)))
+        if related:
+            # the components are listed in the section of psi_common_list.md
+            entries.append(('Other Components that can be used as {}'.format(title),
+                            'psi_common_list.md#' + md_anchor(related_title(section))))
+        for i, (entry, link) in enumerate(entries, 1):
+            entry = '{}.{} {}'.format(chapter, i, entry)
+            text += '\n' + ('[{}]({})'.format(entry, link) if link else entry) + '\n'
+    return text + INDEX_TAIL
+
+def todo_args(todo, dst, psi_lib):
+    """Arguments of hdl2md() for the entities to convert"""
+    return [(file_name, dst, psi_lib, entity) for file_name, entity in todo]
 
 # ======================================================================
-# Lists creation loop, file by file
-# ======================================================================
-i = 0
-for i in range (0, len(onlyfiles)):
-    hdl2md(path_file + '/' + onlyfiles[i], md_file, psi_lib)
+def hdl2md_all(src, dst, doc = None, psi_lib = True, jobs = None, force = False, index_file = DOC_INDEX_FILE):
+    """Generate the MD files of all entities below src
+    Keyword arguments:
+    src -- folder with the VHDL files
+    dst -- folder of the MD files
+    doc -- folder of psi_common_list.md / psi_common_index.md (None: not rebuilt)
+    psi_lib -- PSI library layout (logo, testbench link)
+    jobs -- number of processes parsing and converting the files (None: number of CPUs)
+    force -- convert all entities, not only the changed ones
+    index_file -- declaration index of the last run (None: convert all entities)
+    Returns list of the MD files written"""
+    old_index = None if force or not index_file else load_index(index_file)
+    old_files = old_index['files'] if old_index else {}
+    index = build_index([src], old_index, jobs)
+
+    todo = []
+    sources = {}
+    for key, entry in index['files'].items():
+        file_name = index_path(key)
+        sources[os.path.basename(key).split('.')[0]] = file_name
+        if not entry['entities']:
+            continue
+        md_file = os.path.join(dst, os.path.basename(key).split('.')[0] + '.md')
+        old = old_files.get(key)
+        if old is None or old['digest'] != entry['digest'] or not os.path.isfile(md_file):
+            todo.append((rel_link(file_name, dst), entry['entities'][0]))
+
+    os.makedirs(dst, exist_ok=True)
+    if jobs != 1 and len(todo) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            results = list(pool.map(hdl2md, *zip(*todo_args(todo, dst, psi_lib)), chunksize=4))
+    else:
+        results = [hdl2md(*args) for args in todo_args(todo, dst, psi_lib)]
+    written = [os.path.join(dst, os.path.basename(f).split('.')[0] + '.md') for (f, _), w in zip(todo, results) if w]
+
+    if doc is not None:
+        for name, build in (('psi_common_list.md', build_list), ('psi_common_index.md', build_index_md)):
+            file_name = os.path.join(doc, name)
+            if write_if_changed(file_name, build(sources, dst, doc)):
+                written.append(file_name)
+                print("[INFO]: " + name + " rebuilt")
+    if index_file:
+        save_index(index, index_file)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the MD documentation of all entities")
+    parser.add_argument("-src", help="folder with the VHDL files", default=os.path.join(REPO_DIR, 'hdl'))
+    parser.add_argument("-dst", help="folder of the MD files", default=os.path.join(REPO_DIR, 'doc', 'files'))
+    parser.add_argument("-doc", help="folder of the component list and index", default=os.path.join(REPO_DIR, 'doc'))
+    parser.add_argument("-no_lists", help="do not rebuild the component list and index", action="store_true")
+    parser.add_argument("-not_psi_lib", help="no PSI library layout (logo, testbench links)", action="store_true")
+    parser.add_argument("-jobs", help="number of parallel workers", type=int, default=None)
+    parser.add_argument("-force", help="convert all entities, not only the changed ones", action="store_true")
+    args = parser.parse_args()
 
-print("---------------------------------------- ")
-print("[INFO]: All library succesfully MD filed ")
\ No newline at end of file
+    written = hdl2md_all(args.src, args.dst, None if args.no_lists else args.doc, not args.not_psi_lib,
+                         args.jobs, args.force)
+    print("---------------------------------------- ")
+    print("[INFO]: {} MD files written".format(len(written)))
@@ -0,0 +1,65 @@
+# ======================================================================
+# Tests of hdl2md.py (run with pytest from the repository root)
+# ======================================================================
+import os
+import shutil
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(THIS_DIR, '..', '..'))
+sys.path.insert(0, THIS_DIR)
+sys.path.insert(0, os.path.join(THIS_DIR, '..'))
+
+from hdl2md import hdl2md, entity_tables
+from vhdl_index import parse_vhdl
+
+def test_regenerate_existing_md(tmp_path):
+    """Tables separated from their title by blank lines are replaced, regenerating does not change the file"""
+    name = 'psi_common_async_fifo'
+    md_file = os.path.join(str(tmp_path), name + '.md')
+    shutil.copy(os.path.join(REPO_DIR, 'doc', 'files', name + '.md'), md_file)
+    vhd_file = os.path.join(REPO_DIR, 'hdl', name + '.vhd')
+    with open(md_file, encoding='utf-8') as f:
+        before = f.read()
+
+    assert hdl2md(vhd_file, str(tmp_path), True, verbose=False)
+    with open(md_file, encoding='utf-8') as f:
+        content = f.read()
+    assert content.count('### Generics') == 1 and content.count('### Interfaces') == 1
+    assert content.count('| Name ') == 2
+    assert 'Width of the FIFO|' not in content
+    # text outside of the tables is kept
+    assert content.split('### Generics')[0] == before.split('### Generics')[0]
+
+    assert not hdl2md(vhd_file, str(tmp_path), True, verbose=False)
+    with open(md_file, encoding='utf-8') as f:
+        assert f.read() == content
+
+def test_table_cells():
+    """| in comments is escaped (trailing | removed), ports without mode are inputs"""
+    entity = parse_vhdl('''
+entity e is
+  generic(a_g : natural := 1;             -- Width of the FIFO|
+          b_g : natural := 2);            -- either a | b
+  port(clk_i : std_logic;                 -- clock
+       dat_o : out std_logic_vector(a_g - 1 downto 0));
+end entity;''')['entities'][0]
+    generics, ports = entity_tables(entity)
+    rows = generics.splitlines()[2:]
+    assert rows[0].rstrip(' |').endswith('Width of the FIFO')
+    assert 'either a \\| b' in rows[1]
+    assert all(row.count('|') - row.count('\\|') == 4 for row in rows)
+    assert ports.splitlines()[2].split('|')[2].strip() == 'i'
+
+def test_type_spacing():
+    """Types and defaults keep single spaces around reserved words, also if the source has none"""
+    entity = parse_vhdl('''
+entity e is
+  generic(c_g : t_aslv8(0 to 1) := (0=>(others=>'0'), 1 => x"FF"));
+  port(dat_o : out std_logic_vector(choose(tdm_g,width_g-1,ch_nb_g*width_g-1)downto 0);
+       len_o : out unsigned(dat_o'range));
+end entity;''')['entities'][0]
+    assert entity['generics'][0]['type'] == 't_aslv8(0 to 1)'
+    assert entity['generics'][0]['default'] == '(0 => (others => \'0\'),1 => x"FF")'
+    assert entity['ports'][0]['type'] == 'std_logic_vector(choose(tdm_g,width_g-1,ch_nb_g*width_g-1) downto 0)'
+    assert entity['ports'][1]['type'] == "unsigned(dat_o'range)"
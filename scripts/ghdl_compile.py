@@ -0,0 +1,221 @@
+##############################################################################
+# Dependency-aware incremental compilation of a PsiSim configuration with GHDL
+#
+# The dependency graph of the sources in sim/config.tcl is built from the
+# VHDL declaration index (use clauses, entity/component instantiations,
+# architectures of entities declared in other files). Only files whose
+# content changed and the files depending on them are analyzed again, in
+# topological order.
+##############################################################################
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from sim_config import parse_config, check_sources, DEFAULT_CONFIG
+from vhdl_index import build_index, load_index, save_index, index_key
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.abspath(os.path.join(THIS_DIR, "../sim/regression"))
+
+GHDL_FLAGS = ["-frelaxed-rules", "-Wno-shared", "--ieee=synopsys"]
+VHDL_STD = {"1993" : "93c", "93" : "93c", "2002" : "02", "2008" : "08"}
+
+def library_dir(out_dir):
+    return os.path.join(out_dir, "lib")
+
+def std_flag(version):
+    return "--std=" + VHDL_STD.get(str(version), "08")
+
+# ======================================================================
+# Dependency graph
+# ======================================================================
+def referenced_units(entry, library):
+    """Names (lower case) of the design units of the own library a file refers to"""
+    own = ("work", library.lower())
+    units = set()
+    for use in entry["uses"]:
+        parts = use.split(".")
+        if len(parts) > 1 and parts[0] in own:
+            units.add(parts[1])
+    for inst in entry["instances"]:
+        if inst["kind"] == "component" or (inst["library"] or "work").lower() in own:
+            units.add(inst["entity"].lower())
+    for arch in entry["architectures"]:
+        units.add(arch["entity"].lower())
+    return units
+
+def dependency_graph(sources, index):
+    """Dependencies between the source files
+    Keyword arguments:
+    sources -- sources of the configuration (see sim_config.parse_config)
+    index -- VHDL declaration index containing all sources
+    Returns dictionary file -> set of files it depends on (only files of the sources)"""
+    defined = {}
+    for src in sources:
+        entry = index["files"][index_key(src["file"])]
+        for unit in entry["entities"] + entry["packages"]:
+            defined.setdefault((src["library"], unit["name"].lower()), src["file"])
+    deps = {}
+    for src in sources:
+        entry = index["files"][index_key(src["file"])]
+        deps[src["file"]] = {defined[(src["library"], unit)] for unit in referenced_units(entry, src["library"])
+                             if (src["library"], unit) in defined} - {src["file"]}
+    return deps
+
+def source_graph(config, index_file):
+    """Dependency graph of the VHDL sources of a configuration
+    The declaration index is kept in index_file, only changed files are parsed again.
+    Returns tuple (files in configuration order, dependencies, index)"""
+    sources = [src for src in config["sources"] if src["language"].lower() == "vhdl"]
+    files = list(dict.fromkeys(src["file"] for src in sources))
+    index = build_index(files, load_index(index_file))
+    save_index(index, index_file)
+    return files, dependency_graph(sources, index), index
+
+def topological_order(files, deps):
+    """Order files so that each file comes after its dependencies, keeping the given order where possible"""
+    position = {f : k for k, f in enumerate(files)}
+    done = set()
+    order = []
+
+    def visit(f, path):
+        if f in done or f in path:
+            return
+        path.add(f)
+        for d in sorted(deps.get(f, ()), key=position.get):
+            visit(d, path)
+        path.discard(f)
+        done.add(f)
+        order.append(f)
+
+    for f in files:
+        visit(f, set())
+    return order
+
+def dependants(files, deps):
+    """All files depending (transitively) on any of the given files"""
+    reverse = {}
+    for f, ds in deps.items():
+        for d in ds:
+            reverse.setdefault(d, set()).add(f)
+    result = set()
+    todo = list(files)
+    while todo:
+        for f in reverse.get(todo.pop(), ()):
+            if f not in result:
+                result.add(f)
+                todo.append(f)
+    return result
+
+# ======================================================================
+# Incremental compilation
+# ======================================================================
+def load_state(state_file):
+    try:
+        with open(state_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, state_file):
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_file, state_file)
+
+def compile_plan(config, out_dir, ghdl = "ghdl", flags = GHDL_FLAGS, clean = False):
+    """Determine which files must be analyzed
+    Returns tuple (files to analyze in order, digests of all sources, reason per file)"""
+    files, deps, index = source_graph(config, os.path.join(out_dir, "vhdl_index.json"))
+    digests = {f : index["files"][index_key(f)]["digest"] for f in files}
+
+    state = load_state(os.path.join(out_dir, "compile_state.json"))
+    settings = {"ghdl" : ghdl, "flags" : flags}
+    if clean or state.get("settings") != settings or not os.path.isdir(library_dir(out_dir)):
+        reasons = {f : "clean" for f in files}
+    else:
+        compiled = state.get("files", {})
+        reasons = {f : "changed" for f in files if compiled.get(f) != digests[f]}
+        for f in dependants(list(reasons), deps):
+            reasons.setdefault(f, "dependant")
+    order = [f for f in topological_order(files, deps) if f in reasons]
+    return order, digests, reasons
+
+def compile_incremental(config, out_dir, ghdl = "ghdl", flags = GHDL_FLAGS, clean = False, verbose = True):
+    """Analyze changed files and their dependants with GHDL
+    GHDL rewrites the library index (.cf) on every analysis, so files of one
+    library cannot be analyzed by concurrent processes. Instead, consecutive
+    files with the same library and VHDL version are analyzed by one GHDL call,
+    which saves the start-up and library loading of a call per file.
+    Returns tuple (success, log file, list of analyzed files)"""
+    os.makedirs(library_dir(out_dir), exist_ok=True)
+    order, digests, reasons = compile_plan(config, out_dir, ghdl, flags, clean)
+    state_file = os.path.join(out_dir, "compile_state.json")
+    state = load_state(state_file)
+    if clean or state.get("settings") != {"ghdl" : ghdl, "flags" : flags}:
+        state = {"settings" : {"ghdl" : ghdl, "flags" : flags}, "files" : {}}
+    source = {src["file"] : src for src in config["sources"]}
+
+    # group consecutive files with the same library and version into one call
+    batches = []
+    for f in order:
+        key = (source[f]["library"], source[f]["version"])
+        if batches and batches[-1][0] == key:
+            batches[-1][1].append(f)
+        else:
+            batches.append((key, [f]))
+
+    log_file = os.path.join(out_dir, "compile.log")
+    success = True
+    with open(log_file, "w") as log:
+        for (library, version), batch in batches:
+            if verbose:
+                for f in batch:
+                    print("Analyze ({:9s}) {}".format(reasons[f], f))
+            cmd = [ghdl, "-a", std_flag(version)] + flags + \
+                  ["--work=" + library, "--workdir=" + library_dir(out_dir)] + batch
+            log.write(" ".join(cmd) + "\n")
+            log.flush()
+            if subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT).returncode != 0:
+                success = False
+                break
+            for f in batch:
+                state["files"][f] = digests[f]
+            save_state(state, state_file)
+    return success, log_file, order
+
+# ======================================================================
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Incremental GHDL compilation of a PsiSim configuration")
+    parser.add_argument("-config", help="PsiSim configuration file", default=DEFAULT_CONFIG)
+    parser.add_argument("-out", help="output directory (library and compile state)", default=DEFAULT_OUT_DIR)
+    parser.add_argument("-ghdl", help="GHDL executable", default="ghdl")
+    parser.add_argument("-clean", help="analyze all files", action="store_true")
+    parser.add_argument("-plan", help="only print the files that would be analyzed", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = parse_config(args.config)
+    if not check_sources(config, args.config):
+        return 1
+    out_dir = os.path.abspath(args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    if args.plan:
+        order, digests, reasons = compile_plan(config, out_dir, args.ghdl, GHDL_FLAGS, args.clean)
+        for f in order:
+            print("{:10s}{}".format(reasons[f], f))
+        print("[INFO]: {} of {} files to analyze".format(len(order), len(digests)))
+        return 0
+
+    t0 = time.perf_counter()
+    success, log_file, order = compile_incremental(config, out_dir, args.ghdl, GHDL_FLAGS, args.clean)
+    if not success:
+        print("[ERROR]: compilation failed, see " + log_file)
+        return 2
+    print("[INFO]: {} files analyzed in {:.1f} s".format(len(order), time.perf_counter() - t0))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+##############################################################################
+# Parallel regression runner for GHDL
+#
+# Parses sim/config.tcl, analyzes the changed sources and runs every
+# (testbench, generic set) pair as an independent job on a worker pool.
+# Each job gets its own log file and timeout, the results are written as
+# JSON and JUnit XML summaries.
+##############################################################################
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sim_config import parse_config, check_sources, tb_run_jobs, DEFAULT_CONFIG
+from ghdl_compile import compile_incremental, library_dir, std_flag, GHDL_FLAGS, DEFAULT_OUT_DIR
+from test_impact import git_changed_files, select_impacted_jobs, print_selection
+
+RUN_FLAGS = ["--ieee-asserts=disable-at-0"]
+ERROR_MARKER = "###ERROR###"
+
+# ======================================================================
+# Compile and run
+# ======================================================================
+def scan_log(log_file):
+    """Return (number of error lines, first error line) of a simulation log"""
+    errors = 0
+    first_error = None
+    with open(log_file, errors="replace") as f:
+        for line in f:
+            if ERROR_MARKER in line:
+                errors += 1
+                if first_error is None:
+                    first_error = line.strip()
+    return errors, first_error
+
+def run_job(job, out_dir, ghdl = "ghdl", flags = GHDL_FLAGS, std = "2008", timeout = None):
+    """Elaborate and run one (testbench, generic set) in its own directory
+    Returns the job dictionary extended by status ('pass', 'fail', 'timeout'),
+    returncode, errors, first_error, time and log"""
+    job_dir = os.path.join(out_dir, "jobs", job["name"])
+    os.makedirs(job_dir, exist_ok=True)
+    log_file = os.path.join(out_dir, "logs", job["name"] + ".log")
+    cmd = [ghdl, "--elab-run", std_flag(std)] + flags + \
+          ["--work=" + job["library"], "--workdir=" + library_dir(out_dir)] + \
+          job["resolved_args"] + [job["tb"]] + RUN_FLAGS
+
+    t0 = time.perf_counter()
+    returncode = None
+    with open(log_file, "w") as log:
+        log.write(" ".join(cmd) + "\n")
+        log.flush()
+        try:
+            returncode = subprocess.run(cmd, cwd=job_dir, stdout=log, stderr=subprocess.STDOUT,
+                                        timeout=timeout).returncode
+        except subprocess.TimeoutExpired:
+            log.write("\n###TIMEOUT### after {} s\n".format(timeout))
+    elapsed = time.perf_counter() - t0
+
+    errors, first_error = scan_log(log_file)
+    if returncode is None:
+        status = "timeout"
+    elif returncode != 0 or errors:
+        status = "fail"
+    else:
+        status = "pass"
+    return dict(job, status=status, returncode=returncode, errors=errors, first_error=first_error,
+                time=elapsed, log=log_file)
+
+# ======================================================================
+# Scheduling
+# ======================================================================
+def select_jobs(jobs, name_filter = None, shard = None):
+    """Filter jobs by a regex on the job name and select a shard ("i/n", i from 0 to n-1)"""
+    if name_filter:
+        jobs = [j for j in jobs if re.search(name_filter, j["name"])]
+    if shard:
+        i, n = (int(x) for x in shard.split("/"))
+        jobs = jobs[i::n]
+    return jobs
+
+def previous_durations(summary_file):
+    """Durations of the jobs of a previous run, used to start the longest jobs first"""
+    try:
+        with open(summary_file) as f:
+            return {r["name"] : r["time"] for r in json.load(f)["results"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def run_jobs(jobs, out_dir, workers = None, ghdl = "ghdl", timeout = None, on_result = None):
+    """Run jobs on a worker pool (threads, each job is a simulator process)
+    Jobs known to be long from a previous run are started first.
+    Returns list of results in the order of the jobs"""
+    os.makedirs(os.path.join(out_dir, "logs"), exist_ok=True)
+    durations = previous_durations(os.path.join(out_dir, "regression.json"))
+    order = sorted(range(len(jobs)), key=lambda k: -durations.get(jobs[k]["name"], float("inf")))
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(run_job, jobs[k], out_dir, ghdl, GHDL_FLAGS, "2008", timeout) : k for k in order}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result:
+                on_result(results[futures[future]])
+    return results
+
+# ======================================================================
+# Reports
+# ======================================================================
+def write_json(results, file_name, elapsed):
+    summary = {"total" : len(results),
+               "passed" : sum(r["status"] == "pass" for r in results),
+               "failed" : sum(r["status"] == "fail" for r in results),
+               "timeout" : sum(r["status"] == "timeout" for r in results),
+               "time" : elapsed,
+               "results" : results}
+    with open(file_name, "w") as f:
+        json.dump(summary, f, indent=1)
+
+def write_junit(results, file_name, elapsed, suite_name = "psi_common"):
+    suite = ET.Element("testsuite", name=suite_name, tests=str(len(results)),
+                       failures=str(sum(r["status"] == "fail" for r in results)),
+                       errors=str(sum(r["status"] == "timeout" for r in results)),
+                       time="{:.3f}".format(elapsed))
+    for r in results:
+        case = ET.SubElement(suite, "testcase", classname=r["tb"], name=r["name"], time="{:.3f}".format(r["time"]))
+        ET.SubElement(case, "system-out").text = "generics: {}\nlog: {}".format(" ".join(r["args"]), r["log"])
+        if r["status"] == "fail":
+            ET.SubElement(case, "failure", message=r["first_error"] or "returncode {}".format(r["returncode"]))
+        elif r["status"] == "timeout":
+            ET.SubElement(case, "error", message="timeout")
+    ET.ElementTree(suite).write(file_name, encoding="utf-8", xml_declaration=True)
+
+def print_result(r):
+    print("[{:7s}] {:50s} {:8.1f} s  {}".format(r["status"].upper(), r["name"], r["time"], r["first_error"] or ""))
+    sys.stdout.flush()
+
+# ======================================================================
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Run the PsiSim regression in parallel with GHDL")
+    parser.add_argument("-config", help="PsiSim configuration file", default=DEFAULT_CONFIG)
+    parser.add_argument("-out", help="output directory (library, logs, summaries)", default=DEFAULT_OUT_DIR)
+    parser.add_argument("-jobs", help="number of parallel simulations (default: all cores)", type=int, default=None)
+    parser.add_argument("-timeout", help="timeout per simulation in seconds", type=float, default=None)
+    parser.add_argument("-filter", help="regex on job names (<tb> or <tb>.<generic set index>)", default=None)
+    parser.add_argument("-shard", help="only run shard i of n (\"i/n\") of the jobs, e.g. for several CI machines", default=None)
+    parser.add_argument("-changed", help="only run tb runs affected by these changed files", nargs="+", default=None)
+    parser.add_argument("-changed_since", help="only run tb runs affected by changes against this git revision", default=None)
+    parser.add_argument("-ghdl", help="GHDL executable", default="ghdl")
+    parser.add_argument("-no_compile", help="reuse the library compiled by a previous run", action="store_true")
+    parser.add_argument("-clean", help="analyze all sources, not only the changed ones", action="store_true")
+    parser.add_argument("-list", help="only list the jobs", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = parse_config(args.config)
+    if not check_sources(config, args.config):
+        return 1
+    out_dir = os.path.abspath(args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = tb_run_jobs(config, "GHDL")
+    if args.changed or args.changed_since:
+        changed = (args.changed or []) + (git_changed_files(args.changed_since) if args.changed_since else [])
+        impacted = select_impacted_jobs(jobs, config, changed, os.path.join(out_dir, "vhdl_index.json"))
+        print_selection(jobs, impacted, previous_durations(os.path.join(out_dir, "regression.json")))
+        jobs = impacted
+    jobs = select_jobs(jobs, args.filter, args.shard)
+    if args.list:
+        for job in jobs:
+            print("{:50s} {}".format(job["name"], " ".join(job["args"])))
+        return 0
+
+    t0 = time.perf_counter()
+    if not args.no_compile:
+        print("-- Compile")
+        success, log_file, analyzed = compile_incremental(config, out_dir, args.ghdl, GHDL_FLAGS, args.clean, verbose=False)
+        print("{} files analyzed".format(len(analyzed)))
+        if not success:
+            print("[ERROR]: compilation failed, see " + log_file)
+            return 2
+    print("-- Run {} jobs".format(len(jobs)))
+    results = run_jobs(jobs, out_dir, args.jobs, args.ghdl, args.timeout, print_result)
+    elapsed = time.perf_counter() - t0
+
+    write_json(results, os.path.join(out_dir, "regression.json"), elapsed)
+    write_junit(results, os.path.join(out_dir, "regression.xml"), elapsed)
+    failed = [r for r in results if r["status"] != "pass"]
+    print("-- {} passed, {} failed in {:.1f} s".format(len(results) - len(failed), len(failed), elapsed))
+    for r in failed:
+        print("[{}]: {} {}".format(r["status"].upper(), r["name"], " ".join(r["args"])))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
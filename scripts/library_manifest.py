@@ -0,0 +1,189 @@
+# ======================================================================
+# Library manifest of psi_common
+#
+# The manifest (psi_common_manifest.json in the repository root) lists the
+# entities of hdl/ with their generics (type, default) and ports
+# (direction, type, width expression), the packages they use and the
+# entities they instantiate, as well as the packages with their
+# subprograms. It is generated from the VHDL index (vhdl_index.py) and
+# committed with the sources, so tools can answer questions about the
+# library without parsing VHDL:
+#
+#   from library_manifest import load_manifest
+#   m = load_manifest()
+#   m.entities_with_generic('afull_lvl_g')
+#   m.instantiates('psi_common_ping_pong')
+#
+# Usage: python library_manifest.py [-o <file>] [-check]
+# ======================================================================
+import os
+import re
+import sys
+import json
+import argparse
+
+from vhdl_index import REPO_DIR, build_index, load_index, file_digest, description
+
+# bump when the structure of the manifest changes
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_FILE = os.path.join(REPO_DIR, 'psi_common_manifest.json')
+DEFAULT_ROOTS = [os.path.join(REPO_DIR, 'hdl')]
+
+def library_version(changelog = os.path.join(REPO_DIR, 'Changelog.md')):
+    """Latest version of the changelog, None if not found"""
+    try:
+        with open(changelog) as fh:
+            for line in fh:
+                m = re.match(r'##\s*(\d+\.\d+\.\d+)', line)
+                if m:
+                    return m.group(1)
+    except OSError:
+        pass
+    return None
+
+def used_package(use):
+    """'work.psi_common_math_pkg.all' -> 'work.psi_common_math_pkg'"""
+    return '.'.join(use.split('.')[:2])
+
+# ======================================================================
+# Build
+# ======================================================================
+def build_manifest(roots = DEFAULT_ROOTS, index = None, jobs = 1):
+    """Build the manifest of the VHDL files below roots
+    Keyword arguments:
+    roots -- directories (searched recursively) and/or single files
+    index -- previous VHDL index, files with unchanged content are not parsed again
+    jobs -- number of processes parsing the files (None: number of CPUs)
+    Returns manifest dictionary"""
+    index = build_index(roots, index, jobs)
+    entities = {}
+    packages = {}
+    for key, entry in sorted(index['files'].items()):
+        uses = sorted(set(used_package(u) for u in entry['uses']))
+        for entity in entry['entities']:
+            name = entity['name'].lower()
+            entities[name] = {
+                'file' : key,
+                'generics' : [{'name' : g['name'], 'type' : g['type'], 'default' : g['default'],
+                               'description' : description(g)} for g in entity['generics']],
+                'ports' : [{'name' : p['name'], 'direction' : p['direction'], 'type' : p['type'],
+                            'width' : p['width'], 'description' : description(p)} for p in entity['ports']],
+                'packages' : uses,
+                'instances' : [{'label' : i['label'], 'entity' : i['entity'].lower(), 'library' : i['library'],
+                                'kind' : i['kind']} for i in entry['instances']
+                               if (i['parent'] or '').lower() == name],
+            }
+        for package in entry['packages']:
+            packages[package['name'].lower()] = {
+                'file' : key,
+                'packages' : uses,
+                'subprograms' : sorted(set(f['name'] for f in package['functions'])),
+            }
+    return {'manifest_version' : MANIFEST_VERSION,
+            'library' : 'psi_common',
+            'version' : library_version(),
+            'files' : {key : entry['digest'] for key, entry in sorted(index['files'].items())},
+            'entities' : entities,
+            'packages' : packages}
+
+def save_manifest(manifest, manifest_file = DEFAULT_MANIFEST_FILE):
+    """Write the manifest (stable formatting for readable diffs), returns True if the file changed"""
+    text = json.dumps(manifest, indent=1) + '\n'
+    if os.path.isfile(manifest_file):
+        with open(manifest_file) as fh:
+            if fh.read() == text:
+                return False
+    with open(manifest_file, 'w', newline='\n') as fh:
+        fh.write(text)
+    return True
+
+# ======================================================================
+# Loader
+# ======================================================================
+class LibraryManifest:
+    """Queries on a loaded manifest, names are case insensitive"""
+    def __init__(self, manifest):
+        if manifest.get('manifest_version') != MANIFEST_VERSION:
+            raise ValueError("manifest version {} is not supported (expected {})".format(
+                             manifest.get('manifest_version'), MANIFEST_VERSION))
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.entities = manifest['entities']
+        self.packages = manifest['packages']
+
+    def entity(self, name):
+        """Entity dictionary, KeyError if the entity does not exist"""
+        return self.entities[name.lower()]
+
+    def entities_with_generic(self, generic):
+        """Names of the entities having the generic"""
+        generic = generic.lower()
+        return [n for n, e in self.entities.items() if any(g['name'].lower() == generic for g in e['generics'])]
+
+    def entities_with_port(self, port):
+        """Names of the entities having the port"""
+        port = port.lower()
+        return [n for n, e in self.entities.items() if any(p['name'].lower() == port for p in e['ports'])]
+
+    def instantiates(self, name, recursive = False):
+        """Names of the entities instantiated by an entity (sorted, with recursive = True the whole hierarchy,
+        only entities of the library are followed)"""
+        found = set()
+        todo = [name.lower()]
+        while todo:
+            for inst in self.entity(todo.pop())['instances']:
+                if inst['entity'] not in found:
+                    found.add(inst['entity'])
+                    if recursive and inst['entity'] in self.entities:
+                        todo.append(inst['entity'])
+        return sorted(found)
+
+    def instantiated_by(self, name):
+        """Names of the entities instantiating an entity"""
+        name = name.lower()
+        return [n for n, e in self.entities.items() if any(i['entity'] == name for i in e['instances'])]
+
+    def users_of_package(self, package):
+        """Names of the entities using a package (name with or without library)"""
+        package = package.lower()
+        return [n for n, e in self.entities.items() if any(p == package or p.split('.')[-1] == package
+                                                           for p in e['packages'])]
+
+    def stale_files(self, repo_dir = REPO_DIR):
+        """Files of the manifest whose content changed (or that were removed) since it was generated"""
+        stale = []
+        for key, digest in self.manifest['files'].items():
+            path = os.path.join(repo_dir, key)
+            if not os.path.isfile(path) or file_digest(path) != digest:
+                stale.append(key)
+        return stale
+
+def load_manifest(manifest_file = DEFAULT_MANIFEST_FILE):
+    """Load a manifest file, returns LibraryManifest"""
+    with open(manifest_file) as fh:
+        return LibraryManifest(json.load(fh))
+
+# ======================================================================
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Generate the library manifest of psi_common")
+    parser.add_argument("roots", nargs="*", default=DEFAULT_ROOTS, help="directories and/or files (default: hdl)")
+    parser.add_argument("-o", help="manifest file", default=DEFAULT_MANIFEST_FILE)
+    parser.add_argument("-check", action="store_true", help="only check that the manifest is up to date")
+    parser.add_argument("-jobs", type=int, default=1, help="number of parsing processes")
+    args = parser.parse_args(argv)
+
+    manifest = build_manifest(args.roots, load_index(), args.jobs)
+    if args.check:
+        with open(args.o) as fh:
+            if json.load(fh) != manifest:
+                print("[ERROR]: {} is not up to date, run scripts/library_manifest.py".format(args.o))
+                return 1
+        print("[INFO]: {} is up to date".format(args.o))
+        return 0
+    changed = save_manifest(manifest, args.o)
+    print("[INFO]: {} entities, {} packages {} {}".format(len(manifest['entities']), len(manifest['packages']),
+          "written to" if changed else "unchanged in", args.o))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
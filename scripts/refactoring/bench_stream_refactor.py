@@ -0,0 +1,87 @@
+# ======================================================================
+# Throughput benchmark of the streaming refactoring
+# Generates a large netlist-like VHDL file (many instantiations of v2
+# psi_common entities), refactors it with refactor_file() and reports
+# throughput in MB/s and the peak python memory use.
+# ======================================================================
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+from hdlrefactor import set_refactor_database, refactor_file
+
+INSTANCE = """  i_fifo_{0} : entity work.psi_common_async_fifo
+    generic map(
+      Width_g        => 16,
+      Depth_g        => 32,
+      AlmFullOn_g    => true,
+      AlmFullLevel_g => 28
+    )
+    port map(
+      InClk   => clk_a,     -- write side
+      InRst   => rst_a,
+      InData  => data_{0},
+      InVld   => vld_{0},
+      InRdy   => rdy_{0},
+      OutClk  => clk_b,     -- read side
+      OutRst  => rst_b,
+      OutData => out_{0},
+      OutVld  => out_vld_{0},
+      OutRdy  => '1'
+    );
+"""
+
+def generate(file_name, size_mb):
+    """Write a generated VHDL file of about size_mb MB"""
+    size = int(size_mb * 2**20)
+    with open(file_name, 'w', encoding='latin-1', newline='') as fo:
+        fo.write("entity netlist is\nend entity;\n\narchitecture struct of netlist is\nbegin\n")
+        i = 0
+        while fo.tell() < size:
+            fo.write(INSTANCE.format(i))
+            i += 1
+        fo.write("end architecture;\n")
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark streaming refactoring of a large generated VHDL file")
+    parser.add_argument("-size", help="size of the generated file in MB", type=float, default=100)
+    parser.add_argument("-db", help="json refactoring database", default="./migration_from_v2_to_v3_db.json")
+    parser.add_argument("-dir", help="directory for the generated file", default=None)
+    args = parser.parse_args(argv)
+
+    set_refactor_database(args.db)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        file_name = os.path.join(tmp_dir, "netlist.vhd")
+        generate(file_name, args.size)
+        size_mb = os.path.getsize(file_name) / 2**20
+        # unmigrated copy for the memory run
+        trace_file = os.path.join(tmp_dir, "netlist_trace.vhd")
+        shutil.copyfile(file_name, trace_file)
+
+        t0 = time.perf_counter()
+        changed, counts = refactor_file(file_name)
+        elapsed = time.perf_counter() - t0
+        print("file size       : {:8.1f} MB".format(size_mb))
+        print("substitutions   : {}".format(counts))
+        print("throughput      : {:8.1f} MB/s".format(size_mb / elapsed))
+
+        # second run on the migrated file: nothing to change, nothing written
+        t0 = time.perf_counter()
+        changed, counts = refactor_file(file_name)
+        elapsed = time.perf_counter() - t0
+        print("unchanged rerun : {:8.1f} MB/s, changed={}".format(size_mb / elapsed, changed))
+
+        # memory is traced in a separate migration of the copy, tracing slows down execution
+        tracemalloc.start()
+        changed, counts = refactor_file(trace_file)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("peak memory     : {:8.1f} kB, changed={}".format(peak / 2**10, changed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# ======================================================================
+# Micro-benchmark of the symbol renaming
+# Compares the compiled per component tables (SymbolRule) against the
+# per symbol conv_fun() callback used before. All files are read into
+# memory first, so only the renaming itself is measured.
+# ======================================================================
+import re
+import sys
+import time
+import argparse
+
+from hdlrefactor import set_refactor_database, conv_fun, collect_files, SymbolRule
+
+def conv_fun_refactor(lines):
+    """Reference: one python call to conv_fun for every symbol of every line"""
+    symbol_plus = re.compile(r'(\w+)', re.IGNORECASE | re.DOTALL)
+    start_entity_declaration = re.compile(r'\s*(entity|package)\s+(\w+)\s+is', re.IGNORECASE)
+    comp_name = ''
+    out_lines = []
+    for l in lines:
+        if grp := re.match(start_entity_declaration, l):
+            comp_name = grp[2]
+        out_lines.append(re.sub(symbol_plus, lambda m: conv_fun(comp_name, m.group(1), True, True), l))
+    return out_lines
+
+def symbol_rule_refactor(lines):
+    """Compiled tables: regex per component, python call only for symbols to rename"""
+    rule = SymbolRule()
+    return [rule.apply(l) for l in lines]
+
+def bench(fun, files, repeat):
+    """Return best time of repeat runs over all files and the result of the last run"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = [fun(lines) for lines in files]
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark symbol renaming: conv_fun vs compiled tables")
+    parser.add_argument("roots", nargs="*", default=["../../hdl", "../../testbench"], help="directories and/or files")
+    parser.add_argument("-db", help="json refactoring database", default="./migration_from_v2_to_v3_db.json")
+    parser.add_argument("-repeat", help="number of runs, the best is reported", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    set_refactor_database(args.db)
+    files = []
+    for file_name in collect_files(args.roots):
+        with open(file_name, encoding='latin-1') as fh:
+            files.append([l.split('--')[0] for l in fh])
+    nb_lines = sum(len(lines) for lines in files)
+
+    t_ref, ref = bench(conv_fun_refactor, files, args.repeat)
+    t_new, new = bench(symbol_rule_refactor, files, args.repeat)
+    if ref != new:
+        print("[ERROR]: compiled tables and conv_fun give different results")
+        return 1
+    print("{} files, {} lines".format(len(files), nb_lines))
+    print("conv_fun        : {:8.1f} ms".format(t_ref*1e3))
+    print("compiled tables : {:8.1f} ms".format(t_new*1e3))
+    print("speedup         : {:8.2f}x".format(t_ref/t_new))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
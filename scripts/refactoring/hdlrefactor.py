@@ -3,17 +3,33 @@
 # Benoît Stef - @PSI - WBBA/311
 # Radoslaw Rybaniec - PSI
 # ======================================================================
-import pandas as pd
 import re
 import os
+import sys
+import time
+import argparse
+import functools
+import hashlib
+import shutil
+import tempfile
+import itertools
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 import json
 
+# shared VHDL lexer and declaration index (scripts/vhdl_index.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from vhdl_index import split_comment, load_index, file_entry
+
 DICT = {}
+# compiled symbol rename tables per component, see symbol_table()
+SYMBOL_TABLES = {}
 
 def set_refactor_database(db_file_i, fix_case = True, add_tb = True):
     """Set a database with refactor names"""
     global DICT
+    SYMBOL_TABLES.clear()
     f = open(db_file_i,'r')
     db = json.load(f)
     if fix_case:
@@ -59,7 +75,7 @@ def set_refactor_database(db_file_i, fix_case = True, add_tb = True):
 def conv_fun(comp_name, signal, make_lower_case = False, use_all = False):
     ret = ''
     if DICT == {}:
-        raise "Please use set_refactor_database first"
+        raise RuntimeError("Please use set_refactor_database first")
     try:
         if make_lower_case:
             signal_lower_case = signal.lower()
@@ -76,281 +92,422 @@ def conv_fun(comp_name, signal, make_lower_case = False, use_all = False):
             ret = signal
     return ret
 
+def trie_regex(words):
+    """Build a regex alternation matching any of the words
+    The words are merged into a character trie so the regex engine does
+    not try every word at every position (e.g. InClk|InRst -> In(?:Clk|Rst))"""
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(c)+build(sub) for c, sub in sorted(node.items()) if c]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        return '(?:'+'|'.join(branches)+')'+('?' if '' in node else '')
+    return build(trie)
+
+def symbol_table(comp_name):
+    """Rename rules for all symbols of a component, compiled once per component
+    Same result as conv_fun(comp_name, symbol, True, True): the component rules
+    and the #ALL# rules are merged into one lower case table and a regex
+    matching only the symbols to rename, so symbols without a rule cost
+    neither a dictionary lookup nor a python call.
+    Returns tuple (compiled regex or None if there is nothing to rename, table)"""
+    if DICT == {}:
+        raise RuntimeError("Please use set_refactor_database first")
+    if comp_name not in SYMBOL_TABLES:
+        table = {}
+        for rules in (DICT.get('#ALL#', {}), DICT.get(comp_name, {})):
+            # lookups are done with lower case symbols, other keys never match
+            table.update((k, v) for k, v in rules.items() if k == k.lower())
+        regex = None
+        if table:
+            regex = re.compile(r'\b'+trie_regex(table)+r'\b', re.IGNORECASE)
+        SYMBOL_TABLES[comp_name] = (regex, table)
+    return SYMBOL_TABLES[comp_name]
+
 # ======================================================================
-def instantiation_refactor (file_name_i, file_name_o):
-    """Refactor instatnitaions maps from a database
-    Keyword arguments:
-    file_name_i -- the file to convert
-    """
-    ports = []
-    name = []
-    vector = []
-    size = []
-    desc = []
-    cmt = []
-    direction = []
-    # helpers
-    count = 0
-    start = 0
-    gene = 0
-    exep = 0
-    # definition for generic processing
-    gName = []
-    gType = []
-    gVal = []
-    gDesc = []
-    gCmt = []
-
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
+# Refactoring rules
+# Each rule rewrites the code part of one line (comment already removed)
+# and keeps the state it needs across lines (e.g. current component).
+# ======================================================================
+class EntityDeclarationRule:
+    """Rename generics and ports inside entity declarations"""
+    name = 'entity'
+    comment = '--'
+    start_entity_declaration = re.compile(r'\s*entity\s+(\w+)\s+is', re.IGNORECASE)
+    end_entity_declaration = re.compile(r'\s*end\s+entity', re.IGNORECASE)
+    port_declaration = re.compile(r'(\s*)(\w+)(\s*:.*)', re.IGNORECASE | re.DOTALL)
+
+    def __init__(self):
+        self.comp_name = ''
+        self.start = False
+        self.count = 0
+
+    def apply(self, l):
+        if grp := self.start_entity_declaration.match(l):
+            self.comp_name = grp[1]
+            self.start = True
+        elif self.end_entity_declaration.match(l):
+            self.start = False
+
+        if self.start:
+            if grp := self.port_declaration.match(l):
+                new_name = conv_fun(self.comp_name, grp[2])
+                if new_name != grp[2]:
+                    self.count += 1
+                l = grp[1]+new_name+grp[3]
+        return l
+
+class InstantiationRule:
+    """Rename formals in generic/port maps of psi_common instantiations"""
+    name = 'instantiation'
+    comment = '--'
     start_instantiation_map = re.compile(r'\s*generic\s+map|\s*port\s+map')
     end_instatiation_map = re.compile(r'\s*\)\s*;')
     component_instantiation = re.compile(r'\s*\w+\s*:\s*entity\s*\w+\.(psi_common_\w+)')
-    #instantiation_assignment = re.compile(r'(\s*)(\w+\s*)(\s*=>\s*)(\w+)(.*)', re.DOTALL)
-    # version which also includes aaa(1) => bbb,
-    #instantiation_assignment = re.compile(r'(\s*)(\w+)(\s*\(.*\))?(\s*=>.*)', re.DOTALL)
     # version which also includes port map(aaa(1) => bbb,
     instantiation_assignment = re.compile(r'(\s*|\s*port\s+map\s*\(s*|\s*generic\s+map\s*\(s*)(\w+)(\s*\(.*\))?(\s*=>.*)', re.DOTALL)
-    
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    out_lines = []
-    with open(file_name_i, encoding='latin-1') as fh:  # open text file
-            out_lines = []
-            lines = [l for l in fh.readlines()]
-            comp_name = ''
-            for l in lines:
-                is_line_modified = False
-                splited = l.split('--')
-                l = splited[0]
-                if len(splited) > 1:
-                    comment = ''.join(['--'+splited[i] for i in range(1,len(splited))])
-                else:
-                    comment = ''
-                exep = 0
-                if grp := re.match(component_instantiation, l):
-                    comp_name = grp[1]
-                    print(comp_name)
-                # check start of entity
-                if re.match(start_instantiation_map, l):
-                    start = 1
-                elif re.match(end_instatiation_map, l):
-                    start = 0
-                    #break
-
-                if start == 1:
-                    if grp := re.match(instantiation_assignment, l):
-                        is_line_modified = True;
-                        #l = grp[1]+conv_fun(comp_name,grp[2])+grp.groups('')[3]+grp[4]
-                        if grp[3]:
-                            l = grp[1]+conv_fun(comp_name,grp[2])+grp[3]+grp[4]
-                        else:
-                            l = grp[1]+conv_fun(comp_name,grp[2])+grp[4]
-                out_lines += l+comment
-
-    with open(file_name_o, 'w') as fo:
-        for l in out_lines:
-            fo.writelines(l)
 
+    def __init__(self):
+        self.comp_name = ''
+        self.start = False
+        self.count = 0
+
+    def apply(self, l):
+        if grp := self.component_instantiation.match(l):
+            self.comp_name = grp[1]
+        # check start of map
+        if self.start_instantiation_map.match(l):
+            self.start = True
+        elif self.end_instatiation_map.match(l):
+            self.start = False
+
+        if self.start:
+            if grp := self.instantiation_assignment.match(l):
+                new_name = conv_fun(self.comp_name, grp[2])
+                if new_name != grp[2]:
+                    self.count += 1
+                l = grp[1]+new_name+(grp[3] or '')+grp[4]
+        return l
+
+class SymbolRule:
+    """Rename all symbols known for the current entity/package or globally (#ALL#)"""
+    name = 'symbol'
+    comment = '--'
+    start_entity_declaration = re.compile(r'\s*(entity|package)\s+(\w+)\s+is', re.IGNORECASE)
+
+    def __init__(self):
+        self.set_component('')
+        self.count = 0
+
+    def set_component(self, comp_name):
+        self.comp_name = comp_name
+        self.regex, self.table = symbol_table(comp_name)
+
+    def rename(self, m):
+        new_name = self.table.get(m.group(0).lower(), m.group(0))
+        if new_name != m.group(0):
+            self.count += 1
+        return new_name
+
+    def apply(self, l):
+        if grp := self.start_entity_declaration.match(l):
+            self.set_component(grp[2])
+        if self.regex is None:
+            return l
+        return self.regex.sub(self.rename, l)
+
+class TclGenericsRule:
+    """Rename -g<generic> arguments of the create_tb_run in the tcl config file"""
+    name = 'tcl_generics'
+    comment = '#'
+    generic = re.compile(r'(-g)(\w+)', re.IGNORECASE | re.DOTALL)
+    start_tb_run = re.compile(r'\s*create_tb_run\s*\"(\w+)\"', re.IGNORECASE)
+
+    def __init__(self):
+        self.comp_name = ''
+        self.count = 0
+
+    def rename(self, m):
+        new_name = symbol_table(self.comp_name)[1].get(m.group(2).lower(), m.group(2))
+        if new_name != m.group(2):
+            self.count += 1
+        return m.group(1)+new_name
+
+    def apply(self, l):
+        if grp := self.start_tb_run.match(l):
+            self.comp_name = grp[1]
+        return self.generic.sub(self.rename, l)
+
+# rules applied by default, selected by file extension
+VHDL_RULES = (EntityDeclarationRule, InstantiationRule, SymbolRule)
+TCL_RULES = (TclGenericsRule,)
+
+def default_rules(file_name):
+    """Return the rule set matching the file type"""
+    if file_name.lower().endswith('.tcl'):
+        return TCL_RULES
+    return VHDL_RULES
+
+# ======================================================================
+# write buffer of the temporary output file
+STREAM_BUFFER_SIZE = 1 << 20
+
+def refactor_lines(lines, rules):
+    """Generator applying all rules on the code part of each line
+    Keyword arguments:
+    lines -- iterable of lines (e.g. an open file)
+    rules -- rule instances, applied in order
+    Yields tuples (input line, output line)"""
+    comment_marker = rules[0].comment
+    for line in lines:
+        if comment_marker == '--':
+            l, sep, comment = split_comment(line)
+        else:
+            l, sep, comment = line.partition(comment_marker)
+        for rule in rules:
+            l = rule.apply(l)
+        yield line, l+sep+comment
+
+def open_temp_file(file_name):
+    """Open a buffered temporary file next to file_name (same file system, so it can be renamed into place)
+    Returns tuple (file object, temporary file name)"""
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)),
+                                    prefix='.'+os.path.basename(file_name)+'.', suffix='.tmp')
+    return open(fd, 'w', encoding='latin-1', newline='', buffering=STREAM_BUFFER_SIZE), tmp_file
+
+def refactor_file(file_name_i, file_name_o = None, rules = None):
+    """Apply all refactoring rules to a file in a single streaming pass
+    Every line is split once into code and comment and all rules are applied
+    in order on the code part. The file is processed line by line, so memory
+    use is bounded by the longest line, not by the file size.
+    Nothing is written as long as the lines are unchanged. From the first
+    changed line on, the output goes through a buffered temporary file that is
+    renamed into place atomically at the end, an unchanged file is never
+    touched.
+    Keyword arguments:
+    file_name_i -- the file to convert
+    file_name_o -- output file, default is file_name_i
+    rules -- rule classes to apply, default depends on file extension
+    Returns tuple (changed, dictionary with number of substitutions per rule)"""
+    if file_name_o is None:
+        file_name_o = file_name_i
+    if rules is None:
+        rules = default_rules(file_name_i)
+    rules = [rule() for rule in rules]
+
+    fo = None
+    changed = False
+    try:
+        if file_name_o != file_name_i:
+            fo, tmp_file = open_temp_file(file_name_o)
+        # newline='' keeps the line endings of the file untouched
+        with open(file_name_i, encoding='latin-1', newline='') as fh:
+            nb_same = 0
+            for line, out_line in refactor_lines(fh, rules):
+                if out_line != line:
+                    changed = True
+                if fo is None:
+                    if not changed:
+                        nb_same += 1
+                        continue
+                    # first change, copy the unchanged lines read so far
+                    fo, tmp_file = open_temp_file(file_name_o)
+                    with open(file_name_i, encoding='latin-1', newline='') as fc:
+                        fo.writelines(itertools.islice(fc, nb_same))
+                fo.write(out_line)
+        if fo is not None:
+            fo.close()
+            shutil.copymode(file_name_o if os.path.exists(file_name_o) else file_name_i, tmp_file)
+            os.replace(tmp_file, file_name_o)
+    except BaseException:
+        if fo is not None:
+            fo.close()
+            os.remove(tmp_file)
+        raise
+    return changed, {rule.name: rule.count for rule in rules}
 
+# ======================================================================
+def instantiation_refactor (file_name_i, file_name_o):
+    """Refactor instatnitaions maps from a database
+    Keyword arguments:
+    file_name_i -- the file to convert
+    file_name_o -- output file, can be the same as file_name_i"""
+    refactor_file(file_name_i, file_name_o, (InstantiationRule,))
 
+@functools.lru_cache(maxsize=None)
+def shared_index():
+    """Persisted VHDL index (scripts/.vhdl_index.json, see vhdl_index.py), None if there is none"""
+    return load_index()
 
 def entity_declaration_parser (file_name_i):
     """Create dictionary of all generics and ports for later refactoring
+    The declarations are taken from the persisted VHDL index if the file did not change.
     Keyword arguments:
     file_name_i -- the file to convert
     Returns dictionary with generics and ports for refactoring"""
-
     RET = {}
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
-    start_entity_declaration = re.compile(r'\s*entity\s+(\w+)\s+is', re.IGNORECASE)
-    end_entity_declaration = re.compile(r'\s*end\s+entity', re.IGNORECASE)
-    
-    start_port_declaration = re.compile(r'\s+port\s+', re.IGNORECASE)
-    start_generic_declaration = re.compile(r'\s+generic\s+', re.IGNORECASE)
-
-    #port_declaration = re.compile(r'\(|\s+(\w+)\s*:', re.IGNORECASE)
-    # also include something like port(aa : 
-    #port_declaration = re.compile(r'(?:\(}|\s+)(\w+)\s*:', re.IGNORECASE)
-    port_declaration = re.compile(r'(\w+)\s*:', re.IGNORECASE)
-
-    
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    with open(file_name_i, encoding='latin-1') as fh:  # open text file
-        out_lines = []
-        start = False
-        lines = [l for l in fh.readlines()]
-        comp_name = ''
-        for l in lines:
-            is_line_modified = False
-            splited = l.split('--')
-            l = splited[0]
-            exep = 0
-            if grp := re.match(start_entity_declaration, l):
-                comp_name = grp[1]
-                #print(comp_name)
-                RET[comp_name] = {}
-                start = True
-            elif grp := re.match(end_entity_declaration, l):
-                start = False
-
-            if start:
-                if grp := re.search(port_declaration, l):
-                    port_name = grp[1]
-                    RET[comp_name][port_name] = port_name
-    #print(RET)
+    for entity in file_entry(file_name_i, shared_index())['entities']:
+        RET[entity['name']] = {d['name'] : d['name'] for d in entity['generics'] + entity['ports']}
     return RET
 
 def entity_declaration_refactor (file_name_i, file_name_o):
-    """Create MD file out of VHDL entity file.
+    """Rename generics and ports of entity declarations from a database
     Keyword arguments:
     file_name_i -- the file to convert
-    file_name_o -- output file, can be the same as file_name_i
-    Returns dictionary with generics and ports for refactoring"""
-
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
-    start_entity_declaration = re.compile(r'\s*entity\s+(\w+)\s+is', re.IGNORECASE)
-    end_entity_declaration = re.compile(r'\s*end\s+entity', re.IGNORECASE)
-    
-    start_port_declaration = re.compile(r'\s+port\s+', re.IGNORECASE)
-    start_generic_declaration = re.compile(r'\s+generic\s+', re.IGNORECASE)
+    file_name_o -- output file, can be the same as file_name_i"""
+    refactor_file(file_name_i, file_name_o, (EntityDeclarationRule,))
 
-    port_declaration = re.compile(r'(\s*)(\w+)(\s*:.*)', re.IGNORECASE | re.DOTALL)
-
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    out_lines = []
-    start = False
-    with open(file_name_i, encoding='latin-1') as fh:  # open text file
-            out_lines = []
-            lines = [l for l in fh.readlines()]
-            comp_name = ''
-            for l in lines:
-                is_line_modified = False
-                splited = l.split('--')
-                l = splited[0]
-                if len(splited) > 1:
-                    comment = ''.join(['--'+splited[i] for i in range(1,len(splited))])
-                else:
-                    comment = ''
-                exep = 0
-                if grp := re.match(start_entity_declaration, l):
-                    comp_name = grp[1]
-                    start = True
-                elif grp := re.match(end_entity_declaration, l):
-                    start = False
-                
-                if start:
-                    if grp := re.match(port_declaration, l):
-                        is_line_modified = True;
-                        l = grp[1]+conv_fun(comp_name,grp[2])+grp[3]
-
-                out_lines += l+comment
-
-    with open(file_name_o, 'w') as fo:
-        for l in out_lines:
-            fo.writelines(l)
-        
 def symbol_refactor(file_name_i, file_name_o):
     """Replace all symbols in the file
     Keyword arguments:
     file_name_i -- the file to convert
-    file_name_o -- output file, can be the same as file_name_i
-    Returns dictionary with generics and ports for refactoring"""
-
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
-    symbol = re.compile(r'[^\w]*(\w+)', re.IGNORECASE | re.DOTALL)
-    #symbol_plus = re.compile(r'([^\w]*)(\w+)', re.IGNORECASE | re.DOTALL)
-    symbol_plus = re.compile(r'(\w+)', re.IGNORECASE | re.DOTALL)
-    start_entity_declaration = re.compile(r'\s*(entity|package)\s+(\w+)\s+is', re.IGNORECASE)
-    
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    out_lines = []
-    start = False
-    with open(file_name_i, encoding='latin-1') as fh:  # open text file
-            out_lines = []
-            lines = [l for l in fh.readlines()]
-            comp_name = ''
-            for l in lines:
-                is_line_modified = False
-                splited = l.split('--')
-                l = splited[0]
-                if len(splited) > 1:
-                    comment = ''.join(['--'+splited[i] for i in range(1,len(splited))])
-                else:
-                    comment = ''
-                exep = 0
-                if grp := re.match(start_entity_declaration, l):
-                    comp_name = grp[2]
-                #symbols = re.findall(symbol, l)
-                #for s in symbols:
-                #    re.sub(
-                # def ps(m):
-                #     print(m.group(1))
-                #     return m.group(1)
-                l = re.sub(symbol_plus, lambda m: conv_fun(comp_name,m.group(1), True, True), l)
-                # if start:
-                #     if grp := re.match(port_declaration, l):
-                #         is_line_modified = True;
-                #         l = grp[1]+conv_fun(comp_name,grp[2])+grp[3]
-
-                out_lines += l+comment
-
-    with open(file_name_o, 'w') as fo:
-        for l in out_lines:
-            fo.writelines(l)
-
+    file_name_o -- output file, can be the same as file_name_i"""
+    refactor_file(file_name_i, file_name_o, (SymbolRule,))
 
 def tcl_generics_refactor(file_name_i, file_name_o):
     """Replace all generics in the tcl config file
     Keyword arguments:
     file_name_i -- the file to convert
-    file_name_o -- output file, can be the same as file_name_i
-    Returns dictionary with generics and ports for refactoring"""
+    file_name_o -- output file, can be the same as file_name_i"""
+    refactor_file(file_name_i, file_name_o, (TclGenericsRule,))
 
-    # ======================================================================
-    # RegExp specific to vhdl - compiled match pattern
-    # ======================================================================
-    generic = re.compile(r'(-g)(\w+)', re.IGNORECASE | re.DOTALL)
-    start_entity_declaration = re.compile(r'\s*create_tb_run\s*\"(\w+)\"', re.IGNORECASE)
-    
-    # ======================================================================
-    # Process Parsing file and list creation
-    # ======================================================================
-    out_lines = []
-    start = False
-    with open(file_name_i, encoding='latin-1') as fh:  # open text file
-            out_lines = []
-            lines = [l for l in fh.readlines()]
-            comp_name = ''
-            for l in lines:
-                is_line_modified = False
-                splited = l.split('#')
-                l = splited[0]
-                if len(splited) > 1:
-                    comment = ''.join(['#'+splited[i] for i in range(1,len(splited))])
-                else:
-                    comment = ''
-                exep = 0
-                if grp := re.match(start_entity_declaration, l):
-                    comp_name = grp[1]
-                l = re.sub(generic, lambda m: m.group(1)+conv_fun(comp_name,m.group(2), True, True), l)
-
-                out_lines += l+comment
-
-    with open(file_name_o, 'w') as fo:
-        for l in out_lines:
-            fo.writelines(l)
+# ======================================================================
+# Refactoring of complete trees with a process pool
+# ======================================================================
+# digests of files known to be migrated with the current database (see init_worker)
+KNOWN_DIGESTS = frozenset()
+# bump when the rules change, this invalidates existing caches
+CACHE_VERSION = 1
+
+def file_digest(file_name):
+    """Hash of the file content and of the rule set applied to it"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(','.join(rule.name for rule in default_rules(file_name)).encode())
+    with open(file_name, 'rb') as fh:
+        while chunk := fh.read(STREAM_BUFFER_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+def database_digest(db_file):
+    """Hash of the database, a cache is only valid for the database it was built with"""
+    h = hashlib.blake2b(str(CACHE_VERSION).encode(), digest_size=16)
+    with open(db_file, 'rb') as fh:
+        h.update(fh.read())
+    return h.hexdigest()
+
+def load_cache(cache_file, db_digest):
+    """Return set of file digests already migrated with the database, empty if the cache does not match"""
+    try:
+        with open(cache_file) as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return set()
+    if cache.get('database') != db_digest:
+        return set()
+    return set(cache.get('digests', []))
+
+def save_cache(cache_file, db_digest, digests):
+    """Write the cache atomically, an interrupted run never leaves a broken cache"""
+    tmp_file = cache_file+'.tmp'
+    with open(tmp_file, 'w') as fh:
+        json.dump({'database' : db_digest, 'digests' : sorted(digests)}, fh)
+    os.replace(tmp_file, cache_file)
+
+def init_worker(db_file, known_digests = ()):
+    """Load the database and the cached digests, used as initializer of the process pool"""
+    global KNOWN_DIGESTS
+    set_refactor_database(db_file)
+    KNOWN_DIGESTS = frozenset(known_digests)
+
+def refactor_job(file_name):
+    """Refactor one file, used as worker function of the process pool
+    Files whose digest is in the cache are skipped, they are not even opened for writing.
+    Returns dictionary with file name, changed/skipped flags, substitutions per rule,
+    digest of the resulting content and time taken"""
+    t0 = time.perf_counter()
+    digest = file_digest(file_name)
+    if digest in KNOWN_DIGESTS:
+        changed, skipped, counts = False, True, {}
+    else:
+        changed, counts = refactor_file(file_name)
+        skipped = False
+        if changed:
+            digest = file_digest(file_name)
+    return {'file' : file_name,
+            'changed' : changed,
+            'skipped' : skipped,
+            'counts' : counts,
+            'substitutions' : sum(counts.values()),
+            'digest' : digest,
+            'time' : time.perf_counter() - t0}
+
+def collect_files(roots, pattern = '*.vhd*'):
+    """List files to refactor. Directories are searched recursively for pattern,
+    files are taken as they are (e.g. a tcl config file)"""
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.is_dir():
+            files += sorted(str(path) for path in root.rglob(pattern) if path.is_file())
+        else:
+            files.append(str(root))
+    return files
+
+def refactor_tree(roots, db_file, jobs = None, pattern = '*.vhd*', cache_file = None):
+    """Refactor all files below the given roots in parallel
+    Keyword arguments:
+    roots -- directories (searched recursively) and/or single files
+    db_file -- json refactoring database, loaded once per worker
+    jobs -- number of worker processes, default is the number of cores
+    pattern -- glob pattern for files inside directories
+    cache_file -- json file with digests of migrated files, re-runs skip files found in it
+    Returns list of per file results (see refactor_job), in file order"""
+    files = collect_files(roots, pattern)
+    db_digest = database_digest(db_file)
+    known = load_cache(cache_file, db_digest) if cache_file else set()
+    if jobs == 1:
+        init_worker(db_file, known)
+        results = [refactor_job(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(db_file, known)) as pool:
+            results = list(pool.map(refactor_job, files, chunksize=8))
+    if cache_file:
+        save_cache(cache_file, db_digest, known | {r['digest'] for r in results})
+    return results
+
+def print_summary(results, elapsed, per_file = True):
+    """Print one line per file (optional) and the totals"""
+    for r in results if per_file else []:
+        status = "skipped" if r['skipped'] else "changed" if r['changed'] else "unchanged"
+        print("{:10s}{:6d} subst. {:8.1f} ms  {}".format(status, r['substitutions'], r['time']*1e3, r['file']))
+    changed = sum(r['changed'] for r in results)
+    skipped = sum(r['skipped'] for r in results)
+    print("[INFO]: {} files, {} changed, {} skipped (cached), {} substitutions in {:.2f} s".format(
+          len(results), changed, skipped, sum(r['substitutions'] for r in results), elapsed))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Refactor VHDL/TCL files according to a json database")
+    parser.add_argument("roots", nargs="+", help="directories (searched recursively) and/or files to refactor")
+    parser.add_argument("-db", help="json refactoring database", required=True)
+    parser.add_argument("-jobs", help="number of worker processes (default: all cores)", type=int, default=None)
+    parser.add_argument("-pattern", help="glob pattern for files inside directories", default="*.vhd*")
+    parser.add_argument("-cache", help="json cache file, files already migrated with the same database are skipped", default=None)
+    parser.add_argument("-quiet", help="only print the totals", action="store_true")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    results = refactor_tree(args.roots, args.db, args.jobs, args.pattern, args.cache)
+    elapsed = time.perf_counter() - t0
+    print_summary(results, elapsed, not args.quiet)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,18 +5,21 @@
 # Benoît Stef - WBBA 311
 # Radoslaw Rybaniec - WBBA 314
 # ======================================================================
-import re
 import os
-from os import listdir
-from os.path import isfile, join
-from hdlrefactor import entity_declaration_parser
-
-from pathlib import Path
+import sys
 
 import json
 
 import argparse
 
+# shared VHDL lexer and declaration index (scripts/vhdl_index.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from vhdl_index import build_index, load_index, iter_entities
+
+def entity_names(entity):
+    """Generics and ports of an entity in declaration order"""
+    return {d['name'] : d['name'] for d in entity['generics'] + entity['ports']}
+
 # Create command-line argument parser
 parser = argparse.ArgumentParser()
 # Add positional argument
@@ -60,26 +63,24 @@ database = {"#ALL#": {
 #ignore those ports
 blacklist  = ["rst_pol_g", "a_rst_pol_g", "b_rst_pol_g"]
 
-for path in Path(old_library_dir).rglob('*.vhd'):
-    path = str(path)
-    print("Parsing " + path)
-    entity_db = entity_declaration_parser(path)
-    for k,v in entity_db.items():
-        for b in blacklist:
-            v.pop(b, None)
-        database[k] = v;
-
-for path in Path(new_library_dir).rglob('*.vhd'):
-    path = str(path)
-    print("Parsing " + path)
-    entity_db = entity_declaration_parser(path)
-    for k,v in entity_db.items():
-        #for p0,p1 in zip(database[k].keys(), v.values()):
-        #print(database[k].keys())
-        for b in blacklist:
-            v.pop(b, None)
-        merge = dict(zip(database[k].keys(), v.values()))
-        database[k] = merge;
+# files unchanged since the persisted index (scripts/.vhdl_index.json) was built are not parsed again
+index = load_index()
+
+print("Parsing " + old_library_dir)
+for path, entity in iter_entities(build_index([old_library_dir], index)):
+    v = entity_names(entity)
+    for b in blacklist:
+        v.pop(b, None)
+    database[entity['name']] = v;
+
+print("Parsing " + new_library_dir)
+for path, entity in iter_entities(build_index([new_library_dir], index)):
+    v = entity_names(entity)
+    for b in blacklist:
+        v.pop(b, None)
+    k = entity['name']
+    merge = dict(zip(database[k].keys(), v.values()))
+    database[k] = merge;
 
 with open(json_db_name, "w") as f:
     json.dump(database, f, indent=3);
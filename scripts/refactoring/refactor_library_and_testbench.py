@@ -3,33 +3,12 @@
 # Benoît Stef - WBBA 311
 # Radoslaw Rybaniec - WBBA 314
 # ======================================================================
-import re
-import os
-from os import listdir
-from os.path import isfile, join
-from hdlrefactor import entity_declaration_parser, entity_declaration_refactor, set_refactor_database, instantiation_refactor, symbol_refactor, tcl_generics_refactor
-
-from pathlib import Path
-
-set_refactor_database("./migration_from_v2_to_v3_db.json")
-
-for path in Path('../../hdl').rglob('*.vhd*'):
-    path = str(path)
-    print("Refactoring " + path)
-    entity_declaration_refactor(path, path)
-    instantiation_refactor(path, path)
-    symbol_refactor(path, path)
-    
-for path in Path('../../testbench').rglob('*.vhd*'):
-    path = str(path)
-    print("Refactoring " + path)
-    entity_declaration_refactor(path, path)
-    instantiation_refactor(path, path)
-    symbol_refactor(path, path)
-    
-
-#TCL
-path = "../../sim/config.tcl"
-print("Refactoring " + path)
-tcl_generics_refactor(path,path)
-
+import time
+from hdlrefactor import refactor_tree, print_summary
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    results = refactor_tree(['../../hdl', '../../testbench', '../../sim/config.tcl'],
+                            "./migration_from_v2_to_v3_db.json",
+                            cache_file="./.migration_cache.json")
+    print_summary(results, time.perf_counter() - t0)
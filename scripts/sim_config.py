@@ -0,0 +1,188 @@
+##############################################################################
+# Parser for PsiSim configuration files (sim/config.tcl)
+#
+# Only the subset of TCL used by PsiSim configurations is supported:
+# set, add_library, add_sources, create_tb_run, tb_run_* and add_tb_run.
+# Other commands are ignored.
+##############################################################################
+import os
+import re
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.abspath(os.path.join(THIS_DIR, "../sim/config.tcl"))
+
+def tcl_commands(text, variables):
+    """Generator splitting TCL text into commands, each command being a list of words
+    Braces group words literally, quotes and bare words get $variable
+    substitution (variables is read when the command is reached, so a
+    caller handling "set" sees its effect), comments (#) and line
+    continuations are handled."""
+    words = []
+    i = 0
+    n = len(text)
+
+    def substitute(word):
+        out = ""
+        j = 0
+        while j < len(word):
+            if word[j] == "$":
+                k = j + 1
+                if k < len(word) and word[k] == "{":
+                    end = word.index("}", k)
+                    name = word[k+1:end]
+                    j = end + 1
+                else:
+                    while k < len(word) and (word[k].isalnum() or word[k] in "_:"):
+                        k += 1
+                    name = word[j+1:k]
+                    j = k
+                out += variables.get(name, "$" + name)
+            else:
+                out += word[j]
+                j += 1
+        return out
+
+    while i < n:
+        c = text[i]
+        if c == "\\" and i+1 < n and text[i+1] in "\r\n":
+            i += 1  # line continuation
+            while i < n and text[i] in " \t\r\n":
+                i += 1
+        elif c in " \t":
+            i += 1
+        elif c in "\r\n;":
+            if words:
+                yield words
+                words = []
+            i += 1
+        elif c == "#" and not words:
+            while i < n and text[i] not in "\r\n":
+                i += 1
+        elif c == "{":
+            depth = 0
+            j = i
+            while j < n:
+                if text[j] == "{":
+                    depth += 1
+                elif text[j] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                j += 1
+            words.append(re.sub(r"\\\r?\n[ \t]*", " ", text[i+1:j]))
+            i = j + 1
+        elif c == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            words.append(substitute(text[i+1:j]))
+            i = j + 1
+        else:
+            j = i
+            while j < n and text[j] not in " \t\r\n;":
+                j += 1
+            words.append(substitute(text[i:j]))
+            i = j
+    if words:
+        yield words
+
+def parse_options(words):
+    """Split words into positional arguments and -option value pairs"""
+    args = []
+    options = {}
+    i = 0
+    while i < len(words):
+        if words[i].startswith("-") and i+1 < len(words):
+            options[words[i][1:]] = words[i+1]
+            i += 2
+        else:
+            args.append(words[i])
+            i += 1
+    return args, options
+
+def resolve_generic_paths(args, config_dir):
+    """Make relative file paths in generic values (-g<name>=./... or ../...) absolute, the simulations of
+    ghdl_regression.py do not run in the directory of the configuration file (the raw arguments are kept
+    for matching the commands echoed by PsiSim, see ciFlow.py)"""
+    return re.sub(r'(-g\w+=)(\.\.?/\S*)', lambda m: m.group(1) + os.path.normpath(os.path.join(config_dir, m.group(2))),
+                  args)
+
+def parse_config(config_file = DEFAULT_CONFIG):
+    """Parse a PsiSim configuration file
+    Paths are resolved relative to the directory of the configuration file
+    (PsiSim runs from there).
+    Returns dictionary with:
+    libraries -- library names in order of add_library
+    sources -- list of {'file', 'library', 'tag', 'language', 'version'} in compile order
+    tb_runs -- list of {'tb', 'library', 'args' : [generic sets], 'skip' : [simulators], 'time_limit'}
+    compile_suppress / run_suppress -- message numbers
+    config_dir -- directory of the configuration file"""
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+    with open(config_file) as f:
+        text = f.read()
+
+    config = {"libraries" : [], "sources" : [], "tb_runs" : [], "compile_suppress" : [], "run_suppress" : [],
+              "config_dir" : config_dir}
+    variables = {}
+    library = None
+    tb_run = None
+    for words in tcl_commands(text, variables):
+        cmd = words[0]
+        if cmd == "set" and len(words) == 3:
+            variables[words[1]] = words[2]
+        elif cmd == "add_library":
+            library = words[1]
+            config["libraries"].append(library)
+        elif cmd in ("compile_suppress", "run_suppress"):
+            config[cmd] += words[1].split(",")
+        elif cmd == "add_sources":
+            args, options = parse_options(words[1:])
+            base = os.path.normpath(os.path.join(config_dir, args[0]))
+            for file_name in args[1].split():
+                config["sources"].append({"file" : os.path.join(base, file_name),
+                                          "library" : options.get("lib", library),
+                                          "tag" : options.get("tag"),
+                                          "language" : options.get("language", "vhdl"),
+                                          "version" : options.get("version", "2008")})
+        elif cmd == "create_tb_run":
+            tb_run = {"tb" : words[1], "library" : words[2] if len(words) > 2 else library,
+                      "args" : [], "skip" : [], "time_limit" : None}
+        elif cmd == "tb_run_add_arguments" and tb_run is not None:
+            tb_run["args"] += words[1:]
+        elif cmd == "tb_run_skip" and tb_run is not None:
+            tb_run["skip"] += " ".join(words[1:]).split()
+        elif cmd == "tb_run_add_time_limit" and tb_run is not None:
+            tb_run["time_limit"] = words[1]
+        elif cmd == "add_tb_run" and tb_run is not None:
+            config["tb_runs"].append(tb_run)
+            tb_run = None
+    return config
+
+def check_sources(config, config_file = DEFAULT_CONFIG):
+    """Print an error and return False if source files of the configuration do not exist
+    The configuration expects the checkout in a directory named psi_common with psi_tb next to it
+    (LibPath "../.."), otherwise GHDL and the declaration index fail on the first missing file."""
+    missing = [src["file"] for src in config["sources"] if not os.path.isfile(src["file"])]
+    if not missing:
+        return True
+    print("[ERROR]: {} source files of {} not found, first: {}".format(len(missing), config_file, missing[0]))
+    print("         The checkout must be named psi_common with psi_tb next to it (LibPath \"../..\" in {})".format(
+          os.path.basename(config_file)))
+    return False
+
+def tb_run_jobs(config, simulator = "GHDL"):
+    """List of independent simulation jobs: one per (tb run, generic set)
+    tb runs skipped for the simulator are not included.
+    Returns list of {'name', 'tb', 'library', 'args' : [arguments as in the configuration],
+    'resolved_args' : [arguments with absolute file paths, see resolve_generic_paths], 'index'}"""
+    jobs = []
+    for run in config["tb_runs"]:
+        if simulator.lower() in (s.lower() for s in run["skip"]):
+            continue
+        arg_sets = run["args"] or [""]
+        for index, args in enumerate(arg_sets):
+            name = run["tb"] if len(arg_sets) == 1 else "{}.{}".format(run["tb"], index)
+            jobs.append({"name" : name, "tb" : run["tb"], "library" : run["library"],
+                         "args" : args.split(), "index" : index,
+                         "resolved_args" : resolve_generic_paths(args, config["config_dir"]).split()})
+    return jobs
@@ -0,0 +1,30 @@
+# ======================================================================
+# Tests of ciFlow.py (run with pytest from the repository root)
+# ======================================================================
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, THIS_DIR)
+
+from ciFlow import TbRunTracker
+from sim_config import parse_config
+
+def vsim_line(tb, args):
+    return "# vsim {} -t 1ps psi_common.{}\n".format(args, tb)
+
+def test_tb_run_tracker():
+    """Generic sets are identified from the echoed vsim lines, unknown sets are reported as such"""
+    config = parse_config()
+    tracker = TbRunTracker(config)
+    runs = {run["tb"] : run["args"] for run in config["tb_runs"]}
+    for tb in ("psi_common_dyn_sft_tb", "psi_common_prbs_tb"):
+        for index, args in enumerate(runs[tb]):
+            tracker.feed(vsim_line(tb, args))
+            assert tracker.current["index"] == index
+            assert tracker.describe().startswith("{} (generic set {}: ".format(tb, index))
+    tracker.feed("# ** Error: some error of the simulation\n")
+    assert tracker.current["index"] == 1
+    line = vsim_line("psi_common_prbs_tb", "-gwidth_g=11 -gseed_g=6")
+    tracker.feed(line)
+    assert tracker.describe() == "psi_common_prbs_tb (unknown generic set, vsim line: {})".format(line.strip())
@@ -0,0 +1,108 @@
+##############################################################################
+# Test-impact selection: tb runs affected by a change
+#
+# A tb run is affected if its testbench depends (transitively, through use
+# clauses and instantiations, see ghdl_compile.dependency_graph) on a
+# changed source file. Other files in a testbench directory (vector files
+# and their generators) affect the testbenches of that directory. Changes
+# of the simulation configuration and unknown files in hdl/, testbench/ or
+# sim/ select all tb runs, other files (documentation, scripts) select none.
+##############################################################################
+import os
+import sys
+import argparse
+import subprocess
+
+from sim_config import parse_config, check_sources, tb_run_jobs, DEFAULT_CONFIG
+from ghdl_compile import source_graph, dependants, DEFAULT_OUT_DIR
+from vhdl_index import index_key, REPO_DIR
+
+SIM_DIRS = ("hdl", "testbench", "sim")
+
+def git_changed_files(rev = "HEAD", repo_dir = REPO_DIR):
+    """Files changed on the current branch since it forked from a git revision (rev...HEAD) and in the
+    working tree, including untracked files"""
+    top = subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=repo_dir, universal_newlines=True).strip()
+    names = []
+    for cmd in (["git", "diff", "--name-only", rev + "...HEAD"], ["git", "diff", "--name-only", "HEAD"],
+                ["git", "ls-files", "--others", "--exclude-standard"]):
+        names += subprocess.check_output(cmd, cwd=top, universal_newlines=True).split("\n")
+    return [os.path.join(top, name) for name in dict.fromkeys(names) if name]
+
+def affected_tbs(config, changed, index_file, repo_dir = REPO_DIR):
+    """Names (lower case) of the testbenches affected by changed files
+    Files in a testbench directory that are no sources (vector files, generators) affect the sources of
+    that directory.
+    Returns None if all testbenches are affected (configuration changed, unknown files in the hdl, testbench
+    or sim directories)"""
+    files, deps, index = source_graph(config, index_file)
+    real = {os.path.realpath(f) : f for f in files}
+    changed = {os.path.realpath(f) for f in changed}
+    if any(os.path.basename(f) == "config.tcl" for f in changed):
+        return None
+    repo_dir = os.path.realpath(repo_dir)
+    hit = set()
+    for f in changed:
+        if f in real:
+            hit.add(real[f])
+            continue
+        parts = os.path.relpath(f, repo_dir).split(os.sep)
+        if parts[0] not in SIM_DIRS:
+            continue                                # documentation, scripts, models
+        if parts[0] != "testbench" or len(parts) < 3:
+            return None
+        tb_dir = os.path.join(repo_dir, "testbench", parts[1])
+        in_dir = {real[r] for r in real if os.path.dirname(r) == tb_dir}
+        if not in_dir:
+            return None
+        hit |= in_dir
+    hit |= dependants(hit, deps)
+    return {entity["name"].lower() for f in hit for entity in index["files"][index_key(f)]["entities"]}
+
+def select_impacted_jobs(jobs, config, changed, index_file):
+    """Jobs (see sim_config.tb_run_jobs) whose testbench is affected by the changed files"""
+    tbs = affected_tbs(config, changed, index_file)
+    if tbs is None:
+        return jobs
+    return [j for j in jobs if j["tb"].lower() in tbs]
+
+def time_saved(jobs, selected, durations):
+    """Estimate the simulation time saved by running only the selected jobs
+    durations -- job durations of a previous run, unknown jobs count with the mean duration
+    Returns tuple (saved time, total time), both in seconds, or in jobs if no durations are known"""
+    known = [durations[j["name"]] for j in jobs if j["name"] in durations]
+    mean = sum(known) / len(known) if known else 1.0
+    total = sum(durations.get(j["name"], mean) for j in jobs)
+    return total - sum(durations.get(j["name"], mean) for j in selected), total
+
+def print_selection(jobs, selected, durations):
+    saved, total = time_saved(jobs, selected, durations)
+    unit = "s" if durations else "jobs"
+    print("[INFO]: {} of {} jobs selected, estimated saving {:.0f} of {:.0f} {} ({:.0f} %)".format(
+        len(selected), len(jobs), saved, total, unit, 100 * saved / total if total else 0))
+
+# ======================================================================
+def main(argv = None):
+    from ghdl_regression import previous_durations
+    parser = argparse.ArgumentParser(description="List the tb runs affected by changed files")
+    parser.add_argument("changed", help="changed files (default: changes against -since)", nargs="*")
+    parser.add_argument("-since", help="git revision to compare the working tree against", default="HEAD")
+    parser.add_argument("-config", help="PsiSim configuration file", default=DEFAULT_CONFIG)
+    parser.add_argument("-out", help="regression output directory (index and durations of the last run)", default=DEFAULT_OUT_DIR)
+    parser.add_argument("-simulator", help="simulator for tb_run_skip", default="GHDL")
+    args = parser.parse_args(argv)
+
+    config = parse_config(args.config)
+    if not check_sources(config, args.config):
+        return 1
+    changed = args.changed or git_changed_files(args.since)
+    os.makedirs(args.out, exist_ok=True)
+    jobs = tb_run_jobs(config, args.simulator)
+    selected = select_impacted_jobs(jobs, config, changed, os.path.join(args.out, "vhdl_index.json"))
+    for job in selected:
+        print("{:50s} {}".format(job["name"], " ".join(job["args"])))
+    print_selection(jobs, selected, previous_durations(os.path.join(args.out, "regression.json")))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+# ======================================================================
+# VHDL lexer and declaration index shared by the psi_common scripts
+# (refactoring, documentation, library parsing)
+#
+# The index contains per file: use clauses, entities (generics, ports
+# with direction and width), architectures, packages (functions and
+# procedures) and instantiations. It is stored as JSON and only files
+# whose content changed are parsed again.
+# ======================================================================
+import re
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+DEFAULT_ROOTS = [os.path.join(REPO_DIR, 'hdl'), os.path.join(REPO_DIR, 'testbench')]
+DEFAULT_INDEX_FILE = os.path.join(THIS_DIR, '.vhdl_index.json')
+
+# bump when the content of the index changes, older index files are rebuilt
+INDEX_VERSION = 2
+
+# ======================================================================
+# Lexer
+# ======================================================================
+Token = namedtuple('Token', 'kind text line')
+
+TOKEN_RE = re.compile(r'''
+    (?P<newline>\r\n|\n|\r)
+  | (?P<space>[ \t\f\v\xa0]+)
+  | (?P<comment>--[^\r\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<bitstring>\d*[uUsS]?[bBoOxXdD]"[^"\r\n]*")
+  | (?P<string>"(?:[^"\r\n]|"")*")
+  | (?P<identifier>[^\W\d_]\w*|\\(?:[^\\\r\n]|\\\\)*\\)
+  | (?P<number>\d[\d_]*(?:\#[\w.]+\#|\.[\d_]+)?(?:[eE][+-]?\d[\d_]*)?)
+  | (?P<delimiter>=>|\*\*|:=|/=|>=|<=|<>|\?\?|\?/=|\?<=|\?>=|\?=|\?<|\?>|<<|>>|[&'()*+,\-./:;<=>|\[\]?@^`])
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+
+RESERVED = frozenset('''
+abs access after alias all and architecture array assert assume assume_guarantee attribute begin block body buffer
+bus case component configuration constant context cover default disconnect downto else elsif end entity exit fairness
+file for force function generate generic group guarded if impure in inertial inout is label library linkage literal
+loop map mod nand new next nor not null of on open or others out package parameter port postponed procedure process
+property protected pure range record register reject release rem report restrict restrict_guarantee return rol ror
+select sequence severity shared signal sla sll sra srl strong subtype then to transport type unaffected units until
+use variable vmode vprop vunit wait when while with xnor xor
+'''.split())
+
+def tokenize(text):
+    """Split VHDL text into tokens, including white space and comments
+    A tick (') is a character literal unless it follows a name or a closing
+    bracket (attribute or qualified expression, e.g. data'length, t'('1')).
+    Returns list of Token(kind, text, line)"""
+    tokens = []
+    line = 1
+    pos = 0
+    prev = None  # last significant token
+    end = len(text)
+    while pos < end:
+        if text[pos] == "'" and pos+2 < end and text[pos+2] == "'" and not (
+                prev is not None and (prev.text in (')', ']') or
+                                      (prev.kind == 'identifier' and prev.text.lower() not in RESERVED))):
+            tok = Token('char', text[pos:pos+3], line)
+        else:
+            m = TOKEN_RE.match(text, pos)
+            tok = Token(m.lastgroup, m.group(), line)
+        tokens.append(tok)
+        pos += len(tok.text)
+        if tok.kind == 'newline':
+            line += 1
+        elif tok.kind == 'block_comment':
+            line += tok.text.count('\n') + tok.text.count('\r') - tok.text.count('\r\n')
+        elif tok.kind not in ('space', 'comment'):
+            prev = tok
+    return tokens
+
+def split_comment(line):
+    """Split a line of VHDL into code and comment, like str.partition('--')
+    but ignoring -- inside strings and character literals.
+    Returns tuple (code, '--' or '', comment text after --)"""
+    if '"' not in line and "'" not in line:
+        return line.partition('--')
+    if '--' not in line:
+        return line, '', ''
+    pos = 0
+    for tok in tokenize(line):
+        if tok.kind == 'comment':
+            return line[:pos], '--', line[pos+2:]
+        pos += len(tok.text)
+    return line, '', ''
+
+def description(declaration):
+    """Description of a declaration: text of its comment after the last --, without the trailing |
+    that some sources use as column separator"""
+    return declaration['comment'].split('--')[-1].strip().rstrip('|').rstrip()
+
+# ======================================================================
+# Parser
+# ======================================================================
+MODES = ('in', 'out', 'inout', 'buffer', 'linkage')
+INTERFACE_CLASSES = ('signal', 'constant', 'variable', 'file')
+SINGLE_BIT_TYPES = ('std_logic', 'std_ulogic', 'bit')
+
+def spaced(tok):
+    """Tokens separated by spaces in join_tokens: reserved words and =>"""
+    return tok.text == '=>' or (tok.kind == 'identifier' and tok.text.lower() in RESERVED)
+
+def join_tokens(tokens):
+    """Compact text of a token sequence with single spaces between words and around reserved words,
+    e.g. std_logic_vector(choose(tdm_g,width_g-1,ch_nb_g*width_g-1) downto 0)"""
+    text = ''
+    prev = None
+    for tok in tokens:
+        if prev is not None and prev.text != "'":
+            words = prev.kind in ('identifier', 'number') and tok.kind in ('identifier', 'number')
+            if words or (spaced(tok) and prev.text not in ('(', '[')) or \
+                    (spaced(prev) and tok.text not in (')', ']', ',', ';', "'")):
+                text += ' '
+        text += tok.text
+        prev = tok
+    return text
+
+def low(tok):
+    return tok.text.lower()
+
+def matching_bracket(sig, i):
+    """Index of the bracket closing the one at sig[i]"""
+    depth = 0
+    for j in range(i, len(sig)):
+        if sig[j].text == '(':
+            depth += 1
+        elif sig[j].text == ')':
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(sig) - 1
+
+def split_top_level(tokens, separator):
+    """Split tokens at separator outside of brackets"""
+    parts = [[]]
+    depth = 0
+    for tok in tokens:
+        if tok.text == '(':
+            depth += 1
+        elif tok.text == ')':
+            depth -= 1
+        if depth == 0 and tok.text == separator:
+            parts.append([])
+        else:
+            parts[-1].append(tok)
+    return [p for p in parts if p]
+
+def index_top_level(tokens, texts):
+    """Index of the first token (outside of brackets) whose lower case text is in texts, None if not found"""
+    depth = 0
+    for j, tok in enumerate(tokens):
+        if tok.text == '(':
+            depth += 1
+        elif tok.text == ')':
+            depth -= 1
+        elif depth == 0 and tok.text.lower() in texts:
+            return j
+    return None
+
+def width_expression(hi, lo):
+    """Width of a range hi downto lo as text, e.g. (width_g-1, 0) -> width_g"""
+    if lo == '0':
+        if hi.endswith('-1'):
+            return hi[:-2]
+        return hi + '+1'
+    return '({})-({})+1'.format(hi, lo)
+
+def subtype_info(tokens):
+    """Return (range, width) of a subtype indication, None where not known"""
+    if len(tokens) == 1 and low(tokens[0]) in SINGLE_BIT_TYPES:
+        return None, '1'
+    start = next((j for j, tok in enumerate(tokens) if tok.text == '('), None)
+    if start is None:
+        return None, None
+    inner = tokens[start+1:matching_bracket(tokens, start)]
+    d = index_top_level(inner, ('downto', 'to'))
+    if d is None:
+        return join_tokens(inner), None
+    left, right = join_tokens(inner[:d]), join_tokens(inner[d+1:])
+    if low(inner[d]) == 'downto':
+        return join_tokens(inner), width_expression(left, right)
+    return join_tokens(inner), width_expression(right, left)
+
+def parse_interface_list(sig, i, comments):
+    """Parse generic/port/parameter list starting at the bracket sig[i]
+    Returns tuple (list of declarations, index after the closing bracket)"""
+    end = matching_bracket(sig, i)
+    declarations = []
+    element = []
+    depth = 0
+    for tok in sig[i+1:end+1]:
+        if tok.text == '(':
+            depth += 1
+        elif tok.text == ')':
+            depth -= 1
+        if depth < 0 or (depth == 0 and tok.text == ';'):
+            if element:
+                declarations += interface_declaration(element, tok.line, comments)
+            element = []
+        else:
+            element.append(tok)
+    return declarations, end + 1
+
+def interface_declaration(tokens, end_line, comments):
+    """Declarations of one interface element, e.g. a, b : in std_logic := '0'"""
+    colon = index_top_level(tokens, (':',))
+    if colon is None:
+        return []  # e.g. VHDL-2008 type/package generics
+    names = [tok.text for tok in tokens[:colon] if tok.kind == 'identifier' and low(tok) not in INTERFACE_CLASSES]
+    rest = tokens[colon+1:]
+    direction = None
+    if rest and low(rest[0]) in MODES:
+        direction = low(rest[0])
+        rest = rest[1:]
+    assign = index_top_level(rest, (':=',))
+    subtype = rest if assign is None else rest[:assign]
+    default = None if assign is None else join_tokens(rest[assign+1:])
+    vrange, width = subtype_info(subtype)
+    comment = comments.get(end_line, comments.get(tokens[0].line, ''))
+    return [{'name' : name,
+             'direction' : direction,
+             'type' : join_tokens(subtype),
+             'range' : vrange,
+             'width' : width,
+             'default' : default,
+             'comment' : comment,
+             'line' : tokens[0].line} for name in names]
+
+def parse_entity(sig, i, comments):
+    """Parse entity header starting at 'entity' token sig[i]
+    Returns tuple (entity dictionary, index after the header)"""
+    entity = {'name' : sig[i+1].text, 'line' : sig[i].line, 'generics' : [], 'ports' : []}
+    j = i + 3
+    while j+1 < len(sig) and low(sig[j]) in ('generic', 'port') and sig[j+1].text == '(':
+        key = 'generics' if low(sig[j]) == 'generic' else 'ports'
+        entity[key], j = parse_interface_list(sig, j+1, comments)
+        if j < len(sig) and sig[j].text == ';':
+            j += 1
+    return entity, j
+
+def parse_package(sig, i, comments):
+    """Parse package declaration starting at 'package' token sig[i]
+    Returns tuple (package dictionary, index after the package)"""
+    package = {'name' : sig[i+1].text, 'line' : sig[i].line, 'functions' : []}
+    j = i + 3
+    stmt_start = True
+    while j < len(sig):
+        w = low(sig[j])
+        if stmt_start and w == 'end' and (j+1 >= len(sig) or low(sig[j+1]) not in ('record', 'component', 'protected', 'units')):
+            while j < len(sig) and sig[j].text != ';':
+                j += 1
+            return package, j + 1
+        if stmt_start and w in ('pure', 'impure'):
+            j += 1
+            w = low(sig[j])
+        if stmt_start and w in ('function', 'procedure'):
+            subprogram = {'name' : sig[j+1].text, 'kind' : w, 'params' : [], 'return' : None, 'line' : sig[j].line}
+            j += 2
+            if j < len(sig) and low(sig[j]) == 'parameter':
+                j += 1
+            if j < len(sig) and sig[j].text == '(':
+                subprogram['params'], j = parse_interface_list(sig, j, comments)
+            if j < len(sig) and low(sig[j]) == 'return':
+                k = j + 1
+                while k < len(sig) and sig[k].text != ';' and low(sig[k]) != 'is':
+                    k += 1
+                subprogram['return'] = join_tokens(sig[j+1:k])
+                j = k
+            package['functions'].append(subprogram)
+            continue
+        stmt_start = sig[j].text == ';'
+        j += 1
+    return package, j
+
+def parse_association_list(sig, i):
+    """Parse generic/port map association list starting at the bracket sig[i]
+    Returns tuple (list of {'formal', 'actual'}, index after the closing bracket)"""
+    end = matching_bracket(sig, i)
+    associations = []
+    for element in split_top_level(sig[i+1:end], ','):
+        arrow = index_top_level(element, ('=>',))
+        if arrow is None:
+            associations.append({'formal' : None, 'actual' : join_tokens(element)})
+        else:
+            associations.append({'formal' : join_tokens(element[:arrow]), 'actual' : join_tokens(element[arrow+1:])})
+    return associations, end + 1
+
+def is_instantiation(sig, i):
+    """Check for 'label : entity ...', 'label : component ...' or 'label : name generic/port map'"""
+    if i+3 >= len(sig) or sig[i].kind != 'identifier' or sig[i+1].text != ':':
+        return False
+    w = low(sig[i+2])
+    if w in ('entity', 'component', 'configuration'):
+        return True
+    return sig[i+2].kind == 'identifier' and w not in RESERVED and low(sig[i+3]) in ('generic', 'port') \
+        and i+4 < len(sig) and low(sig[i+4]) == 'map'
+
+def parse_instantiation(sig, i, architecture):
+    """Parse instantiation starting at the label sig[i]
+    Returns tuple (instance dictionary, index after the instantiation)"""
+    inst = {'label' : sig[i].text, 'kind' : 'component', 'library' : None, 'entity' : None,
+            'architecture' : None, 'parent' : architecture['entity'] if architecture else None,
+            'generic_map' : [], 'port_map' : [], 'line' : sig[i].line}
+    j = i + 2
+    if low(sig[j]) in ('entity', 'configuration', 'component'):
+        inst['kind'] = low(sig[j])
+        j += 1
+    name = [sig[j].text]
+    j += 1
+    while j+1 < len(sig) and sig[j].text == '.':
+        name.append(sig[j+1].text)
+        j += 2
+    inst['entity'] = name[-1]
+    if len(name) > 1:
+        inst['library'] = name[0]
+    if j+2 < len(sig) and sig[j].text == '(' and sig[j+2].text == ')':
+        inst['architecture'] = sig[j+1].text
+        j += 3
+    while j+2 < len(sig) and low(sig[j]) in ('generic', 'port') and low(sig[j+1]) == 'map' and sig[j+2].text == '(':
+        key = 'generic_map' if low(sig[j]) == 'generic' else 'port_map'
+        inst[key], j = parse_association_list(sig, j+2)
+    return inst, j
+
+def parse_vhdl(text):
+    """Parse the declarations of a VHDL source
+    Returns dictionary with lists 'uses', 'entities', 'architectures', 'packages' and 'instances'"""
+    tokens = tokenize(text)
+    comments = {}
+    for tok in tokens:
+        if tok.kind == 'comment' and tok.line not in comments:
+            comments[tok.line] = tok.text[2:].strip()
+    sig = [tok for tok in tokens if tok.kind not in ('space', 'newline', 'comment', 'block_comment')]
+
+    result = {'uses' : [], 'entities' : [], 'architectures' : [], 'packages' : [], 'instances' : []}
+    architecture = None
+    stmt_start = True
+    i = 0
+    while i < len(sig):
+        w = low(sig[i])
+        if stmt_start and w == 'use':
+            j = i + 1
+            while j < len(sig) and sig[j].text != ';':
+                j += 1
+            result['uses'] += [join_tokens(u).lower() for u in split_top_level(sig[i+1:j], ',')]
+            i = j
+        elif stmt_start and w == 'entity' and i+2 < len(sig) and low(sig[i+2]) == 'is':
+            entity, i = parse_entity(sig, i, comments)
+            result['entities'].append(entity)
+            architecture = None
+            continue
+        elif stmt_start and w == 'architecture' and i+3 < len(sig):
+            architecture = {'name' : sig[i+1].text, 'entity' : sig[i+3].text, 'line' : sig[i].line}
+            result['architectures'].append(architecture)
+            i += 4
+        elif stmt_start and w == 'package' and i+2 < len(sig) and low(sig[i+1]) != 'body' and low(sig[i+2]) == 'is':
+            package, i = parse_package(sig, i, comments)
+            result['packages'].append(package)
+            architecture = None
+            continue
+        elif stmt_start and w == 'package':
+            architecture = None  # package body
+        elif is_instantiation(sig, i):
+            inst, i = parse_instantiation(sig, i, architecture)
+            result['instances'].append(inst)
+            stmt_start = False
+            continue
+        stmt_start = i < len(sig) and low(sig[i]) in (';', 'is', 'begin', 'generate', 'then', 'else', 'loop')
+        i += 1
+    return result
+
+def parse_file(file_name):
+    """Parse the declarations of a VHDL file, see parse_vhdl()"""
+    with open(file_name, encoding='latin-1', newline='') as fh:
+        return parse_vhdl(fh.read())
+
+# ======================================================================
+# Index
+# ======================================================================
+def file_digest(file_name):
+    with open(file_name, 'rb') as fh:
+        return hashlib.blake2b(fh.read(), digest_size=16).hexdigest()
+
+def index_key(file_name):
+    """Key of a file in the index: path relative to the repository if inside, else absolute (posix style)"""
+    path = os.path.abspath(file_name)
+    if os.path.commonpath([path, REPO_DIR]) == REPO_DIR:
+        path = os.path.relpath(path, REPO_DIR)
+    return Path(path).as_posix()
+
+def index_path(key):
+    """File name of an index key"""
+    return os.path.join(REPO_DIR, key)
+
+def collect_vhdl_files(roots, pattern = '*.vhd'):
+    """List VHDL files below the roots (directories searched recursively, files taken as they are)"""
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.is_dir():
+            files += sorted(str(path) for path in root.rglob(pattern) if path.is_file())
+        else:
+            files.append(str(root))
+    return files
+
+def build_index(roots = DEFAULT_ROOTS, index = None, jobs = 1):
+    """Build the declaration index of all VHDL files below roots
+    Keyword arguments:
+    roots -- directories (searched recursively) and/or single files
+    index -- previous index, entries of files with unchanged content are reused
+    jobs -- number of processes parsing the changed files (None: number of CPUs)
+    Returns index dictionary {'version', 'files' : {key : file entry}}"""
+    old_files = index['files'] if index and index.get('version') == INDEX_VERSION else {}
+    files = {}
+    changed = []
+    for file_name in collect_vhdl_files(roots):
+        key = index_key(file_name)
+        digest = file_digest(file_name)
+        if key in old_files and old_files[key]['digest'] == digest:
+            files[key] = old_files[key]
+        else:
+            files[key] = None
+            changed.append((key, file_name, digest))
+    names = [file_name for _, file_name, _ in changed]
+    if jobs != 1 and len(changed) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            parsed = list(pool.map(parse_file, names, chunksize=4))
+    else:
+        parsed = [parse_file(file_name) for file_name in names]
+    for (key, _, digest), entry in zip(changed, parsed):
+        files[key] = dict(entry, digest=digest)
+    return {'version' : INDEX_VERSION, 'files' : files}
+
+def load_index(index_file = DEFAULT_INDEX_FILE):
+    """Load an index file, None if it does not exist or has another version"""
+    try:
+        with open(index_file) as fh:
+            index = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+def save_index(index, index_file = DEFAULT_INDEX_FILE):
+    """Write the index atomically"""
+    tmp_file = index_file + '.tmp'
+    with open(tmp_file, 'w') as fh:
+        json.dump(index, fh, indent=1)
+    os.replace(tmp_file, index_file)
+
+def get_index(roots = DEFAULT_ROOTS, index_file = DEFAULT_INDEX_FILE, jobs = 1):
+    """Return the up to date index of the roots, reusing and updating the index file
+    Only files whose content changed since the index file was written are parsed (see build_index())."""
+    old_index = load_index(index_file) if index_file else None
+    index = build_index(roots, old_index, jobs)
+    if index_file and index != old_index:
+        save_index(index, index_file)
+    return index
+
+def file_entry(file_name, index = None):
+    """Declarations of one file (see parse_vhdl()), taken from the index if the file did not change since
+    the index was built, else parsed"""
+    entry = index['files'].get(index_key(file_name)) if index else None
+    if entry is not None and entry['digest'] == file_digest(file_name):
+        return entry
+    return parse_file(file_name)
+
+def iter_entities(index):
+    """Yield tuples (file key, entity dictionary) of all entities in the index"""
+    for key, entry in index['files'].items():
+        for entity in entry['entities']:
+            yield key, entity
+
+def find_entity(index, name):
+    """Return tuple (file key, entity dictionary) of an entity (case insensitive), None if not found"""
+    name = name.lower()
+    for key, entity in iter_entities(index):
+        if entity['name'].lower() == name:
+            return key, entity
+    return None
+
+# ======================================================================
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Build the declaration index of VHDL files")
+    parser.add_argument("roots", nargs="*", default=DEFAULT_ROOTS, help="directories and/or files (default: hdl and testbench)")
+    parser.add_argument("-o", help="index file", default=DEFAULT_INDEX_FILE)
+    args = parser.parse_args(argv)
+
+    index = get_index(args.roots, args.o)
+    files = index['files'].values()
+    print("[INFO]: {} files, {} entities, {} packages, {} instantiations indexed in {}".format(
+          len(files), sum(len(f['entities']) for f in files), sum(len(f['packages']) for f in files),
+          sum(len(f['instances']) for f in files), args.o))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -92,6 +92,7 @@ add_sources "../hdl" {
 
 # testbenches
 add_sources "../testbench" {
+	psi_common_vector_file_pkg/psi_common_vector_file_pkg.vhd \
 	psi_common_simple_cc_tb/psi_common_simple_cc_tb.vhd \
 	psi_common_status_cc_tb/psi_common_status_cc_tb.vhd \
 	psi_common_sync_fifo_tb/psi_common_sync_fifo_tb.vhd \
@@ -462,11 +463,11 @@ add_tb_run
 
 create_tb_run "psi_common_dyn_sft_tb"
 tb_run_add_arguments \
-	"-gdirection_g=LEFT -gsel_bit_per_stage_g=2 -gsign_extend_g=false" \
-  "-gdirection_g=LEFT -gsel_bit_per_stage_g=3 -gsign_extend_g=false" \
-  "-gdirection_g=RIGHT -gsel_bit_per_stage_g=2 -gsign_extend_g=false" \
-  "-gdirection_g=RIGHT -gsel_bit_per_stage_g=2 -gsign_extend_g=true" \
-  "-gdirection_g=LEFT -gsel_bit_per_stage_g=2 -gsign_extend_g=true"
+	"-gdirection_g=LEFT -gsel_bit_per_stage_g=2 -gsign_extend_g=false -gvector_file_g=../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt" \
+  "-gdirection_g=LEFT -gsel_bit_per_stage_g=3 -gsign_extend_g=false -gvector_file_g=../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt" \
+  "-gdirection_g=RIGHT -gsel_bit_per_stage_g=2 -gsign_extend_g=false -gvector_file_g=../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt" \
+  "-gdirection_g=RIGHT -gsel_bit_per_stage_g=2 -gsign_extend_g=true -gvector_file_g=../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt" \
+  "-gdirection_g=LEFT -gsel_bit_per_stage_g=2 -gsign_extend_g=true -gvector_file_g=../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt"
 add_tb_run
 
 create_tb_run "psi_common_prbs_tb"
@@ -16,12 +16,16 @@ library ieee;
 	use ieee.numeric_std.all;
 	use ieee.math_real.all;
 
+library std;
+  use std.textio.all;
+
 library work;
   use work.psi_common_array_pkg.all;
 	use work.psi_common_math_pkg.all;
 	use work.psi_common_logic_pkg.all;
   use work.psi_tb_activity_pkg.all;
   use work.psi_tb_compare_pkg.all;
+  use work.psi_common_vector_file_pkg.all;
 
 ------------------------------------------------------------
 -- Entity Declaration
@@ -30,7 +34,9 @@ entity psi_common_dyn_sft_tb is
 	generic (
 		direction_g : string := "LEFT" ;
 		sel_bit_per_stage_g : positive := 4 ;
-		sign_extend_g : boolean := true 
+		sign_extend_g : boolean := true ;
+		-- vectors generated by psi_common_dyn_sft_tb_vectors.py (path relative to the simulation directory)
+		vector_file_g : string := "../testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.txt"
 	);
 end entity;
 
@@ -65,6 +71,8 @@ architecture sim of psi_common_dyn_sft_tb is
   type Random_a is array (natural range <>) of std_logic_vector(31 downto 0);
   constant Random_c : Random_a(0 to 3) := (X"ABCD1234", X"A1B2C3D4", X"12345678", X"87654321");
   constant Shift_c : t_ainteger(0 to 3) := (0, 10, 12, 20); 
+  -- column of the expected output in the vector file (after dat_i and shift_i)
+  constant ExpColumn_c : natural := choose(direction_g = "LEFT", 0, choose(sign_extend_g, 2, 1));
 	
 begin
 	------------------------------------------------------------
@@ -132,6 +140,11 @@ begin
 	------------------------------------------------------------
 	-- *** inp ***
 	p_inp : process
+    file VecFile     : text;
+    variable VecLine : line;
+    variable VecDone : boolean;
+    variable Dat_v   : std_logic_vector(dat_i'range);
+    variable Shift_v : std_logic_vector(shift_i'range);
 	begin
 		-- start of process !DO NOT EDIT
 		wait until rst_i = '0';
@@ -167,6 +180,21 @@ begin
         end if;  
       end loop;
     end loop;
+    
+    -- Vector file
+    file_open(VecFile, vector_file_g, read_mode);
+    loop
+      vec_readline(VecFile, VecLine, VecDone);
+      exit when VecDone;
+      vec_read(VecLine, Dat_v);
+      vec_read(VecLine, Shift_v);
+      dat_i   <= Dat_v;
+      shift_i <= Shift_v;
+      vld_i   <= '1';
+      wait until rising_edge(clk_i);
+    end loop;
+    file_close(VecFile);
+    vld_i <= '0';
 		
 		-- end of process !DO NOT EDIT!
 		ProcessDone(TbProcNr_inp_c) <= '1';
@@ -177,6 +205,9 @@ begin
 	p_outp : process
     variable InData_v : std_logic_vector(31 downto 0);
     variable Shift_v : integer;
+    file VecFile     : text;
+    variable VecLine : line;
+    variable VecDone : boolean;
 	begin
 		-- start of process !DO NOT EDIT
 		wait until rst_i = '0';
@@ -210,6 +241,24 @@ begin
         end if;
       end loop;
     end loop;
+    
+    -- Vector file
+    file_open(VecFile, vector_file_g, read_mode);
+    loop
+      vec_readline(VecFile, VecLine, VecDone);
+      exit when VecDone;
+      wait until rising_edge(clk_i) and vld_o = '1';
+      vec_read(VecLine, InData_v);                        -- dat_i
+      vec_read(VecLine, InData_v(shift_i'range));         -- shift_i
+      for col in 0 to 2 loop
+        if col = ExpColumn_c then
+          vec_check(VecLine, dat_o, "Wrong Data (vector file)");
+        else
+          vec_read(VecLine, InData_v);
+        end if;
+      end loop;
+    end loop;
+    file_close(VecFile);
 		
 		-- end of process !DO NOT EDIT!
 		ProcessDone(TbProcNr_outp_c) <= '1';
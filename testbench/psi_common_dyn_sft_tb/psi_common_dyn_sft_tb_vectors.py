@@ -0,0 +1,42 @@
+##############################################################################
+# Generates the vector file of psi_common_dyn_sft_tb from the Python model
+# (model/psi_common_dyn_sft.py)
+#
+# Columns: dat_i, shift_i and the expected dat_o for LEFT, RIGHT without and
+# RIGHT with sign extension (the tb checks the column of its generics). The
+# vectors are the moving ones and random inputs for all shifts from 0 to
+# max_shift_g. The output does not depend on sel_bit_per_stage_g.
+#
+# Usage (from the repository root): python testbench/psi_common_dyn_sft_tb/psi_common_dyn_sft_tb_vectors.py
+##############################################################################
+import os
+import sys
+
+import numpy as np
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(THIS_DIR, "..", "..")))
+
+from model.psi_common_dyn_sft import DynSft
+from model.psi_common_vector_file_pkg import write_vectors
+
+VECTOR_FILE = os.path.join(THIS_DIR, "psi_common_dyn_sft_tb_vectors.txt")
+MAX_SHIFT = 20      # max_shift_g of the tb
+WIDTH = 32          # width_g of the tb
+RANDOM = 16         # random inputs per shift value
+
+def main():
+    rng = np.random.default_rng(7)
+    inputs = np.concatenate((np.int64(1) << np.arange(WIDTH), rng.integers(0, 1 << WIDTH, RANDOM)))
+    shift = np.repeat(np.arange(MAX_SHIFT + 1), len(inputs))
+    dat = np.tile(inputs, MAX_SHIFT + 1)
+    outputs = [DynSft(direction, 2, MAX_SHIFT, WIDTH, sign_extend).shift(dat, shift)
+               for direction, sign_extend in (("LEFT", False), ("RIGHT", False), ("RIGHT", True))]
+    write_vectors(VECTOR_FILE, [dat, shift] + outputs, [WIDTH, 5, WIDTH, WIDTH, WIDTH],
+                  names=["dat_i", "shift_i", "dat_o_left", "dat_o_right", "dat_o_right_sext"],
+                  comments=["generated by psi_common_dyn_sft_tb_vectors.py, do not edit"])
+    print("[INFO]: {} vectors written to {}".format(len(dat), VECTOR_FILE))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
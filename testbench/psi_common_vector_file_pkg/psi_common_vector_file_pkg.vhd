@@ -0,0 +1,174 @@
+------------------------------------------------------------------------------
+--  Copyright (c) 2026 by Paul Scherrer Institute, Switzerland
+--  All rights reserved.
+------------------------------------------------------------------------------
+
+------------------------------------------------------------------------------
+-- Description
+------------------------------------------------------------------------------
+-- Reading, writing and checking of test vector files (see
+-- model/psi_common_vector_file_pkg.py for the Python side).
+--
+-- Every line of a vector file contains one vector, the columns are hex
+-- numbers separated by spaces. Lines starting with '#' are comments. Digits
+-- 'X' or '-' are don't care, the corresponding bits are not checked.
+--
+-- Usage:
+--   file vec_f : text open read_mode is "vectors.txt";
+--   ...
+--   vec_readline(vec_f, l, done);
+--   vec_read(l, dat);              -- stimuli columns
+--   vec_check(l, dat_o, "dat_o");  -- expected response columns
+
+------------------------------------------------------------------------------
+-- Libraries
+------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library std;
+use std.textio.all;
+
+------------------------------------------------------------------------------
+-- Package Header
+------------------------------------------------------------------------------
+package psi_common_vector_file_pkg is
+
+  -- read the next vector (comments and empty lines are skipped), done is true at the end of the file
+  procedure vec_readline(file f : text;
+                         l      : inout line;
+                         done   : out boolean);
+
+  -- read the next column of a vector, the value'length LSBs are returned
+  procedure vec_read(l     : inout line;
+                     value : out std_logic_vector);
+
+  -- append a column to a vector (e.g. for simulator dumps written with writeline)
+  procedure vec_write(l     : inout line;
+                      value : in std_logic_vector);
+
+  -- read the next column of a vector and compare it to the actual value
+  procedure vec_check(l      : inout line;
+                      actual : in std_logic_vector;
+                      msg    : in string);
+
+  -- hex representation of a vector as written by vec_write
+  function vec_hex(value : in std_logic_vector) return string;
+
+end psi_common_vector_file_pkg;
+
+------------------------------------------------------------------------------
+-- Package Body
+------------------------------------------------------------------------------
+package body psi_common_vector_file_pkg is
+
+  function is_separator(c : in character) return boolean is
+  begin
+    return c = ' ' or c = HT or c = CR;
+  end function;
+
+  function hex_digit(c : in character) return std_logic_vector is
+  begin
+    case c is
+      when '0'       => return "0000";
+      when '1'       => return "0001";
+      when '2'       => return "0010";
+      when '3'       => return "0011";
+      when '4'       => return "0100";
+      when '5'       => return "0101";
+      when '6'       => return "0110";
+      when '7'       => return "0111";
+      when '8'       => return "1000";
+      when '9'       => return "1001";
+      when 'A' | 'a' => return "1010";
+      when 'B' | 'b' => return "1011";
+      when 'C' | 'c' => return "1100";
+      when 'D' | 'd' => return "1101";
+      when 'E' | 'e' => return "1110";
+      when 'F' | 'f' => return "1111";
+      when 'X' | 'x' | '-' => return "----";
+      when others =>
+        report "###ERROR###: vector file contains invalid character '" & c & "'" severity error;
+        return "XXXX";
+    end case;
+  end function;
+
+  procedure vec_readline(file f : text;
+                         l      : inout line;
+                         done   : out boolean) is
+  begin
+    while not endfile(f) loop
+      readline(f, l);
+      if l'length > 0 then
+        if l(l'low) /= '#' and not is_separator(l(l'low)) then
+          done := false;
+          return;
+        end if;
+      end if;
+    end loop;
+    done := true;
+  end procedure;
+
+  procedure vec_read(l     : inout line;
+                     value : out std_logic_vector) is
+    variable v : std_logic_vector(value'length + 3 downto 0) := (others => '0');
+    variable c : character;
+  begin
+    -- skip separators
+    while l'length > 0 loop
+      exit when not is_separator(l(l'low));
+      read(l, c);
+    end loop;
+    assert l'length > 0 report "###ERROR###: vector file has not enough columns" severity error;
+    -- shift in hex digits up to the next separator
+    while l'length > 0 loop
+      exit when is_separator(l(l'low));
+      read(l, c);
+      v := v(v'high - 4 downto 0) & hex_digit(c);
+    end loop;
+    value := v(value'length - 1 downto 0);
+  end procedure;
+
+  function vec_hex(value : in std_logic_vector) return string is
+    constant Digits_c : natural := (value'length + 3) / 4;
+    constant Chars_c  : string(1 to 16) := "0123456789ABCDEF";
+    variable v        : std_logic_vector(Digits_c * 4 - 1 downto 0) := (others => '0');
+    variable s        : string(1 to Digits_c);
+    variable nibble   : std_logic_vector(3 downto 0);
+  begin
+    v(value'length - 1 downto 0) := value;
+    for i in 0 to Digits_c - 1 loop
+      nibble := v((Digits_c - i) * 4 - 1 downto (Digits_c - i - 1) * 4);
+      if is_x(nibble) then
+        s(i + 1) := 'X';
+      else
+        s(i + 1) := Chars_c(to_integer(unsigned(nibble)) + 1);
+      end if;
+    end loop;
+    return s;
+  end function;
+
+  procedure vec_write(l     : inout line;
+                      value : in std_logic_vector) is
+  begin
+    if l /= null then
+      if l'length > 0 then
+        write(l, ' ');
+      end if;
+    end if;
+    write(l, vec_hex(value));
+  end procedure;
+
+  procedure vec_check(l      : inout line;
+                      actual : in std_logic_vector;
+                      msg    : in string) is
+    variable expected : std_logic_vector(actual'length - 1 downto 0);
+  begin
+    vec_read(l, expected);
+    assert std_match(actual, expected)
+    report "###ERROR###: " & msg & " [expected " & vec_hex(expected) & ", received " & vec_hex(actual) & "]"
+    severity error;
+  end procedure;
+
+end psi_common_vector_file_pkg;